@@ -3,26 +3,290 @@
 Skill Packager - Creates a distributable .skill file of a skill folder
 
 Usage:
-    python utils/package_skill.py <path/to/skill-folder> [output-directory]
+    python utils/package_skill.py <path/to/skill-folder> [output-directory] [--workers N] [--incremental]
 
 Example:
     python utils/package_skill.py skills/public/my-skill
     python utils/package_skill.py skills/public/my-skill ./dist
+    python utils/package_skill.py skills/public/my-skill ./dist --incremental
+
+Packages are deterministic: entries are sorted by path and carry a fixed
+timestamp and permissions, so the same skill contents always produce the same
+bytes and a .skill file can be cached or compared by hash.
+
+Files in formats that are already compressed (images, fonts, Office documents,
+archives, media) are stored as they are; everything else is deflated on a
+thread pool (--workers, default: all cores). A file that does not get smaller
+is stored too.
+
+Each package carries a manifest of its files' content hashes in the zip
+comment. With --incremental, the previous package in the output directory is
+read first: files whose hash matches its manifest have their compressed bytes
+copied over unchanged, and only new or edited files are compressed. Since
+packaging is deterministic, the result is identical to a full rebuild.
+
+__pycache__, .git, node_modules, *.pyc and .DS_Store are always left out.
+More patterns can be listed in a .skillignore file in the skill folder, one
+per line, gitignore style:
+    # comments and blank lines are ignored
+    *.log           any file or folder named like this, at any depth
+    build/          a trailing slash matches folders only
+    /notes.md       a leading slash (or any inner slash) anchors to the skill folder
 """
 
+import fnmatch
+import hashlib
+import json
+import os
+import struct
 import sys
 import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from quick_validate import validate_skill
 
+IGNORE_FILE = ".skillignore"
+DEFAULT_IGNORES = ["__pycache__/", ".git/", "node_modules/", "*.pyc", ".DS_Store", IGNORE_FILE]
+
+# Formats whose contents are already compressed; deflating them again only costs time
+STORED_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".heic",
+    ".woff", ".woff2",
+    ".docx", ".xlsx", ".pptx", ".odt", ".ods", ".odp",
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z", ".jar", ".whl", ".skill",
+    ".mp3", ".mp4", ".m4a", ".mov", ".webm", ".ogg",
+}
+
+COMPRESSION_LEVEL = 9
+# 1980-01-01 00:00:00, the earliest date a zip entry can carry
+ZIP_DOS_TIME = 0
+ZIP_DOS_DATE = (0 << 9) | (1 << 5) | 1
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+# Without zip64 records, sizes and offsets are 32-bit and the entry count 16-bit
+ZIP_MAX_SIZE = 0xFFFFFFFF
+ZIP_MAX_ENTRIES = 0xFFFF
+ZIP_MAX_COMMENT = 0xFFFF
+# Files read or encoded at a time per compression thread, which bounds memory use
+IN_FLIGHT_PER_WORKER = 2
+
+# Bump when the encoding of entries changes, so older packages are not reused
+MANIFEST_VERSION = 1
+# Truncated SHA-256; plenty to notice an edited file and keeps the manifest in the zip comment
+MANIFEST_HASH_CHARS = 16
+
+
+def load_ignore_patterns(skill_path):
+    """
+    Read the ignore patterns for a skill folder.
+
+    Args:
+        skill_path: Path to the skill folder
+
+    Returns:
+        List of patterns: the defaults followed by the lines of .skillignore
+    """
+    patterns = list(DEFAULT_IGNORES)
+    ignore_file = skill_path / IGNORE_FILE
+    if ignore_file.is_file():
+        for line in ignore_file.read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if line and not line.startswith("#"):
+                patterns.append(line)
+    return patterns
+
+
+def is_ignored(rel_path, is_dir, patterns):
+    """Check a path relative to the skill folder (posix separators) against the ignore patterns."""
+    name = rel_path.rsplit("/", 1)[-1]
+    for pattern in patterns:
+        if pattern.endswith("/"):
+            if not is_dir:
+                continue
+            pattern = pattern.rstrip("/")
+        if "/" in pattern:
+            if fnmatch.fnmatchcase(rel_path, pattern.lstrip("/")):
+                return True
+        elif fnmatch.fnmatchcase(name, pattern):
+            return True
+    return False
+
+
+def collect_files(skill_path, patterns):
+    """
+    List the files to package, skipping ignored files and never entering ignored folders.
+
+    Returns:
+        Sorted list of (relative posix path, Path) tuples
+    """
+    files = []
+    for dirpath, dirnames, filenames in os.walk(skill_path):
+        rel_dir = Path(dirpath).relative_to(skill_path).as_posix()
+        prefix = "" if rel_dir == "." else rel_dir + "/"
+        dirnames[:] = [d for d in dirnames if not is_ignored(prefix + d, True, patterns)]
+        for filename in filenames:
+            rel_path = prefix + filename
+            file_path = Path(dirpath) / filename
+            if file_path.is_file() and not is_ignored(rel_path, False, patterns):
+                files.append((rel_path, file_path))
+    files.sort()
+    return files
+
+
+def read_previous_package(skill_filename, skill_name):
+    """
+    Read the manifest of an earlier package of the same skill.
+
+    Returns:
+        Dict of relative path -> (content hash, ZipInfo) for the entries that can be reused,
+        empty if there is no package or it has no usable manifest
+    """
+    try:
+        with zipfile.ZipFile(skill_filename) as zipf:
+            manifest = json.loads(zipf.comment.decode("utf-8"))
+            infos = {info.filename: info for info in zipf.infolist()}
+    except (OSError, zipfile.BadZipFile, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get("manifest") != MANIFEST_VERSION \
+            or manifest.get("level") != COMPRESSION_LEVEL:
+        return {}
+
+    previous = {}
+    for rel_path, digest in manifest.get("files", {}).items():
+        info = infos.get(f"{skill_name}/{rel_path}")
+        if info is not None:
+            previous[rel_path] = (digest, info)
+    return previous
+
+
+def read_raw_entry(skill_filename, info):
+    """Read an entry's encoded bytes from a zip file without decompressing them."""
+    with open(skill_filename, "rb") as f:
+        f.seek(info.header_offset)
+        header = f.read(30)
+        name_length, extra_length = struct.unpack("<2H", header[26:30])
+        f.seek(name_length + extra_length, os.SEEK_CUR)
+        return f.read(info.compress_size)
 
-def package_skill(skill_path, output_dir=None):
+
+def encode_entry(file_path, previous=None):
+    """
+    Read a file and encode it for the archive.
+
+    Args:
+        file_path: Path of the file
+        previous: Optional (archive path, content hash, ZipInfo) of the same file in the last package;
+            its compressed bytes are reused if the content hash still matches
+
+    Returns:
+        Dict with method, data, crc, size, executable, digest and reused
+    """
+    raw = file_path.read_bytes()
+    entry = {
+        "digest": hashlib.sha256(raw).hexdigest()[:MANIFEST_HASH_CHARS],
+        "executable": os.access(file_path, os.X_OK),
+        "size": len(raw),
+        "reused": False,
+    }
+
+    if previous is not None and previous[1] == entry["digest"]:
+        archive_path, _, info = previous
+        entry.update(method=info.compress_type, data=read_raw_entry(archive_path, info), crc=info.CRC,
+                     reused=True)
+        return entry
+
+    entry["crc"] = zlib.crc32(raw)
+    if file_path.suffix.lower() not in STORED_EXTENSIONS and raw:
+        compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, -15)
+        data = compressor.compress(raw) + compressor.flush()
+        if len(data) < len(raw):
+            entry.update(method=ZIP_DEFLATED, data=data)
+            return entry
+    entry.update(method=ZIP_STORED, data=raw)
+    return entry
+
+
+def encode_in_order(executor, jobs, window):
+    """
+    Encode files on a thread pool, keeping at most `window` of them in memory at a time.
+
+    Args:
+        executor: ThreadPoolExecutor to run encode_entry on
+        jobs: List of (file path, previous entry or None) tuples
+        window: Number of files submitted ahead of the one being written
+
+    Returns:
+        Generator of encoded entries, in the order of jobs
+    """
+    pending = deque()
+    for job in jobs:
+        if len(pending) >= window:
+            yield pending.popleft().result()
+        pending.append(executor.submit(encode_entry, *job))
+    while pending:
+        yield pending.popleft().result()
+
+
+def build_manifest(digests):
+    """Encode the manifest for the zip comment, or return empty bytes if it does not fit."""
+    manifest = {"manifest": MANIFEST_VERSION, "level": COMPRESSION_LEVEL, "files": digests}
+    comment = json.dumps(manifest, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return comment if len(comment) <= ZIP_MAX_COMMENT else b""
+
+
+class DeterministicZipWriter:
+    """
+    Writes a zip file from already encoded entries, with fixed timestamps and permissions.
+
+    zip64 is not written: an archive over 4 GB or with more than 65535 files raises ValueError.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.central = []
+
+    def add(self, arcname, method, data, crc, size, executable=False):
+        """Append one entry whose data is already encoded with method."""
+        if len(self.central) >= ZIP_MAX_ENTRIES:
+            raise ValueError(f"{arcname}: packages with more than {ZIP_MAX_ENTRIES} files are not supported")
+        if len(data) > ZIP_MAX_SIZE or size > ZIP_MAX_SIZE or self.f.tell() > ZIP_MAX_SIZE:
+            raise ValueError(f"{arcname}: packages over 4 GB are not supported")
+        name = arcname.encode("utf-8")
+        flags = 0x800 if not arcname.isascii() else 0
+        offset = self.f.tell()
+        self.f.write(struct.pack("<4s5H3L2H", b"PK\x03\x04", 20, flags, method, ZIP_DOS_TIME, ZIP_DOS_DATE,
+                                 crc, len(data), size, len(name), 0))
+        self.f.write(name)
+        self.f.write(data)
+        mode = 0o100755 if executable else 0o100644
+        self.central.append(struct.pack("<4s6H3L5H2L", b"PK\x01\x02", (3 << 8) | 20, 20, flags, method,
+                                        ZIP_DOS_TIME, ZIP_DOS_DATE, crc, len(data), size, len(name), 0, 0,
+                                        0, 0, mode << 16, offset) + name)
+
+    def close(self, comment=b""):
+        """Write the central directory and end record."""
+        start = self.f.tell()
+        for record in self.central:
+            self.f.write(record)
+        size = self.f.tell() - start
+        if start > ZIP_MAX_SIZE or size > ZIP_MAX_SIZE:
+            raise ValueError("packages over 4 GB are not supported")
+        self.f.write(struct.pack("<4s4H2LH", b"PK\x05\x06", 0, 0, len(self.central), len(self.central),
+                                 size, start, len(comment)))
+        self.f.write(comment)
+
+
+def package_skill(skill_path, output_dir=None, workers=None, incremental=False):
     """
     Package a skill folder into a .skill file.
 
     Args:
         skill_path: Path to the skill folder
         output_dir: Optional output directory for the .skill file (defaults to current directory)
+        workers: Optional number of compression threads (defaults to all cores)
+        incremental: Reuse the compressed entries of unchanged files from the previous package
 
     Returns:
         Path to the created .skill file, or None if error
@@ -63,42 +327,91 @@ def package_skill(skill_path, output_dir=None):
 
     skill_filename = output_path / f"{skill_name}.skill"
 
-    # Create the .skill file (zip format)
+    # Leave out ignored files, and the package itself when it is written inside the skill folder
+    patterns = load_ignore_patterns(skill_path)
+    files = [(rel_path, file_path) for rel_path, file_path in collect_files(skill_path, patterns)
+             if file_path.resolve() != skill_filename]
+
+    if len(files) > ZIP_MAX_ENTRIES:
+        print(f"❌ Error: {len(files)} files to package; a .skill file holds at most {ZIP_MAX_ENTRIES}")
+        return None
+
+    previous = {}
+    if incremental:
+        previous = read_previous_package(skill_filename, skill_name)
+        if not previous:
+            print("   No reusable previous package found; packaging everything\n")
+
+    # Create the .skill file (zip format); entries are encoded in parallel and written in path order
+    # as soon as they are ready, so only a few files are held in memory at once
+    tmp_filename = skill_filename.with_name(f"{skill_filename.name}.{os.getpid()}.tmp")
     try:
-        with zipfile.ZipFile(skill_filename, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # Walk through the skill directory
-            for file_path in skill_path.rglob('*'):
-                if file_path.is_file():
-                    # Calculate the relative path within the zip
-                    arcname = file_path.relative_to(skill_path.parent)
-                    zipf.write(file_path, arcname)
+        workers = max(1, workers or os.cpu_count() or 1)
+        stored = 0
+        reused = 0
+        digests = {}
+        jobs = [(file_path, (skill_filename, *previous[rel_path]) if rel_path in previous else None)
+                for rel_path, file_path in files]
+        with open(tmp_filename, "wb") as f, ThreadPoolExecutor(max_workers=workers) as executor:
+            writer = DeterministicZipWriter(f)
+            encoded = encode_in_order(executor, jobs, workers * IN_FLIGHT_PER_WORKER)
+            for (rel_path, _), entry in zip(files, encoded):
+                arcname = f"{skill_name}/{rel_path}"
+                writer.add(arcname, entry["method"], entry["data"], entry["crc"], entry["size"], entry["executable"])
+                digests[rel_path] = entry["digest"]
+                stored += entry["method"] == ZIP_STORED
+                reused += entry["reused"]
+                if entry["reused"]:
+                    print(f"  Unchanged: {arcname}")
+                elif entry["method"] == ZIP_STORED:
+                    print(f"  Added: {arcname} (stored)")
+                else:
                     print(f"  Added: {arcname}")
+            comment = build_manifest(digests)
+            writer.close(comment)
+        os.replace(tmp_filename, skill_filename)
 
         print(f"\n✅ Successfully packaged skill to: {skill_filename}")
+        print(f"   {len(files)} file(s), {stored} stored without compression"
+              + (f", {reused} reused from the previous package" if incremental else ""))
+        if not comment:
+            print("   Note: too many files for the manifest; --incremental will repackage everything next time")
         return skill_filename
 
     except Exception as e:
+        if tmp_filename.exists():
+            tmp_filename.unlink()
         print(f"❌ Error creating .skill file: {e}")
         return None
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python utils/package_skill.py <path/to/skill-folder> [output-directory]")
+    args = sys.argv[1:]
+    incremental = "--incremental" in args
+    args = [arg for arg in args if arg != "--incremental"]
+    workers = None
+    if "--workers" in args and args.index("--workers") + 1 < len(args):
+        i = args.index("--workers")
+        workers = int(args[i + 1])
+        args = args[:i] + args[i + 2:]
+
+    if len(args) < 1:
+        print("Usage: python utils/package_skill.py <path/to/skill-folder> [output-directory] [--workers N] "
+              "[--incremental]")
         print("\nExample:")
         print("  python utils/package_skill.py skills/public/my-skill")
         print("  python utils/package_skill.py skills/public/my-skill ./dist")
         sys.exit(1)
 
-    skill_path = sys.argv[1]
-    output_dir = sys.argv[2] if len(sys.argv) > 2 else None
+    skill_path = args[0]
+    output_dir = args[1] if len(args) > 1 else None
 
     print(f"📦 Packaging skill: {skill_path}")
     if output_dir:
         print(f"   Output directory: {output_dir}")
     print()
 
-    result = package_skill(skill_path, output_dir)
+    result = package_skill(skill_path, output_dir, workers, incremental)
 
     if result:
         sys.exit(0)
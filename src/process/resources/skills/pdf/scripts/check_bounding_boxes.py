@@ -5,16 +5,35 @@ Check bounding boxes in fields.json for intersections and minimum heights.
 Usage: python check_bounding_boxes.py <fields.json>
 
 Validates:
-- No label and entry bounding boxes intersect
-- Entry bounding boxes are tall enough for text (minimum 15px)
+- No label or entry bounding boxes on the same page intersect, whether they
+  belong to the same field or to different fields
+- Entry bounding boxes are at least as tall as their font size (default 14)
+
+All label and entry boxes are loaded into NumPy arrays once (box_arrays(),
+which create_validation_image.py shares). Heights are checked against each
+entry's font size in one vectorized comparison, and intersections are found
+per page with a sorted-interval pass along whichever axis leaves fewer
+candidate pairs, so machine-generated files with thousands of boxes validate
+in milliseconds. Output stops after MAX_ERRORS failures.
 """
 
 import json
+import os
 import sys
 
+from pdf_worker import call_worker
+
+DEFAULT_FONT_SIZE = 14
+MAX_ERRORS = 20
+BOX_KINDS = ('label', 'entry')
+LABEL, ENTRY = 0, 1
+
 
 def boxes_intersect(box1: list, box2: list) -> bool:
-    """Check if two bounding boxes [left, top, right, bottom] intersect."""
+    """Check if two bounding boxes [left, top, right, bottom] intersect.
+
+    Boxes that only touch at an edge do not intersect.
+    """
     if not box1 or not box2:
         return False
 
@@ -22,54 +41,173 @@ def boxes_intersect(box1: list, box2: list) -> bool:
     left2, top2, right2, bottom2 = box2
 
     # Check for no intersection
-    if right1 < left2 or right2 < left1:
+    if right1 <= left2 or right2 <= left1:
         return False
-    if bottom1 < top2 or bottom2 < top1:
+    if bottom1 <= top2 or bottom2 <= top1:
         return False
 
     return True
 
 
-def check_bounding_boxes(json_path: str) -> bool:
-    """Check bounding boxes for issues."""
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    errors = []
-    MIN_HEIGHT = 15  # Minimum height in pixels for text entry
+def box_arrays(form_fields: list) -> dict:
+    """Load the label and entry boxes of form_fields into NumPy arrays, one row per box.
 
-    form_fields = data.get('form_fields', [])
+    Returns "boxes" (n x 4 [left, top, right, bottom]), "pages", "kinds"
+    (LABEL or ENTRY) and "fields" (the index into form_fields) per box, and
+    "font_sizes" per field: the entry font size, or NaN without entry_text.
+    Rows are in field order, label before entry.
+    """
+    import numpy as np
 
+    boxes, pages, kinds, fields = [], [], [], []
+    font_sizes = np.full(len(form_fields), np.nan)
     for i, field in enumerate(form_fields):
-        label_box = field.get('label_bounding_box')
-        entry_box = field.get('entry_bounding_box')
-        description = field.get('description', f'Field {i}')
         page = field.get('page_number', 1)
+        for kind, name in enumerate(BOX_KINDS):
+            box = field.get(f'{name}_bounding_box')
+            if box:
+                boxes.append(box)
+                pages.append(page)
+                kinds.append(kind)
+                fields.append(i)
+        entry_text = field.get('entry_text')
+        if entry_text is not None:
+            font_sizes[i] = entry_text.get('font_size', DEFAULT_FONT_SIZE)
+
+    return {
+        'boxes': np.array(boxes, dtype=float).reshape(-1, 4),
+        'pages': np.array(pages, dtype=np.int64),
+        'kinds': np.array(kinds, dtype=np.int8),
+        'fields': np.array(fields, dtype=np.int64),
+        'font_sizes': font_sizes,
+    }
+
+
+def _sweep(starts, ends) -> tuple:
+    """Sort intervals by start and count, for each, the later intervals that start before it ends."""
+    import numpy as np
+
+    order = np.argsort(starts, kind='stable')
+    stop = np.searchsorted(starts[order], ends[order], side='left')
+    return order, np.maximum(stop - np.arange(len(order)) - 1, 0)
+
+
+def find_intersections(boxes):
+    """Return an (k, 2) array of index pairs (i, j), i < j, of intersecting boxes, sorted.
+
+    `boxes` is a sequence or n x 4 array of [left, top, right, bottom]. The
+    boxes are sorted by their start along one axis and each is paired only
+    with the boxes that start before it ends (found with searchsorted), so
+    the cost is O(n log n + k) for k candidates instead of O(n^2). The axis
+    with fewer candidates is used: rows of full-width fields overlap on x but
+    hardly at all on y.
+    """
+    import numpy as np
+
+    boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+    left, top, right, bottom = boxes.T
+    sweeps = [_sweep(left, right), _sweep(top, bottom)]
+    order, counts = min(sweeps, key=lambda sweep: sweep[1].sum())
+
+    # Expand each sorted position p into its candidates p+1 .. p+counts[p]
+    first = np.repeat(np.arange(len(order)), counts)
+    offsets = np.arange(len(first)) - np.repeat(np.cumsum(counts) - counts, counts)
+    a, b = order[first], order[first + 1 + offsets]
+
+    # Touching edges do not count
+    hit = (left[a] < right[b]) & (left[b] < right[a]) & (top[a] < bottom[b]) & (top[b] < bottom[a])
+    pairs = np.sort(np.stack([a[hit], b[hit]], axis=1), axis=1)
+    return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+
+def iter_bounding_box_messages(data: dict):
+    """Yield a FAILURE message for every bounding box problem in fields data."""
+    import numpy as np
 
-        # Check for intersection
-        if label_box and entry_box and boxes_intersect(label_box, entry_box):
-            errors.append(f"Page {page}: Label and entry boxes intersect for '{description}'")
-
-        # Check minimum height
-        if entry_box:
+    form_fields = data.get('form_fields', [])
+    arrays = box_arrays(form_fields)
+    boxes, kinds, fields = arrays['boxes'], arrays['kinds'], arrays['fields']
+
+    # NaN font sizes (no entry_text) never compare as too short
+    too_short = (kinds == ENTRY) & (boxes[:, 3] - boxes[:, 1] < arrays['font_sizes'][fields])
+
+    by_page = np.argsort(arrays['pages'], kind='stable')
+    page_values, page_starts = np.unique(arrays['pages'][by_page], return_index=True)
+    for page, rows in zip(page_values.tolist(), np.split(by_page, page_starts[1:])):
+        for a, b in rows[find_intersections(boxes[rows])].tolist():
+            index_a, index_b = int(fields[a]), int(fields[b])
+            field_a, field_b = form_fields[index_a], form_fields[index_b]
+            box_a = field_a[f'{BOX_KINDS[kinds[a]]}_bounding_box']
+            box_b = field_b[f'{BOX_KINDS[kinds[b]]}_bounding_box']
+            name_a = field_a.get('description', f'Field {index_a}')
+            name_b = field_b.get('description', f'Field {index_b}')
+            if index_a == index_b:
+                yield (f"FAILURE: Page {page}: intersection between label and entry bounding boxes "
+                       f"for '{name_a}' ({box_a}, {box_b})")
+            else:
+                yield (f"FAILURE: Page {page}: intersection between {BOX_KINDS[kinds[a]]} bounding box for "
+                       f"'{name_a}' ({box_a}) and {BOX_KINDS[kinds[b]]} bounding box for '{name_b}' ({box_b})")
+
+        for row in rows[too_short[rows]].tolist():
+            i = int(fields[row])
+            field = form_fields[i]
+            entry_box = field['entry_bounding_box']
+            font_size = field['entry_text'].get('font_size', DEFAULT_FONT_SIZE)
             height = entry_box[3] - entry_box[1]  # bottom - top
-            if height < MIN_HEIGHT:
-                errors.append(f"Page {page}: Entry box too short ({height}px < {MIN_HEIGHT}px) for '{description}'")
+            description = field.get('description', f'Field {i}')
+            yield (f"FAILURE: Page {page}: entry bounding box height ({height}) for '{description}' "
+                   f"is too short for font size {font_size}; increase the box height or decrease the font size")
 
-    if errors:
-        print("Bounding box errors found:")
-        for error in errors:
-            print(f"  ✗ {error}")
-        return False
-    else:
-        print("✓ All bounding boxes are valid")
-        return True
 
+def get_bounding_box_messages(fields_json_stream, max_errors: int = MAX_ERRORS) -> list:
+    """Validate fields JSON read from a stream and return report messages.
 
-if __name__ == "__main__":
-    if len(sys.argv) != 2:
+    Stops with an "Aborting" message after `max_errors` failures.
+    """
+    data = json.load(fields_json_stream)
+    messages = [f"Read {len(data.get('form_fields', []))} field(s)"]
+
+    failures = 0
+    for message in iter_bounding_box_messages(data):
+        if failures >= max_errors:
+            messages.append(f"Aborting after {max_errors} errors; fix the bounding boxes above and run again")
+            return messages
+        messages.append(message)
+        failures += 1
+
+    if failures == 0:
+        messages.append("SUCCESS: All bounding boxes are valid")
+    return messages
+
+
+def check_bounding_boxes(json_path: str) -> bool:
+    """Check bounding boxes for issues."""
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        print("Error: numpy is required. Install with: pip install numpy")
+        sys.exit(1)
+
+    with open(json_path, 'r', encoding='utf-8') as f:
+        messages = get_bounding_box_messages(f)
+
+    for message in messages:
+        print(message)
+    return not any(message.startswith("FAILURE") for message in messages)
+
+
+def main(argv: list = None) -> None:
+    """Command-line entry point; argv defaults to sys.argv[1:]."""
+    argv = sys.argv[1:] if argv is None else argv
+
+    if len(argv) != 1:
         print("Usage: python check_bounding_boxes.py <fields.json>")
         sys.exit(1)
 
-    valid = check_bounding_boxes(sys.argv[1])
+    response = call_worker('check_bounding_boxes', json_path=os.path.abspath(argv[0]))
+    valid = response['value'] if response else check_bounding_boxes(argv[0])
     sys.exit(0 if valid else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,7 @@ import io
 from check_bounding_boxes import get_bounding_box_messages
 
 
-# Currently this is not run automatically in CI; it's just for documentation and manual checking.
+# Run with `npm run test:pdf-skill`, or `python -m pytest` in this directory.
 class TestGetBoundingBoxMessages(unittest.TestCase):
 
     def create_json_stream(self, data):
@@ -221,6 +221,61 @@ class TestGetBoundingBoxMessages(unittest.TestCase):
         self.assertTrue(any("SUCCESS" in msg for msg in messages))
         self.assertFalse(any("FAILURE" in msg for msg in messages))
 
+    def test_font_size_per_field(self):
+        """Test that each entry box is checked against its own font size"""
+        data = {
+            "form_fields": [
+                {
+                    "description": "Small",
+                    "page_number": 1,
+                    "entry_bounding_box": [10, 10, 150, 20],  # Height is 10
+                    "entry_text": {"font_size": 8}
+                },
+                {
+                    "description": "Large",
+                    "page_number": 1,
+                    "entry_bounding_box": [10, 40, 150, 50],  # Height is 10
+                    "entry_text": {"font_size": 12}
+                }
+            ]
+        }
+
+        stream = self.create_json_stream(data)
+        messages = get_bounding_box_messages(stream)
+        failures = [msg for msg in messages if "FAILURE" in msg]
+        self.assertEqual(len(failures), 1)
+        self.assertIn("'Large'", failures[0])
+
+    def test_many_stacked_rows(self):
+        """Test a long form of full-width rows, where only the last row overlaps another"""
+        fields = [
+            {
+                "description": f"Row{i}",
+                "page_number": 1,
+                "label_bounding_box": [10, i * 20, 100, i * 20 + 15],
+                "entry_bounding_box": [110, i * 20, 500, i * 20 + 15]
+            }
+            for i in range(2000)
+        ]
+        fields.append({
+            "description": "Stray",
+            "page_number": 1,
+            "label_bounding_box": [200, 105, 250, 112]  # Inside Row5's entry box
+        })
+
+        stream = self.create_json_stream({"form_fields": fields})
+        messages = get_bounding_box_messages(stream)
+        failures = [msg for msg in messages if "FAILURE" in msg]
+        self.assertEqual(len(failures), 1)
+        self.assertIn("'Row5'", failures[0])
+        self.assertIn("'Stray'", failures[0])
+
+    def test_no_fields(self):
+        """Test that an empty fields file is valid"""
+        stream = self.create_json_stream({"form_fields": []})
+        messages = get_bounding_box_messages(stream)
+        self.assertTrue(any("SUCCESS" in msg for msg in messages))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -4,24 +4,28 @@ Check if a PDF has fillable form fields.
 
 Usage: python check_fillable_fields.py <input.pdf>
 
-Returns exit code 0 if fillable fields found, 1 if not.
+Returns exit code 0 if fillable fields found, 1 if not. The field list comes
+from the form schema cache (form_schema.py), so checking a template seen
+before does not parse the PDF.
 """
 
+import os
 import sys
-from pypdf import PdfReader
+
+from form_schema import load_schema
+from pdf_worker import call_worker
 
 
 def check_fillable_fields(pdf_path: str) -> bool:
     """Check if PDF has fillable form fields."""
     try:
-        reader = PdfReader(pdf_path)
-        fields = reader.get_fields()
+        fields = [field for field in load_schema(pdf_path) if field['fillable']]
 
         if fields:
             print(f"Found {len(fields)} fillable form field(s):")
-            for name, field in fields.items():
-                field_type = field.get('/FT', 'Unknown')
-                print(f"  - {name}: {field_type}")
+            for field in fields:
+                field_type = field['_attrs'].get('/FT', 'Unknown')
+                print(f"  - {field['field_id']}: {field_type}")
             return True
         else:
             print("No fillable form fields found in this PDF.")
@@ -32,10 +36,18 @@ def check_fillable_fields(pdf_path: str) -> bool:
         return False
 
 
-if __name__ == "__main__":
-    if len(sys.argv) != 2:
+def main(argv: list = None) -> None:
+    """Command-line entry point; argv defaults to sys.argv[1:]."""
+    argv = sys.argv[1:] if argv is None else argv
+
+    if len(argv) != 1:
         print("Usage: python check_fillable_fields.py <input.pdf>")
         sys.exit(1)
 
-    has_fields = check_fillable_fields(sys.argv[1])
+    response = call_worker('check_fillable_fields', pdf_path=os.path.abspath(argv[0]))
+    has_fields = response['value'] if response else check_fillable_fields(argv[0])
     sys.exit(0 if has_fields else 1)
+
+
+if __name__ == "__main__":
+    main()
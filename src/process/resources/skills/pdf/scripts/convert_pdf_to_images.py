@@ -1,51 +1,171 @@
 #!/usr/bin/env python3
 """
-Convert PDF pages to PNG images.
+Convert PDF pages to images.
 
-Usage: python convert_pdf_to_images.py <input.pdf> <output_directory>
+Usage: python convert_pdf_to_images.py <input.pdf> <output_directory> [dpi]
+           [--pages 1-5,9] [--threads N] [--format png|jpeg|webp] [--quality Q]
 
-Creates one PNG image per page: page_1.png, page_2.png, etc.
+Creates one image per page: page_1.png, page_2.png, etc.
+
+Pages are rendered one at a time by a bounded pool of poppler processes and
+written as soon as they are ready, so peak memory stays at a few pages
+regardless of document length.
+
+Rendered pages are kept in a content-addressed cache (see render_cache.py), so
+converting an unchanged PDF again only costs a hash of the file. Pass
+--no-cache to always render.
 
 Dependencies: pip install pdf2image
 Also requires: poppler-utils (brew install poppler on macOS)
 """
 
+import argparse
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import pdf_events
+from pdf_io import page_range, select_pages
+from pdf_worker import call_worker
+from render_cache import RenderCache, evict
+
+FORMATS = {
+    'png': ('PNG', 'png'),
+    'jpeg': ('JPEG', 'jpg'),
+    'webp': ('WEBP', 'webp'),
+}
+
 
+def render_page(pdf_path: str, page_num: int, output_dir: str, dpi: int,
+                fmt: str = 'png', quality: int = 90) -> tuple:
+    """Render a single page with poppler and write it to disk."""
+    from pdf2image import convert_from_path
 
-def convert_pdf_to_images(pdf_path: str, output_dir: str, dpi: int = 150) -> None:
-    """Convert PDF pages to PNG images."""
+    pil_format, ext = FORMATS[fmt]
+    images = convert_from_path(pdf_path, dpi=dpi, first_page=page_num, last_page=page_num)
+    image = images[0]
+
+    output_path = os.path.join(output_dir, f"page_{page_num}.{ext}")
+    # Outputs left by older versions may be hard links into the render cache
+    if os.path.lexists(output_path):
+        os.unlink(output_path)
+    save_kwargs = {}
+    if pil_format == 'JPEG':
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        save_kwargs = {'quality': quality, 'optimize': True}
+    elif pil_format == 'WEBP':
+        save_kwargs = {'quality': quality}
+    image.save(output_path, pil_format, **save_kwargs)
+
+    size = (image.width, image.height)
+    image.close()
+    return output_path, size
+
+
+def convert_pdf_to_images(pdf_path: str, output_dir: str, dpi: int = 150, pages: str = None,
+                          threads: int = None, fmt: str = 'png', quality: int = 90,
+                          use_cache: bool = True) -> list:
+    """Convert PDF pages to images, returning the paths written in page order."""
     try:
-        from pdf2image import convert_from_path
+        from pdf2image import pdfinfo_from_path
     except ImportError:
         print("Error: pdf2image is required. Install with: pip install pdf2image")
         print("Also requires poppler: brew install poppler (macOS) or apt-get install poppler-utils (Linux)")
         sys.exit(1)
 
+    if fmt not in FORMATS:
+        print(f"Error: Unsupported format '{fmt}'. Choose from: {', '.join(FORMATS)}")
+        sys.exit(1)
+
     # Create output directory
     os.makedirs(output_dir, exist_ok=True)
 
+    _, ext = FORMATS[fmt]
+    cache = RenderCache(pdf_path) if use_cache else None
+
+    total_pages = cache.get_page_count() if cache else None
+    if total_pages is None:
+        total_pages = int(pdfinfo_from_path(pdf_path)['Pages'])
+        if cache:
+            cache.set_page_count(total_pages)
+    page_numbers = select_pages(pages, total_pages)
+    threads = max(1, threads or min(4, os.cpu_count() or 1))
+
     print(f"Converting {pdf_path} to images...")
 
-    # Convert PDF to images
-    images = convert_from_path(pdf_path, dpi=dpi)
+    # Reuse cached renders of this exact document
+    to_render = []
+    done_count = 0
+    for page_num in page_numbers:
+        output_path = os.path.join(output_dir, f"page_{page_num}.{ext}")
+        if cache and cache.fetch(page_num, dpi, ext, quality, output_path):
+            print(f"  Created: {output_path} (cached)")
+            done_count += 1
+            pdf_events.progress('render', done_count, len(page_numbers), page=page_num, cached=True)
+        else:
+            to_render.append(page_num)
 
-    for i, image in enumerate(images, start=1):
-        output_path = os.path.join(output_dir, f"page_{i}.png")
-        image.save(output_path, "PNG")
-        print(f"  Created: {output_path} ({image.width}x{image.height})")
+    # Keep at most `threads` pages in flight so memory does not grow with
+    # document length
+    pending = {}
+    remaining = iter(to_render)
+    with pdf_events.phase('render', pages=len(to_render)), ThreadPoolExecutor(max_workers=threads) as executor:
+        while True:
+            for page_num in remaining:
+                future = executor.submit(render_page, pdf_path, page_num, output_dir, dpi, fmt, quality)
+                pending[future] = page_num
+                if len(pending) >= threads:
+                    break
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                page_num = pending.pop(future)
+                output_path, (width, height) = future.result()
+                print(f"  Created: {output_path} ({width}x{height})")
+                done_count += 1
+                pdf_events.progress('render', done_count, len(page_numbers), page=page_num)
+                pdf_events.file_bytes('written', output_path)
+                if cache:
+                    cache.store(page_num, dpi, ext, quality, output_path)
 
-    print(f"\nConverted {len(images)} page(s) to {output_dir}")
+    if cache and to_render:
+        evict()
 
+    output_paths = [os.path.join(output_dir, f"page_{n}.{ext}") for n in page_numbers]
 
-if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: python convert_pdf_to_images.py <input.pdf> <output_directory> [dpi]")
-        sys.exit(1)
+    print(f"\nConverted {len(output_paths)} page(s) to {output_dir}")
+    return output_paths
 
-    pdf_path = sys.argv[1]
-    output_dir = sys.argv[2]
-    dpi = int(sys.argv[3]) if len(sys.argv) > 3 else 150
 
-    convert_pdf_to_images(pdf_path, output_dir, dpi)
+def main(argv: list = None) -> None:
+    """Command-line entry point; argv defaults to sys.argv[1:]."""
+    parser = argparse.ArgumentParser(description="Convert PDF pages to images.")
+    parser.add_argument('pdf_path', help="Input PDF file")
+    parser.add_argument('output_dir', help="Directory to write page images to")
+    parser.add_argument('dpi', nargs='?', type=int, default=150, help="Render resolution (default: 150)")
+    parser.add_argument('--pages', type=page_range, help="Pages to render, e.g. 1-5,9 (default: all)")
+    parser.add_argument('--threads', type=int, help="Number of concurrent poppler processes")
+    parser.add_argument('--format', dest='fmt', choices=sorted(FORMATS), default='png',
+                        help="Output image format (default: png)")
+    parser.add_argument('--quality', type=int, default=90, help="JPEG/WebP quality, 1-100 (default: 90)")
+    parser.add_argument('--no-cache', action='store_true', help="Always render, bypassing the render cache")
+    args = parser.parse_args(argv)
+
+    params = {
+        'pdf_path': os.path.abspath(args.pdf_path),
+        'output_dir': os.path.abspath(args.output_dir),
+        'dpi': args.dpi,
+        'pages': args.pages,
+        'threads': args.threads,
+        'fmt': args.fmt,
+        'quality': args.quality,
+        'use_cache': not args.no_cache,
+    }
+    if call_worker('convert_pdf_to_images', **params) is None:
+        convert_pdf_to_images(**params)
+
+
+if __name__ == "__main__":
+    main()
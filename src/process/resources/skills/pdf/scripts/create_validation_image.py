@@ -2,15 +2,33 @@
 """
 Create validation image with bounding box overlays.
 
-Usage: python create_validation_image.py <page_number> <fields.json> <input_image> <output_image>
+Usage:
+  python create_validation_image.py <page_number> <fields.json> <input_image> <output_image>
+  python create_validation_image.py --pdf <input.pdf> <fields.json> <output_dir> [threads] [--pages 1-5,9]
 
 Creates an image with:
 - Red rectangles for entry bounding boxes (where text will be entered)
 - Blue rectangles for label bounding boxes (label text areas)
+
+The --pdf mode validates every page in one command: fields.json is read once,
+each page is rendered in memory at the image size recorded in fields.json, and
+the annotated images (validation_page_1.png, ...) are written in parallel.
+No intermediate page PNGs are needed. --pages limits it to the selected
+pages; the others are never rendered. Only Pillow (and pdf2image for --pdf)
+is needed; the NumPy arrays of check_bounding_boxes.py are not used for
+drawing.
 """
 
 import json
+import os
 import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import pdf_events
+from check_bounding_boxes import BOX_KINDS, ENTRY
+from pdf_io import parse_pages, pop_pages_option
+from pdf_worker import call_worker
 
 try:
     from PIL import Image, ImageDraw
@@ -18,50 +36,153 @@ except ImportError:
     print("Error: Pillow is required. Install with: pip install Pillow")
     sys.exit(1)
 
+DEFAULT_DPI = 150
+
+
+def boxes_by_page(form_fields: list) -> dict:
+    """Group the label and entry boxes of form_fields by page as (box, kind) pairs, label before entry."""
+    pages = {}
+    for field in form_fields:
+        for kind, name in enumerate(BOX_KINDS):
+            box = field.get(f'{name}_bounding_box')
+            if box:
+                pages.setdefault(field.get('page_number', 1), []).append((box, kind))
+    return pages
+
+
+def draw_bounding_boxes(img, boxes: list) -> tuple:
+    """Draw entry (red) and label (blue) boxes from (box, kind) pairs onto an image.
+
+    Returns (entry count, label count).
+    """
+    draw = ImageDraw.Draw(img)
+    for box, kind in boxes:
+        draw.rectangle(box, outline='red' if kind == ENTRY else 'blue', width=2)
+
+    entry_count = sum(1 for _, kind in boxes if kind == ENTRY)
+    return entry_count, len(boxes) - entry_count
+
 
 def create_validation_image(page_num: int, json_path: str, input_path: str, output_path: str) -> None:
     """Create validation image with bounding box overlays."""
     # Load fields data
     with open(json_path, 'r', encoding='utf-8') as f:
         data = json.load(f)
+    boxes = boxes_by_page(data.get('form_fields', [])).get(page_num, [])
 
     # Open image
     img = Image.open(input_path)
-    draw = ImageDraw.Draw(img)
-
-    # Filter fields for this page
-    form_fields = data.get('form_fields', [])
-    page_fields = [f for f in form_fields if f.get('page_number', 1) == page_num]
-
-    # Draw bounding boxes
-    for field in page_fields:
-        # Draw entry box in red
-        entry_box = field.get('entry_bounding_box')
-        if entry_box:
-            left, top, right, bottom = entry_box
-            draw.rectangle([left, top, right, bottom], outline='red', width=2)
 
-        # Draw label box in blue
-        label_box = field.get('label_bounding_box')
-        if label_box:
-            left, top, right, bottom = label_box
-            draw.rectangle([left, top, right, bottom], outline='blue', width=2)
+    # Draw the boxes on this page
+    entry_count, label_count = draw_bounding_boxes(img, boxes)
 
     # Save output
     img.save(output_path)
     print(f"Created validation image: {output_path}")
-    print(f"  - Red boxes: {sum(1 for f in page_fields if f.get('entry_bounding_box'))} entry areas")
-    print(f"  - Blue boxes: {sum(1 for f in page_fields if f.get('label_bounding_box'))} label areas")
+    print(f"  - Red boxes: {entry_count} entry areas")
+    print(f"  - Blue boxes: {label_count} label areas")
 
 
-if __name__ == "__main__":
-    if len(sys.argv) != 5:
-        print("Usage: python create_validation_image.py <page_number> <fields.json> <input_image> <output_image>")
+def render_validation_page(pdf_path: str, page_num: int, page_info: dict, boxes: list, output_dir: str) -> tuple:
+    """Render one PDF page in memory, draw its boxes and save the result."""
+    from pdf2image import convert_from_path
+
+    # Render at the image size the bounding boxes were measured on
+    size = None
+    if page_info.get('image_width') and page_info.get('image_height'):
+        size = (int(page_info['image_width']), int(page_info['image_height']))
+    img = convert_from_path(pdf_path, dpi=DEFAULT_DPI, first_page=page_num, last_page=page_num,
+                            size=size)[0]
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+
+    entry_count, label_count = draw_bounding_boxes(img, boxes)
+    output_path = os.path.join(output_dir, f"validation_page_{page_num}.png")
+    img.save(output_path)
+    img.close()
+    return output_path, entry_count, label_count
+
+
+def create_validation_images(pdf_path: str, json_path: str, output_dir: str, threads: int = None,
+                             pages: str = None) -> list:
+    """Create validation images for every page with fields (or the selected pages), straight from the PDF."""
+    try:
+        import pdf2image  # noqa: F401
+    except ImportError:
+        print("Error: pdf2image is required. Install with: pip install pdf2image")
+        print("Also requires poppler: brew install poppler (macOS) or apt-get install poppler-utils (Linux)")
         sys.exit(1)
 
-    page_num = int(sys.argv[1])
-    json_path = sys.argv[2]
-    input_path = sys.argv[3]
-    output_path = sys.argv[4]
+    # Load fields data once
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    pages_info = {p['page_number']: p for p in data.get('pages', [])}
+    boxes = boxes_by_page(data.get('form_fields', []))
+
+    page_numbers = sorted(set(pages_info) | set(boxes))
+    if pages:
+        selected = set(parse_pages(pages, max(page_numbers, default=0)))
+        page_numbers = [page_num for page_num in page_numbers if page_num in selected]
+    os.makedirs(output_dir, exist_ok=True)
+    threads = max(1, threads or min(4, os.cpu_count() or 1))
+
+    def report(future) -> None:
+        output_path, entry_count, label_count = future.result()
+        output_paths.append(output_path)
+        print(f"Created validation image: {output_path} "
+              f"({entry_count} red entry boxes, {label_count} blue label boxes)")
+        pdf_events.progress('render', len(output_paths), len(page_numbers), path=output_path)
+
+    # Keep at most `threads` pages in flight so rendered images do not pile up
+    # on long documents; results are reported in page order
+    output_paths = []
+    pending = deque()
+    with pdf_events.phase('render', pages=len(page_numbers)), ThreadPoolExecutor(max_workers=threads) as executor:
+        for page_num in page_numbers:
+            if len(pending) >= threads:
+                report(pending.popleft())
+            pending.append(executor.submit(render_validation_page, pdf_path, page_num, pages_info.get(page_num, {}),
+                                           boxes.get(page_num, []), output_dir))
+        while pending:
+            report(pending.popleft())
+
+    print(f"\nCreated {len(output_paths)} validation image(s) in {output_dir}")
+    return output_paths
 
-    create_validation_image(page_num, json_path, input_path, output_path)
+
+def main(argv: list = None) -> None:
+    """Command-line entry point; argv defaults to sys.argv[1:]."""
+    argv = sys.argv[1:] if argv is None else argv
+    pages, argv = pop_pages_option(argv)
+
+    if len(argv) >= 4 and argv[0] == '--pdf':
+        params = {
+            'pdf_path': os.path.abspath(argv[1]),
+            'json_path': os.path.abspath(argv[2]),
+            'output_dir': os.path.abspath(argv[3]),
+            'threads': int(argv[4]) if len(argv) > 4 else None,
+            'pages': pages,
+        }
+        if call_worker('create_validation_images', **params) is None:
+            create_validation_images(**params)
+        sys.exit(0)
+
+    if len(argv) != 4:
+        print("Usage:")
+        print("  python create_validation_image.py <page_number> <fields.json> <input_image> <output_image>")
+        print("  python create_validation_image.py --pdf <input.pdf> <fields.json> <output_dir> [threads] [--pages 1-5,9]")
+        sys.exit(1)
+
+    params = {
+        'page_num': int(argv[0]),
+        'json_path': os.path.abspath(argv[1]),
+        'input_path': os.path.abspath(argv[2]),
+        'output_path': os.path.abspath(argv[3]),
+    }
+    if call_worker('create_validation_image', **params) is None:
+        create_validation_image(**params)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,98 +2,100 @@
 """
 Extract form field information from a fillable PDF.
 
-Usage: python extract_form_field_info.py <input.pdf> <output.json>
+Usage:
+  python extract_form_field_info.py <input.pdf> <output.json> [--pages 1-5,9]
+  python extract_form_field_info.py <input_dir> <index.jsonl> [--pages 1-5,9] [--workers N]
 
 Creates a JSON file with field information including:
 - field_id: unique identifier
 - page: page number (1-based)
 - rect: bounding box [left, bottom, right, top]
 - type: text, checkbox, radio_group, or choice
+- fillable: false for parent fields and fields without a widget, which are
+  listed so their ids can be looked up but cannot be filled
+
+Fields are found through the widget annotations of each page, so with --pages
+only the selected pages are read; the rest of a long form is never parsed.
+The schema of each document is cached by content hash (see form_schema.py),
+so extracting fields from a template seen before does not open the PDF.
+
+With a directory, every PDF under it (recursively) is read by a process pool
+and the results are written, in path order, to one JSONL index with a line
+per file:
+  {"path": "intake/a.pdf", "fillable": true, "field_count": 12, "fields": [...], "elapsed": 0.04}
+Non-fillable PDFs have "fillable": false and no fields. A file that cannot
+be read gets "fillable": null and an "error" message instead; the other files
+are unaffected.
 """
 
 import json
+import os
 import sys
-from pypdf import PdfReader
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pdf_events
+from form_schema import load_schema, public_fields
+from pdf_io import pop_pages_option
+from pdf_worker import call_worker
+
+
+def find_pdfs(root: str) -> list:
+    """Return the PDF files under root, recursively, in sorted path order."""
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        paths.extend(os.path.join(dirpath, name) for name in sorted(filenames) if name.lower().endswith('.pdf'))
+    return paths
+
+
+def _index_one(args: tuple) -> dict:
+    pdf_path, root, pages = args
+    start = time.perf_counter()
+    record = {"path": os.path.relpath(pdf_path, root)}
+    try:
+        fields = public_fields(load_schema(pdf_path, pages=pages))
+        record.update(fillable=any(field['fillable'] for field in fields), field_count=len(fields), fields=fields)
+    except Exception as e:
+        record.update(fillable=None, error=f"{type(e).__name__}: {e}")
+    record["elapsed"] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def index_form_fields(input_dir: str, output_path: str, pages: str = None, workers: int = None) -> dict:
+    """Classify and extract the fields of every PDF under input_dir into a JSONL index. Returns counts."""
+    jobs = [(path, input_dir, pages) for path in find_pdfs(input_dir)]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
+    chunksize = max(1, len(jobs) // (workers * 4))
+
+    counts = {"fillable": 0, "non_fillable": 0, "errors": 0}
+    with open(output_path, 'w', encoding='utf-8') as out, pdf_events.phase('index', files=len(jobs)), \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+        for done, record in enumerate(executor.map(_index_one, jobs, chunksize=chunksize), start=1):
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+            if record.get('error'):
+                counts["errors"] += 1
+                print(f"  Error reading {record['path']}: {record['error']}")
+            else:
+                counts["fillable" if record['fillable'] else "non_fillable"] += 1
+            pdf_events.progress('index', done, len(jobs), path=record['path'])
+    pdf_events.file_bytes('written', output_path)
 
+    print(f"Indexed {len(jobs)} PDF(s) to {output_path}: {counts['fillable']} fillable, "
+          f"{counts['non_fillable']} non-fillable, {counts['errors']} error(s)")
+    return counts
 
-def extract_form_fields(pdf_path: str, output_path: str) -> None:
-    """Extract form field information to JSON."""
-    reader = PdfReader(pdf_path)
-    fields_info = []
 
-    # Get form fields
-    fields = reader.get_fields()
-    if not fields:
-        print("No form fields found in this PDF.")
+def extract_form_fields(pdf_path: str, output_path: str, pages: str = None, workers: int = None) -> None:
+    """Extract form field information to JSON, or a JSONL index for a directory of PDFs."""
+    if os.path.isdir(pdf_path):
+        index_form_fields(pdf_path, output_path, pages, workers)
         return
 
-    for name, field in fields.items():
-        field_type = str(field.get('/FT', '/Tx'))
-        rect = field.get('/Rect', [0, 0, 0, 0])
-
-        # Determine page number
-        page_num = 1
-        if '/P' in field:
-            # Try to find page reference
-            for i, page in enumerate(reader.pages):
-                if page.indirect_reference == field['/P']:
-                    page_num = i + 1
-                    break
-
-        field_info = {
-            "field_id": name,
-            "page": page_num,
-            "rect": [float(x) for x in rect] if rect else [0, 0, 0, 0],
-        }
-
-        # Determine field type
-        if field_type == '/Btn':
-            # Check if checkbox or radio
-            if '/Ff' in field and (int(field.get('/Ff', 0)) & (1 << 15)):
-                field_info["type"] = "radio_group"
-                # Extract radio options
-                field_info["radio_options"] = []
-                if '/Kids' in field:
-                    for kid in field['/Kids']:
-                        kid_obj = kid.get_object() if hasattr(kid, 'get_object') else kid
-                        option_rect = kid_obj.get('/Rect', [0, 0, 0, 0])
-                        ap_dict = kid_obj.get('/AP', {})
-                        if '/N' in ap_dict:
-                            for key in ap_dict['/N'].keys():
-                                if key != '/Off':
-                                    field_info["radio_options"].append({
-                                        "value": key,
-                                        "rect": [float(x) for x in option_rect] if option_rect else None
-                                    })
-            else:
-                field_info["type"] = "checkbox"
-                # Get checked/unchecked values
-                field_info["checked_value"] = "/Yes"
-                field_info["unchecked_value"] = "/Off"
-                if '/AP' in field and '/N' in field['/AP']:
-                    for key in field['/AP']['/N'].keys():
-                        if key != '/Off':
-                            field_info["checked_value"] = key
-        elif field_type == '/Ch':
-            field_info["type"] = "choice"
-            # Extract choice options
-            options = field.get('/Opt', [])
-            field_info["choice_options"] = []
-            for opt in options:
-                if isinstance(opt, list):
-                    field_info["choice_options"].append({
-                        "value": str(opt[0]) if opt else "",
-                        "text": str(opt[1]) if len(opt) > 1 else str(opt[0])
-                    })
-                else:
-                    field_info["choice_options"].append({
-                        "value": str(opt),
-                        "text": str(opt)
-                    })
-        else:
-            field_info["type"] = "text"
-
-        fields_info.append(field_info)
+    fields_info = public_fields(load_schema(pdf_path, pages=pages))
+    if not fields_info:
+        print("No form fields found in this PDF." if not pages else f"No form fields found on pages {pages}.")
+        return
 
     # Write to JSON
     with open(output_path, 'w', encoding='utf-8') as f:
@@ -102,9 +104,31 @@ def extract_form_fields(pdf_path: str, output_path: str) -> None:
     print(f"Extracted {len(fields_info)} field(s) to {output_path}")
 
 
-if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python extract_form_field_info.py <input.pdf> <output.json>")
+def main(argv: list = None) -> None:
+    """Command-line entry point; argv defaults to sys.argv[1:]."""
+    argv = sys.argv[1:] if argv is None else argv
+
+    pages, argv = pop_pages_option(argv)
+    workers = None
+    if '--workers' in argv and argv.index('--workers') + 1 < len(argv):
+        i = argv.index('--workers')
+        workers = int(argv[i + 1])
+        argv = argv[:i] + argv[i + 2:]
+
+    if len(argv) != 2:
+        print("Usage: python extract_form_field_info.py <input.pdf> <output.json> [--pages 1-5,9]")
+        print("       python extract_form_field_info.py <input_dir> <index.jsonl> [--pages 1-5,9] [--workers N]")
         sys.exit(1)
 
-    extract_form_fields(sys.argv[1], sys.argv[2])
+    params = {
+        'pdf_path': os.path.abspath(argv[0]),
+        'output_path': os.path.abspath(argv[1]),
+        'pages': pages,
+        'workers': workers,
+    }
+    if call_worker('extract_form_fields', **params) is None:
+        extract_form_fields(**params)
+
+
+if __name__ == "__main__":
+    main()
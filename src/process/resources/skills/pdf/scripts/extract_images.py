@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Extract the images of a PDF into a directory.
+
+Usage: python extract_images.py <input.pdf> <output_dir> [--pages 1-5,9] [--workers N]
+
+JPEG (DCTDecode) and JPEG 2000 (JPXDecode) images are written byte for byte
+as .jpg and .jp2, with no decode or re-encode; transport filters in front of
+them (ASCII85, Flate and the like) are undone first. Other images are decoded with
+pypdf and saved as .png. Each file is named after a hash of its data and of
+the entries that affect how it is shown, with references such as an ICC
+colour space resolved, so the name never depends on object numbers or on
+the process that read it. An image used on many pages (a logo, a catalogue
+background) is written once; a file that already exists is not decoded
+again, which also makes re-running into the same directory cheap.
+
+Pages are walked by a process pool in chunks, each worker reading only the
+XObject dictionaries of its pages until it has to write an image. Images
+inside Form XObjects are included; inline images in content streams are not.
+output_dir/images.jsonl lists every image use in page order:
+  {"page": 3, "name": "/Im0", "file": "img_3f2a....jpg", "width": 1200, "height": 800,
+   "filter": "/DCTDecode", "bytes": 183220, "duplicate": false}
+
+Dependencies: pip install pypdf pillow
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pdf_events
+from pdf_io import iter_image_xobjects, open_reader, page_range, select_pages
+from pdf_worker import call_worker
+
+CHUNK_PAGES = 8
+# Filters whose encoded bytes are already a complete image file
+PASSTHROUGH = {'/DCTDecode': '.jpg', '/JPXDecode': '.jp2'}
+# Lossless filters that may wrap a JPEG or JPX stream
+TRANSPORT_FILTERS = ('/ASCII85Decode', '/ASCIIHexDecode', '/FlateDecode', '/LZWDecode', '/RunLengthDecode')
+# Dictionary entries that change how the same encoded bytes are shown
+HASHED_KEYS = ('/Width', '/Height', '/ColorSpace', '/BitsPerComponent', '/Decode', '/Filter', '/DecodeParms')
+
+# Per-worker reader, opened once by _init_worker
+_worker_reader = None
+
+
+def _init_worker(pdf_path: str) -> None:
+    global _worker_reader
+    _worker_reader = open_reader(pdf_path)
+
+
+def image_filter(stream) -> list:
+    """Return an image stream's filters as a list of names."""
+    filters = stream.get('/Filter')
+    if filters is None:
+        return []
+    filters = filters.get_object()
+    return [str(f) for f in filters] if isinstance(filters, list) else [str(filters)]
+
+
+def canonical(obj, stack: tuple = ()) -> str:
+    """Serialize a PDF object so that equal content gives equal text in any process.
+
+    References are resolved (a reference back into an object being serialized
+    is written as its object number), and streams contribute a hash of their
+    decoded data, so nothing depends on where or in which reader it was parsed.
+    """
+    from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+
+    if isinstance(obj, IndirectObject):
+        if (obj.idnum, obj.generation) in stack:
+            return f"R{obj.idnum}/{obj.generation}"
+        return canonical(obj.get_object(), stack + ((obj.idnum, obj.generation),))
+    if isinstance(obj, StreamObject):
+        entries = {key: value for key, value in obj.items() if key != '/Length'}
+        return f"stream({hashlib.sha256(obj.get_data()).hexdigest()},{canonical(DictionaryObject(entries), stack)})"
+    if isinstance(obj, DictionaryObject):
+        return "{" + ",".join(f"{key}:{canonical(obj.raw_get(key), stack)}" for key in sorted(obj)) + "}"
+    if isinstance(obj, ArrayObject):
+        return "[" + ",".join(canonical(item, stack) for item in obj) + "]"
+    return repr(obj)
+
+
+def image_hash(stream) -> str:
+    """Hash an image's data together with the entries that affect how it is shown and saved."""
+    digest = hashlib.sha256(stream.get_data())
+    for key in HASHED_KEYS:
+        if key in stream:
+            digest.update(f"{key}={canonical(stream.raw_get(key))}".encode())
+    return digest.hexdigest()
+
+
+def passthrough_extension(filters: list):
+    """Return .jpg or .jp2 if an image's encoded bytes are a JPEG or JPX file once unwrapped, else None."""
+    if filters and filters[-1] in PASSTHROUGH and set(filters[:-1]) <= set(TRANSPORT_FILTERS):
+        return PASSTHROUGH[filters[-1]]
+    return None
+
+
+def unwrap_transport(stream, filters: list) -> bytes:
+    """Undo the transport filters in front of an image's last filter, leaving its JPEG or JPX bytes."""
+    from pypdf import filters as pdf_filters
+
+    parms = stream.get('/DecodeParms')
+    parms = parms.get_object() if parms is not None else None
+    data = stream._data
+    for i, name in enumerate(filters[:-1]):
+        filter_parms = parms[i] if isinstance(parms, list) else parms
+        data = getattr(pdf_filters, name[1:]).decode(data, filter_parms.get_object() if filter_parms else None)
+    return data
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def extract_page_images(page, page_num: int, output_dir: str, written: set) -> list:
+    """Write the images of one page that are not in output_dir yet. Returns one record per image use."""
+    records = []
+    for key, ref in iter_image_xobjects(page.get('/Resources')):
+        stream = ref.get_object()
+        filters = image_filter(stream)
+        name = key if isinstance(key, str) else '/'.join(key)
+        record = {
+            "page": page_num,
+            "name": name,
+            "width": int(stream.get('/Width', 0)),
+            "height": int(stream.get('/Height', 0)),
+            "filter": filters[-1] if filters else None,
+        }
+        try:
+            digest = image_hash(stream)
+            ext = passthrough_extension(filters) or '.png'
+            file_name = f"img_{digest[:24]}{ext}"
+            path = os.path.join(output_dir, file_name)
+            record["file"] = file_name
+            if digest not in written and not os.path.exists(path):
+                if ext != '.png':
+                    _write_atomic(path, unwrap_transport(stream, filters))
+                else:
+                    image = page.images[key].image
+                    if image.mode not in ('1', 'L', 'LA', 'P', 'RGB', 'RGBA', 'I', 'I;16'):
+                        image = image.convert('RGB')
+                    tmp_path = f"{path}.{os.getpid()}.tmp"
+                    image.save(tmp_path, format='PNG')
+                    os.replace(tmp_path, path)
+            written.add(digest)
+            record["bytes"] = os.path.getsize(path)
+        except Exception as e:
+            record["error"] = str(e)
+        records.append(record)
+    return records
+
+
+def _extract_chunk(args: tuple) -> list:
+    page_numbers, output_dir = args
+    written = set()
+    records = []
+    for page_num in page_numbers:
+        try:
+            records.extend(extract_page_images(_worker_reader.pages[page_num - 1], page_num, output_dir, written))
+        except Exception as e:
+            records.append({"page": page_num, "error": str(e)})
+    return records
+
+
+def extract_images(pdf_path: str, output_dir: str, pages: str = None, workers: int = None) -> dict:
+    """Extract the images of a PDF into output_dir. Returns counts of image uses, files written and errors."""
+    try:
+        import pypdf  # noqa: F401
+    except ImportError:
+        print("Error: pypdf is required. Install with: pip install pypdf pillow")
+        sys.exit(1)
+
+    os.makedirs(output_dir, exist_ok=True)
+    total_pages = len(open_reader(pdf_path).pages)
+    page_numbers = select_pages(pages, total_pages)
+    chunks = [(page_numbers[i:i + CHUNK_PAGES], output_dir) for i in range(0, len(page_numbers), CHUNK_PAGES)]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(chunks) or 1))
+
+    counts = {"images": 0, "files": 0, "errors": 0}
+    seen_files = set()
+    done = 0
+    index_path = os.path.join(output_dir, 'images.jsonl')
+    with open(index_path, 'w', encoding='utf-8') as index, \
+            pdf_events.phase('extract', pages=len(page_numbers)), \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(pdf_path,)) as executor:
+        for (chunk_pages, _), records in zip(chunks, executor.map(_extract_chunk, chunks)):
+            for record in records:
+                if record.get('error'):
+                    counts["errors"] += 1
+                    print(f"  Error on page {record['page']} ({record.get('name', 'page')}): {record['error']}")
+                elif 'file' in record:
+                    counts["images"] += 1
+                    # Repeats across chunks (and files left by an earlier run) are only known here
+                    record["duplicate"] = record["file"] in seen_files
+                    seen_files.add(record["file"])
+                index.write(json.dumps(record) + '\n')
+            done += len(chunk_pages)
+            pdf_events.progress('extract', done, len(page_numbers), page=chunk_pages[-1])
+    counts["files"] = len(seen_files)
+
+    print(f"Extracted {counts['images']} image(s) ({counts['files']} unique file(s)) from {len(page_numbers)} "
+          f"page(s) to {output_dir}" + (f", {counts['errors']} error(s)" if counts['errors'] else ""))
+    return counts
+
+
+def main(argv: list = None) -> None:
+    """Command-line entry point; argv defaults to sys.argv[1:]."""
+    parser = argparse.ArgumentParser(description="Extract the images of a PDF into a directory.")
+    parser.add_argument('pdf_path', help="Input PDF file")
+    parser.add_argument('output_dir', help="Directory for the images and images.jsonl")
+    parser.add_argument('--pages', type=page_range, help="Pages to extract from, e.g. 1-5,9 (default: all)")
+    parser.add_argument('--workers', type=int, help="Number of worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    params = {
+        'pdf_path': os.path.abspath(args.pdf_path),
+        'output_dir': os.path.abspath(args.output_dir),
+        'pages': args.pages,
+        'workers': args.workers,
+    }
+    if call_worker('extract_images', **params) is None:
+        extract_images(**params)
+
+
+if __name__ == "__main__":
+    main()
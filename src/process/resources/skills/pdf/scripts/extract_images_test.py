@@ -0,0 +1,84 @@
+import unittest
+import os
+import tempfile
+from contextlib import redirect_stdout
+from io import BytesIO, StringIO
+
+from extract_images import extract_images, image_hash
+
+
+def create_icc_image_pdf(path, pages=3):
+    """Helper to write a PDF drawing one JPEG with an /ICCBased colour space on every page"""
+    from PIL import Image
+    from pypdf import PdfWriter
+    from pypdf.generic import (ArrayObject, DecodedStreamObject, DictionaryObject, NameObject, NumberObject)
+
+    jpeg = BytesIO()
+    Image.new('RGB', (40, 30), (200, 30, 30)).save(jpeg, format='JPEG')
+
+    writer = PdfWriter()
+    icc = DecodedStreamObject()
+    icc.set_data(b"not a real profile, only referenced")
+    icc[NameObject('/N')] = NumberObject(3)
+    icc_ref = writer._add_object(icc)
+
+    image = DecodedStreamObject()
+    image._data = jpeg.getvalue()
+    image.update({
+        NameObject('/Type'): NameObject('/XObject'),
+        NameObject('/Subtype'): NameObject('/Image'),
+        NameObject('/Width'): NumberObject(40),
+        NameObject('/Height'): NumberObject(30),
+        NameObject('/BitsPerComponent'): NumberObject(8),
+        NameObject('/ColorSpace'): ArrayObject([NameObject('/ICCBased'), icc_ref]),
+        NameObject('/Filter'): NameObject('/DCTDecode'),
+    })
+    image_ref = writer._add_object(image)
+
+    for _ in range(pages):
+        page = writer.add_blank_page(200, 200)
+        page[NameObject('/Resources')] = DictionaryObject({
+            NameObject('/XObject'): DictionaryObject({NameObject('/Im0'): image_ref}),
+        })
+        contents = DecodedStreamObject()
+        contents.set_data(b"q 40 0 0 30 10 10 cm /Im0 Do Q")
+        page[NameObject('/Contents')] = writer._add_object(contents)
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+# Run with `npm run test:pdf-skill`, or `python -m pytest` in this directory.
+class TestExtractImages(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pdf_path = os.path.join(self.tmp.name, "icc.pdf")
+        self.output_dir = os.path.join(self.tmp.name, "images")
+        create_icc_image_pdf(self.pdf_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hash_does_not_depend_on_reader(self):
+        """Test that two readers of the same file hash an ICCBased image the same way"""
+        from pypdf import PdfReader
+
+        readers = [PdfReader(self.pdf_path), PdfReader(self.pdf_path)]
+        hashes = {image_hash(reader.pages[0]['/Resources']['/XObject']['/Im0']) for reader in readers}
+        self.assertEqual(len(hashes), 1)
+
+    def test_rerun_writes_one_file(self):
+        """Test that extracting the same ICCBased image twice, with several workers, gives one file"""
+        for _ in range(2):
+            with redirect_stdout(StringIO()):
+                counts = extract_images(self.pdf_path, self.output_dir, workers=2)
+            self.assertEqual(counts["images"], 3)
+            self.assertEqual(counts["files"], 1)
+
+        images = [name for name in os.listdir(self.output_dir) if name.startswith('img_')]
+        self.assertEqual(len(images), 1)
+        self.assertTrue(images[0].endswith('.jpg'))
+
+
+if __name__ == '__main__':
+    unittest.main()
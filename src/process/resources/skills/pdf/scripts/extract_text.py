@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Extract text and tables from a PDF as one JSON line per page.
+
+Usage: python extract_text.py <input.pdf> [output.jsonl] [--pages 1-5,9] [--workers N] [--no-tables]
+
+Each line looks like:
+  {"page": 1, "text": "...", "layout_text": "...", "tables": [[["cell", ...], ...]]}
+
+Pages are extracted by a process pool and written in page order as soon as
+they are ready, so long reports can be read incrementally. Without an output
+file, lines go to stdout. With an output file, an interrupted run resumes
+from the pages already written; pages that failed are extracted again and
+their error lines replaced.
+
+Dependencies: pip install pdfplumber
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pdf_events
+from pdf_io import atomic_output, page_range, select_pages
+from pdf_worker import call_worker
+
+CHUNK_PAGES = 4
+
+# Per-worker document, opened once by _init_worker
+_worker_pdf = None
+
+
+def _init_worker(pdf_path: str) -> None:
+    global _worker_pdf
+    import pdfplumber
+    _worker_pdf = pdfplumber.open(pdf_path)
+
+
+def extract_page(page, include_tables: bool = True) -> dict:
+    """Extract plain text, layout-preserved text and tables from a pdfplumber page."""
+    record = {
+        "page": page.page_number,
+        "text": page.extract_text() or "",
+        "layout_text": page.extract_text(layout=True) or "",
+    }
+    if include_tables:
+        record["tables"] = page.extract_tables()
+    # Release cached layout objects; pdfplumber keeps them per page otherwise
+    page.close()
+    return record
+
+
+def _extract_chunk(args: tuple) -> list:
+    page_numbers, include_tables = args
+    lines = []
+    for page_num in page_numbers:
+        try:
+            record = extract_page(_worker_pdf.pages[page_num - 1], include_tables)
+        except Exception as e:
+            record = {"page": page_num, "error": str(e)}
+        lines.append(json.dumps(record, ensure_ascii=False))
+    return lines
+
+
+def completed_pages(output_path: str) -> set:
+    """Return pages already written to output_path, dropping a truncated last line.
+
+    Records of pages that failed are removed from the file, since those pages
+    are extracted again and would otherwise appear twice.
+    """
+    if not os.path.exists(output_path):
+        return set()
+
+    done = set()
+    failed = False
+    valid_bytes = 0
+    with open(output_path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if 'error' in record:
+                failed = True
+            else:
+                done.add(record['page'])
+            valid_bytes += len(line)
+
+    if failed:
+        # Keep only the good records; this also drops any partial last line
+        remaining = valid_bytes
+        with open(output_path, 'rb') as src, atomic_output(output_path) as dst:
+            for line in src:
+                if remaining <= 0:
+                    break
+                remaining -= len(line)
+                if 'error' not in json.loads(line):
+                    dst.write(line)
+    elif valid_bytes != os.path.getsize(output_path):
+        # Cut off a partial line left by an interrupted run
+        with open(output_path, 'r+b') as f:
+            f.truncate(valid_bytes)
+    return done
+
+
+def extract_text(pdf_path: str, output_path: str = None, pages: str = None, workers: int = None,
+                 include_tables: bool = True) -> int:
+    """Stream per-page JSON lines for a PDF. Returns the number of pages written."""
+    try:
+        import pdfplumber
+    except ImportError:
+        print("Error: pdfplumber is required. Install with: pip install pdfplumber", file=sys.stderr)
+        sys.exit(1)
+
+    pdf_events.file_bytes('read', pdf_path)
+    with pdfplumber.open(pdf_path) as pdf:
+        total_pages = len(pdf.pages)
+    page_numbers = select_pages(pages, total_pages)
+
+    if output_path:
+        done = completed_pages(output_path)
+        if done:
+            print(f"Resuming: {len(done)} page(s) already extracted", file=sys.stderr)
+        page_numbers = [n for n in page_numbers if n not in done]
+        out = open(output_path, 'a', encoding='utf-8')
+    else:
+        out = sys.stdout
+
+    chunks = [(page_numbers[i:i + CHUNK_PAGES], include_tables) for i in range(0, len(page_numbers), CHUNK_PAGES)]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(chunks) or 1))
+
+    written = 0
+    try:
+        with pdf_events.phase('extract', pages=len(page_numbers)), \
+                ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(pdf_path,)) as executor:
+            for (chunk_pages, _), lines in zip(chunks, executor.map(_extract_chunk, chunks)):
+                for line in lines:
+                    out.write(line + '\n')
+                    written += 1
+                # Flush per chunk so readers (and resume) see complete pages
+                out.flush()
+                pdf_events.progress('extract', written, len(page_numbers), page=chunk_pages[-1])
+    finally:
+        if out is not sys.stdout:
+            out.close()
+            pdf_events.file_bytes('written', output_path)
+
+    if output_path:
+        print(f"Extracted {written} page(s) to {output_path}", file=sys.stderr)
+    return written
+
+
+def main(argv: list = None) -> None:
+    """Command-line entry point; argv defaults to sys.argv[1:]."""
+    parser = argparse.ArgumentParser(description="Extract text and tables from a PDF as JSON lines.")
+    parser.add_argument('pdf_path', help="Input PDF file")
+    parser.add_argument('output_path', nargs='?', help="Output .jsonl file (default: stdout)")
+    parser.add_argument('--pages', type=page_range, help="Pages to extract, e.g. 1-5,9 (default: all)")
+    parser.add_argument('--workers', type=int, help="Number of worker processes (default: all cores)")
+    parser.add_argument('--no-tables', action='store_true', help="Skip table extraction")
+    args = parser.parse_args(argv)
+
+    params = {
+        'pdf_path': os.path.abspath(args.pdf_path),
+        'output_path': os.path.abspath(args.output_path) if args.output_path else None,
+        'pages': args.pages,
+        'workers': args.workers,
+        'include_tables': not args.no_tables,
+    }
+    if call_worker('extract_text', **params) is None:
+        extract_text(**params)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import unittest
+import json
+import os
+import tempfile
+from contextlib import redirect_stderr
+from io import StringIO
+
+from extract_text import extract_text
+
+
+# Run with `npm run test:pdf-skill`, or `python -m pytest` in this directory.
+class TestExtractTextResume(unittest.TestCase):
+
+    def setUp(self):
+        from reportlab.pdfgen import canvas
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pdf_path = os.path.join(self.tmp.name, "input.pdf")
+        self.output_path = os.path.join(self.tmp.name, "output.jsonl")
+        c = canvas.Canvas(self.pdf_path, pagesize=(612, 792))
+        for number in range(1, 4):
+            c.drawString(72, 700, f"Page {number}")
+            c.showPage()
+        c.save()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read_records(self):
+        """Helper to read the output file as a list of records"""
+        with open(self.output_path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_resume_retries_failed_page_once(self):
+        """Test that resuming replaces a failed page's record instead of adding a second line"""
+        with open(self.output_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"page": 1, "text": "Page 1", "layout_text": "Page 1", "tables": []}) + '\n')
+            f.write(json.dumps({"page": 2, "error": "simulated failure"}) + '\n')
+            f.write('{"page": 3, "te')
+
+        with redirect_stderr(StringIO()):
+            written = extract_text(self.pdf_path, self.output_path, workers=1)
+
+        records = self.read_records()
+        self.assertEqual(written, 2)
+        self.assertEqual(sorted(record["page"] for record in records), [1, 2, 3])
+        self.assertFalse(any("error" in record for record in records))
+        self.assertIn("Page 2", records[1]["text"])
+
+    def test_resume_without_failures(self):
+        """Test that a complete file is left as it is"""
+        with redirect_stderr(StringIO()):
+            extract_text(self.pdf_path, self.output_path, workers=1)
+            written = extract_text(self.pdf_path, self.output_path, workers=1)
+
+        self.assertEqual(written, 0)
+        self.assertEqual([record["page"] for record in self.read_records()], [1, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
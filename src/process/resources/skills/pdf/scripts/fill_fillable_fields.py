@@ -2,7 +2,11 @@
 """
 Fill fillable PDF form fields.
 
-Usage: python fill_fillable_fields.py <input.pdf> <field_values.json> <output.pdf>
+Usage:
+  python fill_fillable_fields.py <input.pdf> <field_values.json> <output.pdf> [--incremental | --flatten]
+           [--optimize fast|small|web]
+  python fill_fillable_fields.py <input.pdf> <values_dir> <output_dir> [--incremental | --flatten] [--workers N]
+           [--optimize fast|small|web]
 
 field_values.json format:
 [
@@ -15,68 +19,465 @@ field_values.json format:
     "value": "/On"
   }
 ]
+
+--incremental appends only the changed fields and their new appearances to a
+copy of the input (or to the input itself when output.pdf is the same file),
+instead of rewriting every page. Use it for large documents where only a few
+fields change.
+
+--flatten fills the fields, draws them and flattens the form in the same
+write, producing a final non-editable PDF: new appearances are generated only
+for the fields being filled, and the other widgets are drawn from the
+appearances they already have.
+
+With a directory of field_values files, one copy of the template is filled per
+file (output_dir/<values name>.pdf) by a process pool. Each worker parses the
+template once and reuses it for all of its copies.
+
+--optimize applies one of the shared output presets (pdf_optimize.py) to each
+full or flattened copy; it cannot be combined with --incremental, which never
+rewrites the original objects.
+
+Field ids are checked against the form schema cache (form_schema.py), so
+re-filling a known template skips walking its form, and only the pages that
+hold the filled fields are updated.
 """
 
+import glob
 import json
+import os
+import re
 import sys
-from pypdf import PdfReader, PdfWriter
+from concurrent.futures import ProcessPoolExecutor
+
+import pdf_events
+from form_schema import load_schema
+from pdf_io import IncrementalWriter, content_refs, drop_unreachable, open_reader
+from pdf_optimize import check_preset, pop_optimize_option, write_output
+from pdf_worker import call_worker
+
+DEFAULT_APPEARANCE = "/Helv 0 Tf 0 g"
+MULTILINE_FLAG = 1 << 12
+AUTO_FONT_SIZE_MAX = 12.0
+# The "/Helv 12 Tf" font operator inside a default appearance string
+FONT_OPERATOR = re.compile(r'/([^\s/]+)\s+([\d.]+)\s+Tf')
+
+
+def widget_refs(field_ref) -> list:
+    """Return references to a terminal field's widget annotations."""
+    field = field_ref.get_object()
+    if field.get('/Subtype') == '/Widget':
+        return [field_ref]
+    return list(field.get('/Kids', []))
+
+
+def escape_pdf_text(text: str) -> bytes:
+    """Encode text as a PDF literal string body for a WinAnsi font."""
+    data = text.encode('cp1252')
+    return data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)').replace(b'\r', b'\\r')
+
+
+def color_operator(components: list, stroke: bool) -> str:
+    """Return the gray, RGB or CMYK colour operator for a /MK colour array."""
+    ops = {1: 'g', 3: 'rg', 4: 'k'}
+    op = ops.get(len(components), 'g')
+    values = ' '.join(f"{float(c):g}" for c in components) or '0'
+    return f"{values} {op.upper() if stroke else op}"
+
+
+def get_font_ref(add, acroform, da: str, font_refs: dict):
+    """Return the /DR font named in a default appearance, adding Helvetica once if the form lacks it."""
+    from pypdf.generic import DictionaryObject, NameObject
+
+    match = FONT_OPERATOR.search(da)
+    name = match.group(1) if match else 'Helv'
+    if name not in font_refs:
+        fonts = acroform.get('/DR', {}).get('/Font', {})
+        font_refs[name] = fonts.raw_get(f'/{name}') if f'/{name}' in fonts else add(DictionaryObject({
+            NameObject('/Type'): NameObject('/Font'),
+            NameObject('/Subtype'): NameObject('/Type1'),
+            NameObject('/BaseFont'): NameObject('/Helvetica'),
+            NameObject('/Encoding'): NameObject('/WinAnsiEncoding'),
+        }))
+    return font_refs[name]
+
+
+def text_appearance(add, widget: dict, attrs: dict, value: str, font_ref):
+    """Build a normal appearance stream showing value inside the widget; add() stores it."""
+    from pypdf.generic import ArrayObject, DecodedStreamObject, DictionaryObject, FloatObject, NameObject
+
+    rect = [float(v) for v in widget['/Rect']]
+    width, height = abs(rect[2] - rect[0]), abs(rect[3] - rect[1])
+    da = str(widget.get('/DA') or attrs.get('/DA') or DEFAULT_APPEARANCE)
+    match = FONT_OPERATOR.search(da)
+    font_name, font_size = (match.group(1), float(match.group(2))) if match else ('Helv', 0.0)
+
+    multiline = int(attrs.get('/Ff', 0)) & MULTILINE_FLAG
+    if font_size == 0:
+        font_size = AUTO_FONT_SIZE_MAX if multiline else max(1.0, min(AUTO_FONT_SIZE_MAX, (height - 2) * 0.8))
+    da = FONT_OPERATOR.sub(f'/{font_name} {font_size:g} Tf', da) if match else f'/{font_name} {font_size:g} Tf {da}'
+
+    lines = value.splitlines() if multiline else [value.replace('\n', ' ')]
+    if multiline:
+        y = height - 2 - font_size
+    else:
+        y = (height - font_size) / 2 + font_size * 0.22
+    # Background and border from the widget's appearance characteristics
+    content = []
+    mk = widget.get('/MK', {})
+    if mk.get('/BG'):
+        content.append(f"q {color_operator(mk['/BG'], stroke=False)} 0 0 {width:g} {height:g} re f Q".encode())
+    border_width = float(widget.get('/BS', {}).get('/W', 1))
+    if mk.get('/BC') and border_width > 0:
+        inset = border_width / 2
+        content.append(f"q {color_operator(mk['/BC'], stroke=True)} {border_width:g} w {inset:g} {inset:g} "
+                       f"{width - border_width:g} {height - border_width:g} re S Q".encode())
+
+    content += [b"/Tx BMC", b"q", f"1 1 {width - 2:g} {height - 2:g} re W n".encode(), b"BT", da.encode('latin-1'),
+                f"2 {y:.2f} Td".encode(), f"{font_size * 1.2:.2f} TL".encode()]
+    for i, line in enumerate(lines or ['']):
+        content.append((b"T* " if i else b"") + b"(" + escape_pdf_text(line) + b") Tj")
+    content += [b"ET", b"Q", b"EMC"]
+
+    stream = DecodedStreamObject()
+    stream.set_data(b"\n".join(content))
+    stream.update({
+        NameObject('/Type'): NameObject('/XObject'),
+        NameObject('/Subtype'): NameObject('/Form'),
+        NameObject('/BBox'): ArrayObject([FloatObject(0), FloatObject(0), FloatObject(width), FloatObject(height)]),
+        NameObject('/Resources'): DictionaryObject({
+            NameObject('/Font'): DictionaryObject({NameObject(f'/{font_name}'): font_ref}),
+        }),
+    })
+    return add(stream)
+
+
+def fill_incremental(reader, fields: dict, values_dict: dict, input_path: str, output_path: str) -> int:
+    """Append the filled fields as an incremental update. Returns the number of bytes appended."""
+    from pypdf.generic import DictionaryObject, IndirectObject, NameObject, create_string_object
+
+    writer = IncrementalWriter(reader)
+    acroform = reader.trailer['/Root']['/AcroForm']
+    font_refs = {}
+
+    for name, value in values_dict.items():
+        if '_object' not in fields[name]:
+            raise ValueError(f"field {name} is not an indirect object")
+        field_ref = IndirectObject(*fields[name]['_object'], reader)
+        attrs = dict(fields[name]['_attrs'])
+        attrs.setdefault('/DA', acroform.get('/DA'))
+        field_type = attrs.get('/FT')
+
+        if field_type == '/Btn':
+            state = NameObject(str(value) if str(value).startswith('/') else f'/{value}')
+            writer.get(field_ref)[NameObject('/V')] = state
+            for ref in widget_refs(field_ref):
+                widget = writer.get(ref)
+                states = widget.get('/AP', {}).get('/N', {})
+                widget[NameObject('/AS')] = state if state in states else NameObject('/Off')
+        else:
+            text = str(value)
+            writer.get(field_ref)[NameObject('/V')] = create_string_object(text)
+            if field_type in ('/Tx', '/Ch'):
+                for ref in widget_refs(field_ref):
+                    widget = writer.get(ref)
+                    da = str(widget.get('/DA') or attrs.get('/DA') or DEFAULT_APPEARANCE)
+                    font_ref = get_font_ref(writer.add, acroform, da, font_refs)
+                    appearance = text_appearance(writer.add, widget, attrs, text, font_ref)
+                    widget[NameObject('/AP')] = DictionaryObject({NameObject('/N'): appearance})
+
+    return writer.write(input_path, output_path)
+
+
+def appearance_placement(appearance, rect: list) -> str:
+    """Return the cm operator that maps an appearance's /BBox (after its /Matrix) onto rect."""
+    a, b, c, d, e, f = [float(v) for v in appearance.get('/Matrix', [1, 0, 0, 1, 0, 0])]
+    x0, y0, x1, y1 = [float(v) for v in appearance['/BBox']]
+    corners = [(a * x + c * y + e, b * x + d * y + f) for x in (x0, x1) for y in (y0, y1)]
+    bx0, by0 = min(x for x, _ in corners), min(y for _, y in corners)
+    bx1, by1 = max(x for x, _ in corners), max(y for _, y in corners)
+    left, bottom, right, top = min(rect[0], rect[2]), min(rect[1], rect[3]), max(rect[0], rect[2]), max(rect[1], rect[3])
+    sx = (right - left) / (bx1 - bx0) if bx1 > bx0 else 1
+    sy = (top - bottom) / (by1 - by0) if by1 > by0 else 1
+    return f"{sx:g} 0 0 {sy:g} {left - bx0 * sx:g} {bottom - by0 * sy:g} cm"
+
+
+def fill_and_flatten(reader, fields: dict, values_dict: dict, output_path: str, optimize: str = None) -> int:
+    """Fill, draw and flatten the form in a single write. Returns the number of widgets drawn.
+
+    New appearances are built only for the filled text and choice fields (and
+    for text fields whose value has no appearance yet); every other widget is
+    drawn from its existing appearance. The widgets and the AcroForm are then
+    removed, so the output is no longer editable.
+    """
+    from pypdf import PdfWriter
+    from pypdf.generic import ArrayObject, DecodedStreamObject, DictionaryObject, NameObject, StreamObject
+
+    from form_schema import inherited, qualified_name, terminal_field_ref
+
+    writer = PdfWriter(clone_from=reader)
+    acroform = writer.root_object['/AcroForm']
+    add = writer._add_object
+    font_refs = {}
+    save_state = None
+    drawn = 0
+
+    for page_num in sorted({page_num for field in fields.values() for page_num in field['_pages']}):
+        page = writer.pages[page_num - 1]
+        draws = []
+        kept = ArrayObject()
+        for ref in page.get('/Annots') or []:
+            widget = ref.get_object()
+            if widget.get('/Subtype') != '/Widget':
+                kept.append(ref)
+                continue
+
+            # Hidden and NoView widgets are dropped without being drawn
+            if int(widget.get('/F', 0)) & (2 | 32) or '/Rect' not in widget:
+                continue
+            field = terminal_field_ref(ref).get_object()
+            name = qualified_name(field)
+            field_type = str(inherited(field, '/FT', '/Tx'))
+            ap = widget.get('/AP', {})
+            normal = ap.raw_get('/N') if '/N' in ap else None
+
+            if field_type == '/Btn':
+                if name in values_dict:
+                    state = str(values_dict[name])
+                    state = state if state.startswith('/') else f'/{state}'
+                else:
+                    state = widget.get('/AS', '/Off')
+                # Buttons keep one appearance per state; draw the selected one
+                states = normal.get_object() if normal is not None else None
+                if states is not None and not isinstance(states, StreamObject):
+                    state = state if state in states else '/Off'
+                    appearance = states.raw_get(state) if state in states else None
+                else:
+                    appearance = normal
+            elif name in values_dict or (normal is None and inherited(field, '/V')):
+                attrs = dict(fields[name]['_attrs']) if name in fields else {}
+                attrs.setdefault('/DA', acroform.get('/DA'))
+                text = str(values_dict[name]) if name in values_dict else str(inherited(field, '/V'))
+                da = str(widget.get('/DA') or attrs.get('/DA') or DEFAULT_APPEARANCE)
+                appearance = text_appearance(add, widget, attrs, text, get_font_ref(add, acroform, da, font_refs))
+            else:
+                appearance = normal
+            if appearance is None or '/BBox' not in appearance.get_object():
+                continue
 
+            resources = page.setdefault(NameObject('/Resources'), DictionaryObject()).get_object()
+            xobjects = resources.setdefault(NameObject('/XObject'), DictionaryObject()).get_object()
+            xobject_name = f"/AionFlat{drawn}"
+            while xobject_name in xobjects:
+                xobject_name += "_"
+            xobjects[NameObject(xobject_name)] = appearance
+            draws.append(f"q {appearance_placement(appearance.get_object(), [float(v) for v in widget['/Rect']])} "
+                         f"{xobject_name} Do Q")
+            drawn += 1
 
-def fill_form_fields(input_path: str, values_path: str, output_path: str) -> None:
-    """Fill PDF form fields with values from JSON."""
-    # Load field values
+        if kept:
+            page[NameObject('/Annots')] = kept
+        elif '/Annots' in page:
+            del page['/Annots']
+        if draws:
+            if save_state is None:
+                save_state = DecodedStreamObject()
+                save_state.set_data(b"q\n")
+                save_state = add(save_state)
+            draw = DecodedStreamObject()
+            draw.set_data(("\nQ\n" + "\n".join(draws) + "\n").encode())
+            page[NameObject('/Contents')] = ArrayObject([save_state] + content_refs(page) + [add(draw)])
+
+    # Drop the AcroForm and the now unreachable field and widget dictionaries
+    del writer.root_object['/AcroForm']
+    drop_unreachable(writer)
+    write_output(writer, output_path, optimize)
+    return drawn
+
+
+def invalid_field_ids(fields: dict, values_dict: dict) -> list:
+    """Return the field ids in values_dict that the form does not have, or has but cannot fill."""
+    return [field_id for field_id in values_dict if not fields.get(field_id, {}).get('fillable')]
+
+
+def fill_document(reader, input_path: str, fields: dict, values_dict: dict, output_path: str,
+                  incremental: bool = False, flatten: bool = False, optimize: str = None) -> str:
+    """Write one filled copy of the form and return the summary line."""
+    from pypdf import PdfWriter
+
+    if flatten:
+        with pdf_events.phase('flatten', fields=len(values_dict)):
+            drawn = fill_and_flatten(reader, fields, values_dict, output_path, optimize)
+        return f"Successfully filled {len(values_dict)} field(s), flattened {drawn} widget(s) and saved to {output_path}"
+
+    if incremental:
+        try:
+            with pdf_events.phase('fill', fields=len(values_dict), incremental=True):
+                appended = fill_incremental(reader, fields, values_dict, input_path, output_path)
+        except ValueError as e:
+            # Appearances are written with a WinAnsi font; fall back for other text
+            print(f"Note: incremental save not possible ({e}); writing a full copy instead")
+        else:
+            return (f"Successfully filled {len(values_dict)} field(s) and saved to {output_path} "
+                    f"(incremental update, {appended} bytes appended)")
+
+    with pdf_events.phase('fill', fields=len(values_dict)):
+        # Clone the document so the AcroForm comes along; the reader may be shared
+        writer = PdfWriter(clone_from=reader)
+
+        # Update fields on the pages that hold them
+        pages = sorted({page_num for name in values_dict for page_num in fields[name]['_pages']})
+        for page_num in pages:
+            writer.update_page_form_field_values(
+                writer.pages[page_num - 1],
+                values_dict,
+                auto_regenerate=False
+            )
+
+    # Write output
+    with pdf_events.phase('write'):
+        write_output(writer, output_path, optimize)
+
+    return f"Successfully filled {len(values_dict)} field(s) and saved to {output_path}"
+
+
+def load_values(values_path: str) -> dict:
+    """Load a field_values.json file into a field id -> value dictionary."""
     with open(values_path, 'r', encoding='utf-8') as f:
         field_values = json.load(f)
+    return {item['field_id']: item['value'] for item in field_values}
 
-    # Create a dictionary for quick lookup
-    values_dict = {item['field_id']: item['value'] for item in field_values}
 
-    reader = PdfReader(input_path)
-    writer = PdfWriter()
+# Per-worker template, opened once by _init_batch_worker
+_batch_template = None
+
+
+def _init_batch_worker(input_path: str) -> None:
+    global _batch_template
+    reader = open_reader(input_path)
+    _batch_template = (reader, {field['field_id']: field for field in load_schema(input_path, reader)})
+
+
+def _fill_batch_one(args: tuple) -> tuple:
+    input_path, values_path, output_path, incremental, flatten, optimize = args
+    reader, fields = _batch_template
+    try:
+        values_dict = load_values(values_path)
+        invalid = invalid_field_ids(fields, values_dict)
+        if invalid:
+            return values_path, None, f"invalid field ids: {', '.join(invalid)}"
+        return values_path, fill_document(reader, input_path, fields, values_dict, output_path,
+                                          incremental, flatten, optimize), None
+    except Exception as e:
+        return values_path, None, str(e)
+
 
-    # Copy pages
-    for page in reader.pages:
-        writer.add_page(page)
+def fill_batch(input_path: str, values_dir: str, output_dir: str, incremental: bool = False,
+               flatten: bool = False, workers: int = None, optimize: str = None) -> int:
+    """Fill the template once per *.json values file in values_dir. Returns the number of files written."""
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [(input_path, path, os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0] + '.pdf'),
+             incremental, flatten, optimize)
+            for path in sorted(glob.glob(os.path.join(values_dir, '*.json')))]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
 
-    # Get existing fields
-    fields = reader.get_fields()
-    if not fields:
+    # Cache the schema before the pool starts so no worker walks the form
+    load_schema(input_path)
+
+    written = 0
+    with pdf_events.phase('batch', files=len(jobs)), \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                initargs=(input_path,)) as executor:
+        for done, (values_path, message, error) in enumerate(executor.map(_fill_batch_one, jobs), start=1):
+            if error:
+                print(f"  Error filling from {values_path}: {error}")
+            else:
+                written += 1
+                print(f"  {message}")
+            pdf_events.progress('batch', done, len(jobs), path=values_path, error=error)
+
+    print(f"\nFilled {written} of {len(jobs)} cop(ies) of {input_path} into {output_dir}")
+    return written
+
+
+def fill_form_fields(input_path: str, values_path: str, output_path: str, incremental: bool = False,
+                     flatten: bool = False, workers: int = None, optimize: str = None) -> None:
+    """Fill PDF form fields with values from JSON, or one copy per values file in a directory."""
+    if incremental and flatten:
+        print("Error: --incremental and --flatten cannot be combined")
+        sys.exit(1)
+    if incremental and optimize:
+        print("Error: --incremental and --optimize cannot be combined")
+        sys.exit(1)
+
+    if os.path.isdir(values_path):
+        fill_batch(input_path, values_path, output_path, incremental, flatten, workers, optimize)
+        return
+
+    # Create a dictionary for quick lookup
+    values_dict = load_values(values_path)
+
+    reader = open_reader(input_path)
+
+    # Get existing fields, from the schema cache for a template seen before
+    fields = {field['field_id']: field for field in load_schema(input_path, reader)}
+    if not any(field['fillable'] for field in fields.values()):
         print("Error: No fillable fields found in the PDF.")
         sys.exit(1)
 
     # Validate field IDs
-    valid_fields = set(fields.keys())
-    invalid_fields = []
-    for field_id in values_dict.keys():
-        if field_id not in valid_fields:
-            invalid_fields.append(field_id)
-
+    invalid_fields = invalid_field_ids(fields, values_dict)
     if invalid_fields:
         print(f"Error: The following field IDs are not valid:")
         for f in invalid_fields:
             print(f"  - {f}")
         print(f"\nValid field IDs are:")
-        for f in sorted(valid_fields):
+        for f in sorted(name for name, field in fields.items() if field['fillable']):
             print(f"  - {f}")
         sys.exit(1)
 
-    # Update fields
-    writer.update_page_form_field_values(
-        writer.pages[0],
-        values_dict,
-        auto_regenerate=False
-    )
-
-    # Write output
-    with open(output_path, 'wb') as f:
-        writer.write(f)
+    try:
+        print(fill_document(reader, input_path, fields, values_dict, output_path, incremental, flatten, optimize))
+    except ValueError as e:
+        # Flattened appearances use a WinAnsi font, so other text cannot be drawn
+        print(f"Error: {e}")
+        sys.exit(1)
 
-    print(f"Successfully filled {len(values_dict)} field(s) and saved to {output_path}")
 
+def main(argv: list = None) -> None:
+    """Command-line entry point; argv defaults to sys.argv[1:]."""
+    argv = sys.argv[1:] if argv is None else argv
+    incremental = '--incremental' in argv
+    flatten = '--flatten' in argv
+    argv = [arg for arg in argv if arg not in ('--incremental', '--flatten')]
+    workers = None
+    if '--workers' in argv and argv.index('--workers') + 1 < len(argv):
+        i = argv.index('--workers')
+        workers = int(argv[i + 1])
+        argv = argv[:i] + argv[i + 2:]
+    optimize, argv = pop_optimize_option(argv)
 
-if __name__ == "__main__":
-    if len(sys.argv) != 4:
-        print("Usage: python fill_fillable_fields.py <input.pdf> <field_values.json> <output.pdf>")
+    if len(argv) != 3:
+        print("Usage: python fill_fillable_fields.py <input.pdf> <field_values.json> <output.pdf> "
+              "[--incremental | --flatten] [--optimize fast|small|web]")
+        print("       python fill_fillable_fields.py <input.pdf> <values_dir> <output_dir> "
+              "[--incremental | --flatten] [--workers N] [--optimize fast|small|web]")
         sys.exit(1)
+    if optimize:
+        check_preset(optimize)
+
+    params = {
+        'input_path': os.path.abspath(argv[0]),
+        'values_path': os.path.abspath(argv[1]),
+        'output_path': os.path.abspath(argv[2]),
+        'incremental': incremental,
+        'flatten': flatten,
+        'workers': workers,
+        'optimize': optimize,
+    }
+    if call_worker('fill_form_fields', **params) is None:
+        fill_form_fields(**params)
 
-    fill_form_fields(sys.argv[1], sys.argv[2], sys.argv[3])
+
+if __name__ == "__main__":
+    main()
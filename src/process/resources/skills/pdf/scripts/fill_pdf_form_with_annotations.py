@@ -2,7 +2,8 @@
 """
 Fill PDF form using text annotations (for non-fillable PDFs).
 
-Usage: python fill_pdf_form_with_annotations.py <input.pdf> <fields.json> <output.pdf>
+Usage: python fill_pdf_form_with_annotations.py <input.pdf> <fields.json> <output.pdf> [--incremental] [--pages 1-5,9]
+           [--optimize fast|small|web]
 
 fields.json format:
 {
@@ -22,41 +23,58 @@ fields.json format:
     }
   ]
 }
+
+--incremental appends each annotated page's overlay as a Form XObject to a
+copy of the input (or to the input itself when output.pdf is the same file).
+Only the pages that have fields are touched; the rest of the document,
+including page images, is not rewritten.
+
+--pages only annotates fields on the selected pages; fields on other pages
+are skipped before their overlays are drawn.
+
+--optimize applies one of the shared output presets (pdf_optimize.py) to the
+full copy; it cannot be combined with --incremental.
 """
 
 import json
+import os
 import sys
+from collections import defaultdict
+from io import BytesIO
 
-try:
-    from pypdf import PdfReader, PdfWriter
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.pagesizes import letter
-    from reportlab.lib.colors import HexColor
-    from io import BytesIO
-except ImportError as e:
-    print(f"Error: Required library missing. Install with: pip install pypdf reportlab")
-    print(f"Details: {e}")
-    sys.exit(1)
+import pdf_events
+from pdf_io import IncrementalWriter, content_refs, open_reader, parse_pages, pop_pages_option
+from pdf_optimize import check_preset, pop_optimize_option, write_output
+from pdf_worker import call_worker
 
 
-def fill_form_with_annotations(input_path: str, json_path: str, output_path: str) -> None:
-    """Fill PDF form using text annotations."""
-    # Load fields data
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+def group_fields_by_page(form_fields: list) -> dict:
+    """Group form fields by page number in a single pass."""
+    fields_by_page = defaultdict(list)
+    for field in form_fields:
+        fields_by_page[field.get('page_number', 1)].append(field)
+    return fields_by_page
 
-    reader = PdfReader(input_path)
-    writer = PdfWriter()
 
-    # Get page dimensions from PDF or JSON
-    pages_info = {p['page_number']: p for p in data.get('pages', [])}
+def build_overlay(pages: list, fields_by_page: dict, pages_info: dict) -> BytesIO:
+    """Render the annotations for every page into one multi-page overlay PDF.
 
-    # Process each page
-    for page_num, page in enumerate(reader.pages, start=1):
-        # Get page dimensions
-        page_box = page.mediabox
-        page_width = float(page_box.width)
-        page_height = float(page_box.height)
+    `pages` is a list of (page_number, page_width, page_height) tuples for the
+    pages that have fields. Overlay pages are emitted in the same order.
+    """
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.colors import HexColor
+
+    packet = BytesIO()
+    c = canvas.Canvas(packet)
+    colors = {}
+    black = HexColor('#000000')
+
+    for page_num, page_width, page_height in pages:
+        c.setPageSize((page_width, page_height))
+        # reportlab resets the graphics state on every showPage
+        current_font_size = None
+        current_color = None
 
         # Get image dimensions from JSON for coordinate conversion
         page_info = pages_info.get(page_num, {})
@@ -67,65 +85,184 @@ def fill_form_with_annotations(input_path: str, json_path: str, output_path: str
         scale_x = page_width / img_width
         scale_y = page_height / img_height
 
-        # Get fields for this page
-        page_fields = [f for f in data.get('form_fields', [])
-                       if f.get('page_number', 1) == page_num]
-
-        if page_fields:
-            # Create overlay with annotations
-            packet = BytesIO()
-            c = canvas.Canvas(packet, pagesize=(page_width, page_height))
-
-            for field in page_fields:
-                entry_box = field.get('entry_bounding_box')
-                entry_text = field.get('entry_text', {})
+        for field in fields_by_page[page_num]:
+            entry_box = field.get('entry_bounding_box')
+            entry_text = field.get('entry_text', {})
 
-                if entry_box and entry_text:
-                    # Convert image coordinates to PDF coordinates
-                    # Note: PDF y=0 is at bottom, image y=0 is at top
-                    left = entry_box[0] * scale_x
-                    top = entry_box[1] * scale_y
-                    right = entry_box[2] * scale_x
-                    bottom = entry_box[3] * scale_y
+            if entry_box and entry_text:
+                # Convert image coordinates to PDF coordinates
+                # Note: PDF y=0 is at bottom, image y=0 is at top
+                left = entry_box[0] * scale_x
+                bottom = entry_box[3] * scale_y
 
-                    # PDF y is from bottom
-                    pdf_y = page_height - bottom
+                # PDF y is from bottom
+                pdf_y = page_height - bottom
 
-                    text = entry_text.get('text', '')
-                    font_size = entry_text.get('font_size', 12)
-                    font_color = entry_text.get('font_color', '000000')
+                text = entry_text.get('text', '')
+                font_size = entry_text.get('font_size', 12)
+                font_color = entry_text.get('font_color', '000000')
 
-                    # Set font and color
-                    c.setFont('Helvetica', font_size)
+                # Reuse colour objects across fields and pages
+                color = colors.get(font_color)
+                if color is None:
                     try:
-                        c.setFillColor(HexColor(f'#{font_color}'))
+                        color = HexColor(f'#{font_color}')
                     except ValueError:
-                        c.setFillColor(HexColor('#000000'))
+                        color = black
+                    colors[font_color] = color
+
+                # Only emit font and colour operators when they change
+                if font_size != current_font_size:
+                    c.setFont('Helvetica', font_size)
+                    current_font_size = font_size
+                if color is not current_color:
+                    c.setFillColor(color)
+                    current_color = color
+
+                # Draw text
+                c.drawString(left, pdf_y, text)
+
+        c.showPage()
+
+    c.save()
+    packet.seek(0)
+    return packet
+
+
+def merge_overlays_incremental(reader, overlay_reader, overlay_index: dict, input_path: str,
+                               output_path: str) -> int:
+    """Append each overlay page as a Form XObject drawn over its page. Returns bytes appended."""
+    from pypdf.generic import ArrayObject, DictionaryObject, NameObject
+
+    writer = IncrementalWriter(reader)
 
-                    # Draw text
-                    c.drawString(left, pdf_y, text)
+    # The original content is wrapped in q ... Q so its graphics state cannot leak
+    save_state = writer.add_stream(b"q\n")
+    memo = {}
 
-            c.save()
-            packet.seek(0)
+    for page_num, index in overlay_index.items():
+        overlay = overlay_reader.pages[index]
+        # Fonts are shared by all overlay pages; the memo copies each one once
+        overlay_fonts = writer.import_object(overlay['/Resources'].raw_get('/Font'), memo)
 
-            # Merge overlay with original page
-            overlay_reader = PdfReader(packet)
-            overlay_page = overlay_reader.pages[0]
-            page.merge_page(overlay_page)
+        form = writer.add_stream(overlay.get_contents().get_data(), {
+            NameObject('/Type'): NameObject('/XObject'),
+            NameObject('/Subtype'): NameObject('/Form'),
+            NameObject('/BBox'): overlay.mediabox,
+            NameObject('/Resources'): DictionaryObject({NameObject('/Font'): overlay_fonts}),
+        })
 
-        writer.add_page(page)
+        page = writer.get(reader.pages[page_num - 1].indirect_reference)
+        xobjects = writer.get_entry(writer.page_resources(page), '/XObject')
+        name = f"/AionFill{page_num}"
+        while name in xobjects:
+            name += "_"
+        xobjects[NameObject(name)] = form
+
+        draw = writer.add_stream(f"\nQ\nq {name} Do Q\n".encode())
+        page[NameObject('/Contents')] = ArrayObject([save_state] + content_refs(page) + [draw])
+
+    return writer.write(input_path, output_path)
+
+
+def fill_form_with_annotations(input_path: str, json_path: str, output_path: str, incremental: bool = False,
+                               pages: str = None, optimize: str = None) -> None:
+    """Fill PDF form using text annotations."""
+    if incremental and optimize:
+        print("Error: --incremental and --optimize cannot be combined")
+        sys.exit(1)
+
+    # Imported here so the CLI can forward to a running worker without loading them
+    try:
+        from pypdf import PdfReader, PdfWriter
+        import reportlab  # noqa: F401
+    except ImportError as e:
+        print(f"Error: Required library missing. Install with: pip install pypdf reportlab")
+        print(f"Details: {e}")
+        sys.exit(1)
+
+    # Load fields data
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    reader = open_reader(input_path)
+
+    # Get page dimensions from PDF or JSON
+    pages_info = {p['page_number']: p for p in data.get('pages', [])}
+    form_fields = data.get('form_fields', [])
+    if pages:
+        selected = set(parse_pages(pages, len(reader.pages)))
+        form_fields = [field for field in form_fields if field.get('page_number', 1) in selected]
+    fields_by_page = group_fields_by_page(form_fields)
+
+    # Collect dimensions of the pages that need an overlay
+    overlay_pages = []
+    for page_num in sorted(fields_by_page):
+        if 1 <= page_num <= len(reader.pages):
+            page_box = reader.pages[page_num - 1].mediabox
+            overlay_pages.append((page_num, float(page_box.width), float(page_box.height)))
+
+    # Render and parse all overlays once
+    overlay_reader = None
+    if overlay_pages:
+        with pdf_events.phase('overlay', pages=len(overlay_pages)):
+            overlay_reader = PdfReader(build_overlay(overlay_pages, fields_by_page, pages_info))
+    overlay_index = {page_num: i for i, (page_num, _, _) in enumerate(overlay_pages)}
+    total_fields = len(form_fields)
+
+    if incremental:
+        try:
+            with pdf_events.phase('merge', pages=len(overlay_index), incremental=True):
+                appended = merge_overlays_incremental(reader, overlay_reader, overlay_index, input_path,
+                                                      output_path)
+        except ValueError as e:
+            print(f"Note: incremental save not possible ({e}); writing a full copy instead")
+        else:
+            print(f"Successfully added {total_fields} annotation(s) and saved to {output_path} "
+                  f"(incremental update, {appended} bytes appended)")
+            return
+
+    # Merge overlays into the copied pages; the reader may be shared
+    writer = PdfWriter()
+    with pdf_events.phase('merge', pages=len(overlay_index)):
+        for page_num, page in enumerate(reader.pages, start=1):
+            writer_page = writer.add_page(page)
+            if page_num in overlay_index:
+                writer_page.merge_page(overlay_reader.pages[overlay_index[page_num]])
 
     # Write output
-    with open(output_path, 'wb') as f:
-        writer.write(f)
+    with pdf_events.phase('write'):
+        write_output(writer, output_path, optimize)
 
-    total_fields = len(data.get('form_fields', []))
     print(f"Successfully added {total_fields} annotation(s) and saved to {output_path}")
 
 
-if __name__ == "__main__":
-    if len(sys.argv) != 4:
-        print("Usage: python fill_pdf_form_with_annotations.py <input.pdf> <fields.json> <output.pdf>")
+def main(argv: list = None) -> None:
+    """Command-line entry point; argv defaults to sys.argv[1:]."""
+    argv = sys.argv[1:] if argv is None else argv
+    incremental = '--incremental' in argv
+    argv = [arg for arg in argv if arg != '--incremental']
+    pages, argv = pop_pages_option(argv)
+    optimize, argv = pop_optimize_option(argv)
+
+    if len(argv) != 3:
+        print("Usage: python fill_pdf_form_with_annotations.py <input.pdf> <fields.json> <output.pdf> "
+              "[--incremental] [--pages 1-5,9] [--optimize fast|small|web]")
         sys.exit(1)
+    if optimize:
+        check_preset(optimize)
+
+    params = {
+        'input_path': os.path.abspath(argv[0]),
+        'json_path': os.path.abspath(argv[1]),
+        'output_path': os.path.abspath(argv[2]),
+        'incremental': incremental,
+        'pages': pages,
+        'optimize': optimize,
+    }
+    if call_worker('fill_form_with_annotations', **params) is None:
+        fill_form_with_annotations(**params)
+
 
-    fill_form_with_annotations(sys.argv[1], sys.argv[2], sys.argv[3])
+if __name__ == "__main__":
+    main()
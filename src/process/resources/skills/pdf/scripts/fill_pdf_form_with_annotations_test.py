@@ -0,0 +1,80 @@
+import unittest
+import json
+import os
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+from fill_pdf_form_with_annotations import fill_form_with_annotations
+
+
+def create_inherited_resources_pdf(path):
+    """Helper to write a two-page PDF whose pages inherit /Resources from the page tree"""
+    from pypdf import PdfReader, PdfWriter
+    from pypdf.generic import NameObject
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(path, pagesize=(612, 792))
+    for number in (1, 2):
+        c.setFont("Helvetica", 12)
+        c.drawString(72, 700, f"Original text on page {number}")
+        c.showPage()
+    c.save()
+
+    writer = PdfWriter(clone_from=PdfReader(path))
+    resources = writer.pages[0]['/Resources']
+    for page in writer.pages:
+        del page[NameObject('/Resources')]
+    writer._root_object['/Pages'][NameObject('/Resources')] = resources
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+# Run with `npm run test:pdf-skill`, or `python -m pytest` in this directory.
+class TestIncrementalFillInheritedResources(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.tmp.name, "inherited.pdf")
+        self.json_path = os.path.join(self.tmp.name, "fields.json")
+        self.output_path = os.path.join(self.tmp.name, "filled.pdf")
+        create_inherited_resources_pdf(self.input_path)
+        with open(self.json_path, 'w') as f:
+            json.dump({
+                "pages": [{"page_number": 1, "image_width": 612, "image_height": 792}],
+                "form_fields": [{
+                    "page_number": 1,
+                    "description": "Name",
+                    "entry_bounding_box": [100, 125, 280, 142],
+                    "entry_text": {"text": "Johnson", "font_size": 12},
+                }],
+            }, f)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_inherited_resources_are_kept(self):
+        """Test that the overlay XObject is added next to the fonts the page inherits"""
+        from pypdf import PdfReader
+
+        with redirect_stdout(StringIO()):
+            fill_form_with_annotations(self.input_path, self.json_path, self.output_path, incremental=True)
+
+        reader = PdfReader(self.output_path)
+        # Look at the page objects as stored; reader.pages copies inherited attributes onto them
+        stored = [kid.get_object() for kid in reader.trailer['/Root']['/Pages']['/Kids']]
+        self.assertIn('/Font', stored[0]['/Resources'])
+        self.assertIn('/XObject', stored[0]['/Resources'])
+        self.assertNotIn('/Resources', stored[1])
+
+        resources = reader.pages[0]['/Resources']
+        self.assertIn('/Font', resources)
+        self.assertIn('/XObject', resources)
+        text = reader.pages[0].extract_text()
+        self.assertIn("Original text on page 1", text)
+        self.assertIn("Johnson", text)
+        self.assertIn("Original text on page 2", reader.pages[1].extract_text())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,250 @@
+"""
+Form field schemas, cached by document content hash.
+
+The forms workflow checks, extracts and fills the same blank template many
+times. load_schema() walks a document's widget annotations once and stores
+the resulting schema (field ids, types, pages, rects, radio and choice
+options, checked values) under the SHA-256 of the file. Later calls on
+identical bytes read the schema back without opening the PDF, and any edit
+changes the hash, so a stale schema is never used.
+
+Fields without a widget on any page, and non-terminal parent fields (such
+as "address" above "address.street"), cannot be filled but are still listed
+when the whole document is walked, with "fillable": false, the page of their
+/P entry (default 1) and their own /Rect if any; every other record has
+"fillable": true. With a page selection only fields with widgets on those
+pages are returned.
+
+Besides the fields written by extract_form_field_info.py, each cached record
+keeps a few private keys (prefixed with "_") for the fill step: the field's
+object number, the pages its widgets are on and its inherited /FT, /Ff and
+/DA. Object numbers are stable for a given file, so the fill can go straight
+to the field objects.
+
+Entries live in $PDF_FORM_CACHE_DIR if set, otherwise in
+$XDG_CACHE_HOME/aionui-pdf/forms (~/.cache/aionui-pdf/forms).
+"""
+
+import json
+import os
+
+import pdf_events
+from pdf_io import open_reader, select_pages
+from render_cache import get_cache_root, hash_file
+
+# Bump when the record layout changes so older entries are ignored
+SCHEMA_VERSION = 2
+RADIO_FLAG = 1 << 15
+
+
+def get_cache_dir() -> str:
+    """Return the form schema cache directory."""
+    return os.environ.get('PDF_FORM_CACHE_DIR') or os.path.join(get_cache_root(), 'forms')
+
+
+def _cache_path(pdf_hash: str) -> str:
+    return os.path.join(get_cache_dir(), pdf_hash[:2], f"{pdf_hash}.json")
+
+
+def qualified_name(field) -> str:
+    """Return a field's fully qualified name, joining /T up the /Parent chain."""
+    parts = []
+    while field is not None:
+        if '/T' in field:
+            parts.append(str(field['/T']))
+        field = field.get('/Parent')
+    return '.'.join(reversed(parts))
+
+
+def inherited(field, key: str, default=None):
+    """Look up an inheritable field attribute such as /FT, /Ff or /Opt."""
+    while field is not None:
+        if key in field:
+            return field[key]
+        field = field.get('/Parent')
+    return default
+
+
+def iter_page_widgets(reader, page_numbers: list):
+    """Yield (page number, widget reference) for the form widgets on the selected pages only."""
+    for page_num in page_numbers:
+        for ref in reader.pages[page_num - 1].get('/Annots') or []:
+            if ref.get_object().get('/Subtype') == '/Widget':
+                yield page_num, ref
+
+
+def appearance_states(widget) -> list:
+    """Return a button widget's "on" appearance state names."""
+    return [str(key) for key in widget.get('/AP', {}).get('/N', {}) if key != '/Off']
+
+
+def terminal_field_ref(widget_ref):
+    """Return a reference to the field a widget belongs to; widgets without /T are kids of their field."""
+    widget = widget_ref.get_object()
+    if '/T' in widget or '/Parent' not in widget:
+        return widget_ref
+    return widget.raw_get('/Parent')
+
+
+def build_field_info(name: str, field, widgets: list, pages: list) -> dict:
+    """Describe one terminal field from its widgets, including the private keys used by the fill step."""
+    first = widgets[0]
+    field_type = str(inherited(first, '/FT', '/Tx'))
+    rect = field.get('/Rect')
+    field_info = {
+        "field_id": name,
+        "page": pages[0],
+        "rect": [float(x) for x in rect] if rect else [0, 0, 0, 0],
+        "fillable": True,
+    }
+
+    if field_type == '/Btn':
+        if int(inherited(first, '/Ff', 0)) & RADIO_FLAG:
+            field_info["type"] = "radio_group"
+            field_info["radio_options"] = [
+                {"value": value, "rect": [float(x) for x in widget['/Rect']] if widget.get('/Rect') else None}
+                for widget in widgets for value in appearance_states(widget)
+            ]
+        else:
+            field_info["type"] = "checkbox"
+            # Get checked/unchecked values
+            states = appearance_states(first)
+            field_info["checked_value"] = states[-1] if states else "/Yes"
+            field_info["unchecked_value"] = "/Off"
+    elif field_type == '/Ch':
+        field_info["type"] = "choice"
+        # Extract choice options
+        field_info["choice_options"] = []
+        for opt in inherited(first, '/Opt', []):
+            if isinstance(opt, list):
+                field_info["choice_options"].append({
+                    "value": str(opt[0]) if opt else "",
+                    "text": str(opt[1]) if len(opt) > 1 else str(opt[0])
+                })
+            else:
+                field_info["choice_options"].append({
+                    "value": str(opt),
+                    "text": str(opt)
+                })
+    else:
+        field_info["type"] = "text"
+
+    attrs = {}
+    for key in ('/FT', '/Ff', '/DA'):
+        value = inherited(field, key)
+        if value is not None:
+            attrs[key] = int(value) if key == '/Ff' else str(value)
+    field_info["_pages"] = pages
+    field_info["_attrs"] = attrs
+    return field_info
+
+
+def iter_field_tree(fields, seen: set = None):
+    """Yield a reference to every field in an /AcroForm /Fields array, parents before their kids."""
+    seen = set() if seen is None else seen
+    for ref in fields or []:
+        key = ref.idnum if hasattr(ref, 'idnum') else id(ref)
+        if key in seen:
+            continue
+        seen.add(key)
+        field = ref.get_object()
+        yield ref
+        # Kids without /T are the field's widgets, not fields of their own
+        kids = [kid for kid in field.get('/Kids') or [] if '/T' in kid.get_object()]
+        yield from iter_field_tree(kids, seen)
+
+
+def build_unfillable_info(name: str, field, page_num: int) -> dict:
+    """Describe a field that has no widget on any page, or only has kid fields, as not fillable."""
+    field_info = build_field_info(name, field, [field], [page_num])
+    field_info["fillable"] = False
+    field_info["_pages"] = []
+    return field_info
+
+
+def extract_schema(reader, page_numbers: list = None) -> list:
+    """Walk the widgets of the given pages (default: all) and describe each terminal field once."""
+    if not reader.trailer['/Root'].get('/AcroForm'):
+        return []
+
+    # Group widgets by terminal field; a field is reported on the first page it appears
+    whole_document = page_numbers is None
+    if whole_document:
+        page_numbers = select_pages(None, len(reader.pages))
+    fields = {}
+    for page_num, widget_ref in iter_page_widgets(reader, page_numbers):
+        field_ref = terminal_field_ref(widget_ref)
+        key = field_ref.idnum if hasattr(field_ref, 'idnum') else id(field_ref)
+        entry = fields.setdefault(key, {'ref': field_ref, 'widgets': [], 'pages': []})
+        entry['widgets'].append(widget_ref.get_object())
+        if page_num not in entry['pages']:
+            entry['pages'].append(page_num)
+
+    schema = []
+    for entry in fields.values():
+        field = entry['ref'].get_object()
+        field_info = build_field_info(qualified_name(field), field, entry['widgets'], entry['pages'])
+        if hasattr(entry['ref'], 'idnum'):
+            field_info["_object"] = [entry['ref'].idnum, entry['ref'].generation]
+        schema.append(field_info)
+
+    if whole_document:
+        page_index = {page.indirect_reference.idnum: number
+                      for number, page in enumerate(reader.pages, start=1) if page.indirect_reference}
+        for field_ref in iter_field_tree(reader.trailer['/Root']['/AcroForm'].get('/Fields')):
+            if not hasattr(field_ref, 'idnum') or field_ref.idnum in fields:
+                continue
+            field = field_ref.get_object()
+            page_ref = field.raw_get('/P') if '/P' in field else None
+            field_info = build_unfillable_info(qualified_name(field), field,
+                                               page_index.get(getattr(page_ref, 'idnum', None), 1))
+            field_info["_object"] = [field_ref.idnum, field_ref.generation]
+            schema.append(field_info)
+    return schema
+
+
+def public_fields(schema: list) -> list:
+    """Drop the private "_" keys, leaving the records extract_form_field_info.py writes."""
+    return [{key: value for key, value in field.items() if not key.startswith('_')} for field in schema]
+
+
+def load_schema(pdf_path: str, reader=None, pages: str = None) -> list:
+    """Return the form schema of pdf_path, from the cache when the file's bytes have been seen before.
+
+    With pages, only fields on the selected pages are returned. A cache miss
+    for a page selection walks just those pages and is not stored, so a
+    partial schema never stands in for the whole form.
+    """
+    pdf_hash = hash_file(pdf_path)
+    cache_path = _cache_path(pdf_hash)
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('version') == SCHEMA_VERSION:
+            schema = cached['fields']
+            if pages:
+                selected = set(select_pages(pages, cached['pages']))
+                schema = [dict(field, page=min(selected.intersection(field['_pages'])))
+                          for field in schema if selected.intersection(field['_pages'])]
+            pdf_events.emit('schema', cached=True, fields=len(schema))
+            return schema
+    except (OSError, ValueError, KeyError):
+        pass
+
+    with pdf_events.phase('schema'):
+        reader = reader or open_reader(pdf_path)
+        total_pages = len(reader.pages)
+        if pages:
+            return extract_schema(reader, select_pages(pages, total_pages))
+        schema = extract_schema(reader)
+
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': SCHEMA_VERSION, 'pages': total_pages, 'fields': schema}, f)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # The cache is an optimisation; never fail a command because of it
+        pass
+    return schema
@@ -0,0 +1,88 @@
+import unittest
+import os
+import tempfile
+from unittest import mock
+
+from form_schema import load_schema, public_fields
+from fill_fillable_fields import invalid_field_ids
+
+
+def create_form_pdf(path):
+    """Helper to write a one-page form with a widget field, a parent field and a field without a widget"""
+    from pypdf import PdfWriter
+    from pypdf.generic import ArrayObject, DictionaryObject, FloatObject, NameObject, TextStringObject
+
+    writer = PdfWriter()
+    page = writer.add_blank_page(612, 792)
+
+    def add_field(name, parent=None, widget=True):
+        field = DictionaryObject({
+            NameObject('/T'): TextStringObject(name),
+            NameObject('/FT'): NameObject('/Tx'),
+        })
+        if widget:
+            field.update({
+                NameObject('/Type'): NameObject('/Annot'),
+                NameObject('/Subtype'): NameObject('/Widget'),
+                NameObject('/Rect'): ArrayObject(FloatObject(v) for v in (100, 700, 300, 720)),
+                NameObject('/P'): page.indirect_reference,
+            })
+        if parent is not None:
+            field[NameObject('/Parent')] = parent
+        ref = writer._add_object(field)
+        if widget:
+            page.setdefault(NameObject('/Annots'), ArrayObject()).append(ref)
+        return ref
+
+    name = add_field("name")
+    address = writer._add_object(DictionaryObject({NameObject('/T'): TextStringObject("address")}))
+    street = add_field("street", parent=address)
+    address.get_object()[NameObject('/Kids')] = ArrayObject([street])
+    hidden = add_field("hidden", widget=False)
+
+    writer._root_object[NameObject('/AcroForm')] = DictionaryObject({
+        NameObject('/Fields'): ArrayObject([name, address, hidden]),
+    })
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+# Run with `npm run test:pdf-skill`, or `python -m pytest` in this directory.
+class TestFormSchema(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pdf_path = os.path.join(self.tmp.name, "form.pdf")
+        create_form_pdf(self.pdf_path)
+        patcher = mock.patch.dict(os.environ, {'PDF_FORM_CACHE_DIR': os.path.join(self.tmp.name, "cache")})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_unfillable_fields_are_listed(self):
+        """Test that parent fields and fields without a widget are listed as not fillable"""
+        for _ in range(2):  # Once walking the document, once from the cache
+            fields = {field['field_id']: field for field in public_fields(load_schema(self.pdf_path))}
+            self.assertEqual(set(fields), {"name", "address.street", "address", "hidden"})
+            self.assertTrue(fields["name"]["fillable"])
+            self.assertTrue(fields["address.street"]["fillable"])
+            self.assertFalse(fields["address"]["fillable"])
+            self.assertFalse(fields["hidden"]["fillable"])
+            self.assertEqual(fields["hidden"]["page"], 1)
+
+    def test_page_selection_lists_widget_fields_only(self):
+        """Test that fields without widgets are left out when only some pages are read"""
+        fields = load_schema(self.pdf_path, pages="1")
+        self.assertEqual({field['field_id'] for field in fields}, {"name", "address.street"})
+
+    def test_unfillable_field_ids_are_rejected(self):
+        """Test that values for fields that cannot be filled are reported as invalid"""
+        fields = {field['field_id']: field for field in load_schema(self.pdf_path)}
+        values = {"name": "Jane", "address": "x", "hidden": "y", "missing": "z"}
+        self.assertEqual(invalid_field_ids(fields, values), ["address", "hidden", "missing"])
+
+
+if __name__ == '__main__':
+    unittest.main()
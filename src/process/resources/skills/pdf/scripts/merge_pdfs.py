@@ -2,41 +2,134 @@
 """
 Merge multiple PDF files into one.
 
-Usage: python merge_pdfs.py <output.pdf> <input1.pdf> <input2.pdf> ...
+Usage:
+  python merge_pdfs.py <output.pdf> <input1.pdf> <input2.pdf> ...
+  python merge_pdfs.py <output.pdf> --list <inputs.txt>     # one path per line
+  find . -name '*.pdf' | python merge_pdfs.py <output.pdf> --list -
+  python merge_pdfs.py <output.pdf> <inputs...> --optimize small  # smallest output
+
+Inputs are opened one at a time and their pages are written straight to the
+output file (pdf_io.StreamingPdfWriter), so only one PdfReader is alive at
+any moment and memory stays flat however many inputs there are. Every object
+is keyed by a hash of its content as it is written, so fonts and images shared
+between inputs (e.g. invoices from the same template) are stored once.
+Unfiltered streams are Flate-compressed, and if qpdf is installed the output
+is rewritten with compressed object streams.
+
+--optimize fast|small|web instead builds the whole document in a PdfWriter,
+so memory grows with the output, and applies one of the shared output presets
+(see pdf_optimize.py): small also downsamples oversized images, and web
+linearizes the file for fast first-page display.
 """
 
+import argparse
+import itertools
+import os
 import sys
-from pypdf import PdfReader, PdfWriter
 
+import pdf_events
+from pdf_io import StreamingPdfWriter, atomic_output
+from pdf_optimize import OBJECT_STREAM_ARGS, PRESETS, check_preset, run_qpdf, write_output
+from pdf_worker import call_worker, worker_configured
 
-def merge_pdfs(output_path: str, input_paths: list) -> None:
-    """Merge multiple PDFs into one."""
-    writer = PdfWriter()
 
-    total_pages = 0
-    for pdf_path in input_paths:
+def iter_input_paths(list_path: str):
+    """Yield input paths from a list file, or from stdin when list_path is '-'."""
+    stream = sys.stdin if list_path == '-' else open(list_path, 'r', encoding='utf-8')
+    try:
+        for line in stream:
+            path = line.strip()
+            if path and not path.startswith('#'):
+                yield path
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def iter_readers(input_paths):
+    """Open each input in turn, yielding (path, reader) and reporting inputs that cannot be read."""
+    from pypdf import PdfReader
+
+    # A list file is read lazily, so its length is not known up front
+    input_count = len(input_paths) if isinstance(input_paths, (list, tuple)) else None
+    for done, pdf_path in enumerate(input_paths, start=1):
         try:
-            reader = PdfReader(pdf_path)
+            pdf_events.file_bytes('read', pdf_path)
+            with open(pdf_path, 'rb') as f:
+                yield pdf_path, PdfReader(f)
+        except Exception as e:
+            print(f"  Error reading {pdf_path}: {e}")
+        pdf_events.progress('merge', done, input_count, path=pdf_path)
+
+
+def merge_pdfs(output_path: str, input_paths, optimize: str = None) -> None:
+    """Merge multiple PDFs into one.
+
+    `input_paths` may be any iterable, including a lazily read list file.
+    """
+    from pypdf import PdfWriter
+
+    total_pages = 0
+    total_inputs = 0
+    if optimize:
+        writer = PdfWriter()
+        for pdf_path, reader in iter_readers(input_paths):
+            total_inputs += 1
             for page in reader.pages:
-                writer.add_page(page)
+                writer.add_page(page).compress_content_streams()
+            # Drop the reader -> writer object map so the reader can be freed
+            writer.reset_translation(reader)
             total_pages += len(reader.pages)
             print(f"  Added {len(reader.pages)} page(s) from {pdf_path}")
-        except Exception as e:
-            print(f"  Error reading {pdf_path}: {e}")
+        with pdf_events.phase('write'):
+            write_output(writer, output_path, optimize)
+    else:
+        with atomic_output(output_path) as f:
+            writer = StreamingPdfWriter(f)
+            for pdf_path, reader in iter_readers(input_paths):
+                total_inputs += 1
+                page_count = writer.add_pages(reader)
+                total_pages += page_count
+                print(f"  Added {page_count} page(s) from {pdf_path}")
+            writer.close()
+        with pdf_events.phase('write'):
+            run_qpdf(output_path, OBJECT_STREAM_ARGS)
+    pdf_events.file_bytes('written', output_path)
 
-    with open(output_path, 'wb') as f:
-        writer.write(f)
+    print(f"\nMerged {total_inputs} PDFs ({total_pages} total pages) into {output_path}")
 
-    print(f"\nMerged {len(input_paths)} PDFs ({total_pages} total pages) into {output_path}")
 
+def main(argv: list = None) -> None:
+    """Command-line entry point; argv defaults to sys.argv[1:]."""
+    parser = argparse.ArgumentParser(description="Merge multiple PDF files into one.")
+    parser.add_argument('output', help="Output PDF file")
+    parser.add_argument('inputs', nargs='*', help="Input PDF files, in order")
+    parser.add_argument('--list', dest='list_path', help="File with one input path per line ('-' for stdin)")
+    parser.add_argument('--optimize', choices=list(PRESETS), help="Output optimization preset")
+    args = parser.parse_args(argv)
 
-if __name__ == "__main__":
-    if len(sys.argv) < 3:
+    if not args.inputs and not args.list_path:
         print("Usage: python merge_pdfs.py <output.pdf> <input1.pdf> <input2.pdf> ...")
+        print("       python merge_pdfs.py <output.pdf> --list <inputs.txt | ->")
         sys.exit(1)
 
-    output = sys.argv[1]
-    inputs = sys.argv[2:]
+    inputs = args.inputs
+    if args.list_path:
+        inputs = itertools.chain(inputs, iter_input_paths(args.list_path))
+        print("Merging PDFs...")
+    else:
+        print(f"Merging {len(inputs)} PDFs...")
+    if args.optimize:
+        check_preset(args.optimize)
+    if worker_configured():
+        # The worker needs the full list up front, with absolute paths
+        inputs = [os.path.abspath(path) for path in inputs]
+        if call_worker('merge_pdfs', output_path=os.path.abspath(args.output), input_paths=inputs,
+                       optimize=args.optimize) is not None:
+            sys.exit(0)
+    pdf_events.start_command('merge_pdfs')
+    merge_pdfs(args.output, inputs, args.optimize)
 
-    print(f"Merging {len(inputs)} PDFs...")
-    merge_pdfs(output, inputs)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import unittest
+import os
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+from merge_pdfs import merge_pdfs
+
+
+# Run with `npm run test:pdf-skill`, or `python -m pytest` in this directory.
+class TestMergePdfs(unittest.TestCase):
+
+    def setUp(self):
+        from reportlab.pdfgen import canvas
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.inputs = []
+        for name, pages in (("a", 2), ("b", 3)):
+            path = os.path.join(self.tmp.name, f"{name}.pdf")
+            c = canvas.Canvas(path, pagesize=(612, 792))
+            for number in range(1, pages + 1):
+                c.setFont("Helvetica", 12)
+                c.drawString(72, 700, f"{name} page {number}")
+                c.showPage()
+            c.save()
+            self.inputs.append(path)
+        self.output_path = os.path.join(self.tmp.name, "merged.pdf")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_pages_in_input_order(self):
+        """Test that pages come out in input order and the file reads strictly"""
+        from pypdf import PdfReader
+
+        with redirect_stdout(StringIO()):
+            merge_pdfs(self.output_path, self.inputs)
+
+        reader = PdfReader(self.output_path, strict=True)
+        texts = [page.extract_text().strip() for page in reader.pages]
+        self.assertEqual(texts, ["a page 1", "a page 2", "b page 1", "b page 2", "b page 3"])
+
+    def test_shared_font_stored_once(self):
+        """Test that the same font from different inputs is written once"""
+        from pypdf import PdfReader
+
+        with redirect_stdout(StringIO()):
+            merge_pdfs(self.output_path, self.inputs)
+
+        reader = PdfReader(self.output_path)
+        fonts = {page['/Resources'].raw_get('/Font').get_object().raw_get('/F1').idnum for page in reader.pages}
+        self.assertEqual(len(fonts), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
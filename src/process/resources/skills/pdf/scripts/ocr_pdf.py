@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+OCR a scanned PDF, one JSON line per page.
+
+Usage: python ocr_pdf.py <input.pdf> [output.jsonl] [--pages 1-5,9] [--lang eng] [--dpi 300]
+           [--threads N] [--searchable output.pdf] [--force-ocr]
+
+Each line looks like:
+  {"page": 1, "source": "ocr", "text": "..."}
+
+Pages that already have a text layer are read directly ("source": "text_layer")
+unless --force-ocr is given. The remaining pages are rendered with
+convert_pdf_to_images.py (and its render cache) and run through tesseract
+concurrently, each tesseract limited to one thread (OMP_THREAD_LIMIT=1 unless
+already set) so --threads processes do not each start a thread per core. OCR
+results are cached by page-image hash under $XDG_CACHE_HOME/aionui-pdf/ocr, so
+repeated runs skip tesseract entirely. The OCR cache has the same size limit as
+the render cache ($PDF_RENDER_CACHE_MAX_MB, default 512) and evicts the least
+recently used results first.
+
+--searchable writes a copy of the input with an invisible OCR text layer on
+each scanned page, leaving the original page images untouched.
+
+Dependencies: pip install pypdf pdf2image pytesseract
+Also requires: poppler-utils and tesseract (brew install poppler tesseract on macOS)
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pdf_events
+from convert_pdf_to_images import convert_pdf_to_images
+from pdf_io import atomic_output, open_reader, page_range, select_pages
+from pdf_worker import call_worker
+from render_cache import evict, get_cache_root, hash_file
+
+DEFAULT_DPI = 300
+MIN_TEXT_LAYER_CHARS = 20
+
+
+def get_ocr_cache_dir() -> str:
+    """Return the OCR result cache directory."""
+    return os.path.join(get_cache_root(), 'ocr')
+
+
+def _cache_path(image_hash: str, lang: str, ext: str) -> str:
+    return os.path.join(get_ocr_cache_dir(), image_hash[:2], f"{image_hash}_{lang}.{ext}")
+
+
+def _read_cached(path: str):
+    """Return a cache entry's bytes and mark it as recently used, or None on a miss."""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        # Mark as recently used for LRU eviction
+        os.utime(path)
+    except OSError:
+        return None
+    return data
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def ocr_image(image_path: str, lang: str, searchable: bool) -> tuple:
+    """OCR one page image, using the cache. Returns (text, text-only PDF bytes or None)."""
+    import pytesseract
+
+    image_hash = hash_file(image_path)
+    text_path = _cache_path(image_hash, lang, 'txt')
+    pdf_path = _cache_path(image_hash, lang, 'pdf')
+
+    cached = _read_cached(text_path)
+    if cached is not None:
+        text = cached.decode('utf-8')
+    else:
+        text = pytesseract.image_to_string(image_path, lang=lang)
+        _write_atomic(text_path, text.encode('utf-8'))
+
+    layer = None
+    if searchable:
+        layer = _read_cached(pdf_path)
+        if layer is None:
+            # textonly_pdf makes tesseract emit only the invisible text, not the image
+            layer = pytesseract.image_to_pdf_or_hocr(image_path, lang=lang, extension='pdf',
+                                                     config='-c textonly_pdf=1')
+            _write_atomic(pdf_path, layer)
+
+    return text, layer
+
+
+def write_searchable_pdf(reader, text_layers: dict, output_path: str) -> None:
+    """Copy reader's pages to output_path, overlaying OCR text layers by page number."""
+    from io import BytesIO
+    from pypdf import PdfReader, PdfWriter, Transformation
+
+    writer = PdfWriter()
+    for page_num, page in enumerate(reader.pages, start=1):
+        # Overlay onto the copy; the reader may be shared
+        page = writer.add_page(page)
+        layer = text_layers.get(page_num)
+        if layer:
+            layer_page = PdfReader(BytesIO(layer)).pages[0]
+            # Tesseract sizes its page from the image; scale it onto the PDF page
+            scale_x = float(page.mediabox.width) / float(layer_page.mediabox.width)
+            scale_y = float(page.mediabox.height) / float(layer_page.mediabox.height)
+            transform = Transformation().scale(scale_x, scale_y).translate(
+                float(page.mediabox.left), float(page.mediabox.bottom))
+            page.merge_transformed_page(layer_page, transform)
+
+    with atomic_output(output_path) as f:
+        writer.write(f)
+
+
+def ocr_pdf(pdf_path: str, output_path: str = None, pages: str = None, lang: str = 'eng',
+            dpi: int = DEFAULT_DPI, threads: int = None, searchable_path: str = None,
+            force_ocr: bool = False) -> int:
+    """OCR a PDF and stream per-page JSON lines. Returns the number of pages OCR'd."""
+    try:
+        import pytesseract  # noqa: F401
+        import pypdf  # noqa: F401
+    except ImportError:
+        print("Error: pypdf and pytesseract are required. Install with: pip install pypdf pytesseract",
+              file=sys.stderr)
+        print("Also requires tesseract: brew install tesseract (macOS) or apt-get install tesseract-ocr (Linux)",
+              file=sys.stderr)
+        sys.exit(1)
+
+    reader = open_reader(pdf_path)
+    total_pages = len(reader.pages)
+    page_numbers = select_pages(pages, total_pages)
+    threads = max(1, threads or os.cpu_count() or 1)
+    # Parallelism comes from running pages side by side; tesseract's own OpenMP
+    # threads on top of that would oversubscribe the cores
+    os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+    # Use the existing text layer where there is one
+    records = {}
+    to_ocr = []
+    with pdf_events.phase('text_layer', pages=len(page_numbers)):
+        for page_num in page_numbers:
+            text = "" if force_ocr else (reader.pages[page_num - 1].extract_text() or "")
+            if len(text.strip()) >= MIN_TEXT_LAYER_CHARS:
+                records[page_num] = {"page": page_num, "source": "text_layer", "text": text}
+            else:
+                to_ocr.append(page_num)
+
+    text_layers = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        if to_ocr:
+            # Keep the converter's progress lines off stdout, which carries JSON
+            with contextlib.redirect_stdout(sys.stderr):
+                image_paths = convert_pdf_to_images(pdf_path, work_dir, dpi,
+                                                    pages=','.join(map(str, to_ocr)), threads=threads)
+
+            with pdf_events.phase('ocr', pages=len(to_ocr)), ThreadPoolExecutor(max_workers=threads) as executor:
+                results = executor.map(lambda path: ocr_image(path, lang, bool(searchable_path)), image_paths)
+                for done, (page_num, (text, layer)) in enumerate(zip(to_ocr, results), start=1):
+                    records[page_num] = {"page": page_num, "source": "ocr", "text": text}
+                    if layer:
+                        text_layers[page_num] = layer
+                    pdf_events.progress('ocr', done, len(to_ocr), page=page_num)
+            evict(get_ocr_cache_dir())
+
+    out = open(output_path, 'w', encoding='utf-8') if output_path else sys.stdout
+    try:
+        for page_num in page_numbers:
+            out.write(json.dumps(records[page_num], ensure_ascii=False) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+            pdf_events.file_bytes('written', output_path)
+
+    if searchable_path:
+        with pdf_events.phase('write'):
+            write_searchable_pdf(reader, text_layers, searchable_path)
+        print(f"Wrote searchable PDF to {searchable_path}", file=sys.stderr)
+
+    print(f"OCR'd {len(to_ocr)} page(s), {len(page_numbers) - len(to_ocr)} had a text layer", file=sys.stderr)
+    return len(to_ocr)
+
+
+def main(argv: list = None) -> None:
+    """Command-line entry point; argv defaults to sys.argv[1:]."""
+    parser = argparse.ArgumentParser(description="OCR a scanned PDF, one JSON line per page.")
+    parser.add_argument('pdf_path', help="Input PDF file")
+    parser.add_argument('output_path', nargs='?', help="Output .jsonl file (default: stdout)")
+    parser.add_argument('--pages', type=page_range, help="Pages to OCR, e.g. 1-5,9 (default: all)")
+    parser.add_argument('--lang', default='eng', help="Tesseract language(s), e.g. eng+deu (default: eng)")
+    parser.add_argument('--dpi', type=int, default=DEFAULT_DPI, help=f"Render resolution (default: {DEFAULT_DPI})")
+    parser.add_argument('--threads', type=int, help="Concurrent renders and tesseract runs (default: all cores)")
+    parser.add_argument('--searchable', dest='searchable_path', help="Also write a searchable PDF here")
+    parser.add_argument('--force-ocr', action='store_true', help="OCR pages even if they have a text layer")
+    args = parser.parse_args(argv)
+
+    params = {
+        'pdf_path': os.path.abspath(args.pdf_path),
+        'output_path': os.path.abspath(args.output_path) if args.output_path else None,
+        'pages': args.pages,
+        'lang': args.lang,
+        'dpi': args.dpi,
+        'threads': args.threads,
+        'searchable_path': os.path.abspath(args.searchable_path) if args.searchable_path else None,
+        'force_ocr': args.force_ocr,
+    }
+    if call_worker('ocr_pdf', **params) is None:
+        ocr_pdf(**params)
+
+
+if __name__ == "__main__":
+    main()
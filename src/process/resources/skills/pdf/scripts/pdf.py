@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the pdf scripts.
+
+Usage: python pdf.py [--timings] [--events] <command> [args...]
+
+Commands:
+  check            Check if a PDF has fillable form fields      (check_fillable_fields.py)
+  extract-fields   Extract form field info to JSON              (extract_form_field_info.py)
+  fill             Fill fillable form fields                    (fill_fillable_fields.py)
+  annotate         Fill a non-fillable form with text overlays  (fill_pdf_form_with_annotations.py)
+  render           Convert pages to images                      (convert_pdf_to_images.py)
+  validate-boxes   Check fields.json bounding boxes             (check_bounding_boxes.py)
+  validate-image   Draw bounding boxes for visual validation    (create_validation_image.py)
+  merge            Merge PDFs                                   (merge_pdfs.py)
+  split            Split a PDF or extract page ranges           (split_pdf.py)
+  extract-text     Extract text and tables as JSON lines        (extract_text.py)
+  extract-images   Extract images, JPEGs byte for byte          (extract_images.py)
+  ocr              OCR a scanned PDF                            (ocr_pdf.py)
+  watermark        Stamp text, an image or a PDF onto pages     (watermark.py)
+  worker           Run the persistent PDF worker                (pdf_worker.py)
+  cache            Show or clear the render cache               (render_cache.py)
+
+Each command takes the same arguments as its script, and the scripts keep
+working on their own. Only the module for the chosen command is imported, and
+the heavy libraries (pypdf, reportlab, PIL, pdf2image) are loaded on first use.
+
+--timings prints how long the command's import and execution took, the peak
+resident memory, and which heavy libraries were loaded, to stderr.
+
+--events switches on the structured progress and timing events described in
+pdf_events.py (the same as setting PDF_EVENTS=1): newline-delimited JSON on
+stderr, covering phases, per-page progress, bytes read and written, elapsed
+time and peak memory.
+"""
+
+import importlib
+import os
+import sys
+import time
+
+HEAVY_LIBRARIES = ('pypdf', 'reportlab', 'PIL', 'pdf2image', 'pdfplumber', 'pytesseract', 'numpy')
+
+# command -> (module, summary)
+COMMANDS = {
+    'check': ('check_fillable_fields', "Check if a PDF has fillable form fields"),
+    'extract-fields': ('extract_form_field_info', "Extract form field info to JSON"),
+    'fill': ('fill_fillable_fields', "Fill fillable form fields"),
+    'annotate': ('fill_pdf_form_with_annotations', "Fill a non-fillable form with text overlays"),
+    'render': ('convert_pdf_to_images', "Convert pages to images"),
+    'validate-boxes': ('check_bounding_boxes', "Check fields.json bounding boxes"),
+    'validate-image': ('create_validation_image', "Draw bounding boxes for visual validation"),
+    'merge': ('merge_pdfs', "Merge PDFs"),
+    'split': ('split_pdf', "Split a PDF or extract page ranges"),
+    'extract-text': ('extract_text', "Extract text and tables as JSON lines"),
+    'extract-images': ('extract_images', "Extract images, JPEGs byte for byte"),
+    'ocr': ('ocr_pdf', "OCR a scanned PDF"),
+    'watermark': ('watermark', "Stamp text, an image or a PDF onto pages"),
+    'worker': ('pdf_worker', "Run the persistent PDF worker"),
+    'cache': ('render_cache', "Show or clear the render cache"),
+}
+
+
+def print_usage() -> None:
+    print("Usage: python pdf.py [--timings] [--events] <command> [args...]")
+    print("\nCommands:")
+    for name, (_, summary) in COMMANDS.items():
+        print(f"  {name:<16} {summary}")
+
+
+def run(command: str, argv: list, timings: bool = False) -> None:
+    """Import the module for command and run its main() with argv."""
+    if command not in COMMANDS:
+        print(f"Unknown command: {command}\n")
+        print_usage()
+        sys.exit(1)
+
+    module_name, _ = COMMANDS[command]
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    imported = time.perf_counter()
+
+    # Let argparse-based scripts report the command name in their usage
+    sys.argv[0] = f"pdf.py {command}"
+    exit_code = 0
+    try:
+        module.main(argv)
+    except SystemExit as e:
+        exit_code = e.code
+    finally:
+        if timings:
+            finished = time.perf_counter()
+            from pdf_io import memory_usage
+
+            loaded = [name for name in HEAVY_LIBRARIES if name in sys.modules]
+            memory = memory_usage()
+            peak = f"peak RSS {memory['peak_rss_mb']:.1f} MB; " if memory else ""
+            print(f"[timings] {command}: import {(imported - start) * 1000:.1f} ms, "
+                  f"run {(finished - imported) * 1000:.1f} ms, "
+                  f"total {(finished - start) * 1000:.1f} ms; {peak}"
+                  f"loaded: {', '.join(loaded) or 'none'}", file=sys.stderr)
+    sys.exit(exit_code)
+
+
+def main(argv: list = None) -> None:
+    """Command-line entry point; argv defaults to sys.argv[1:]."""
+    argv = sys.argv[1:] if argv is None else argv
+
+    timings = False
+    while argv and argv[0] in ('--timings', '--events'):
+        if argv[0] == '--timings':
+            timings = True
+        else:
+            # Set in the environment so pool processes and the worker client see it too
+            os.environ['PDF_EVENTS'] = '1'
+        argv = argv[1:]
+
+    if not argv or argv[0] in ('-h', '--help'):
+        print_usage()
+        sys.exit(0 if argv else 1)
+
+    run(argv[0], argv[1:], timings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Structured progress and timing events for the pdf scripts.
+
+Set PDF_EVENTS=1 (or run a command through pdf.py --events) and every script
+writes newline-delimited JSON events to stderr, next to its usual
+human-readable output on stdout. Each event has "event", "command", "pid" and
+a wall-clock "ts"; the kinds are:
+
+  {"event": "start", "argv": [...]}
+  {"event": "phase_start", "phase": "render"}
+  {"event": "phase_end", "phase": "render", "elapsed": 1.52, "peak_rss_mb": 88.1}
+  {"event": "progress", "phase": "render", "done": 12, "total": 40, "page": 12}
+  {"event": "bytes", "direction": "read", "path": "...", "bytes": 1048576}
+  {"event": "end", "elapsed": 3.9, "peak_rss_mb": 91.4}
+
+"start" and "end" are emitted once per command by the main process (the exit
+status is the process's own). Phases, progress and byte counts come from the
+scripts and from pdf_io's open_reader() and atomic_output(). Commands
+forwarded to pdf_worker.py have their events collected by the worker and
+replayed by the client when the command finishes.
+
+When PDF_EVENTS is unset every function here returns immediately, so the
+instrumentation costs nothing in normal runs.
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+EVENTS_ENV = 'PDF_EVENTS'
+# Carries the command name into pool processes
+COMMAND_ENV = 'PDF_EVENTS_COMMAND'
+
+_lock = threading.Lock()
+_started = time.perf_counter()
+_command = os.environ.get(COMMAND_ENV)
+# Where events go; pdf_worker.py swaps in a collector per request
+_sink = None
+
+
+def enabled() -> bool:
+    """Return True if events are switched on for this process or being collected."""
+    return _sink is not None or os.environ.get(EVENTS_ENV, '') not in ('', '0')
+
+
+def _write_stderr(record: dict) -> None:
+    sys.stderr.write(json.dumps(record) + '\n')
+    sys.stderr.flush()
+
+
+def _peak_rss_mb():
+    from pdf_io import memory_usage
+
+    return (memory_usage() or {}).get('peak_rss_mb')
+
+
+def emit(event: str, **fields) -> None:
+    """Write one event, if events are enabled."""
+    if not enabled():
+        return
+    record = {"event": event, "command": _command, "pid": os.getpid(), "ts": round(time.time(), 3)}
+    record.update(fields)
+    with _lock:
+        (_sink or _write_stderr)(record)
+
+
+@contextmanager
+def phase(name: str, **fields):
+    """Emit phase_start and phase_end (with elapsed time and peak memory) around a block."""
+    if not enabled():
+        yield
+        return
+    emit('phase_start', phase=name, **fields)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        emit('phase_end', phase=name, elapsed=round(time.perf_counter() - start, 4), peak_rss_mb=_peak_rss_mb(),
+             **fields)
+
+
+def progress(phase_name: str, done: int, total: int = None, **fields) -> None:
+    """Report that done of total units (pages, files, chunks) of a phase are finished."""
+    emit('progress', phase=phase_name, done=done, total=total, **fields)
+
+
+def file_bytes(direction: str, path: str) -> None:
+    """Report the size of a file that was read or written."""
+    if not enabled():
+        return
+    try:
+        size = os.path.getsize(path)
+    except (OSError, TypeError):
+        return
+    emit('bytes', direction=direction, path=path, bytes=size)
+
+
+def _end() -> None:
+    emit('end', elapsed=round(time.perf_counter() - _started, 4), peak_rss_mb=_peak_rss_mb())
+
+
+def start_command(name: str) -> None:
+    """Name the running command and emit its start event; the end event follows at exit.
+
+    Only the first call counts, so a command that calls others stays one command.
+    """
+    global _command
+    if _command is not None:
+        return
+    _command = os.environ[COMMAND_ENV] = name
+    if enabled():
+        emit('start', argv=sys.argv[1:])
+        atexit.register(_end)
+
+
+@contextmanager
+def collect(command: str):
+    """Gather the events command emits inside the block into a list instead of writing them."""
+    global _command, _sink
+    collected = []
+    previous = _command, _sink
+    _command, _sink = command, collected.append
+    try:
+        yield collected
+    finally:
+        _command, _sink = previous
+
+
+def replay(events: list) -> None:
+    """Write events collected elsewhere (by the worker) to this process's stderr."""
+    if not enabled():
+        return
+    with _lock:
+        for record in events:
+            (_sink or _write_stderr)(record)
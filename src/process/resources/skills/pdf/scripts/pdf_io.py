@@ -0,0 +1,674 @@
+"""
+Shared PDF input and output helpers for the pdf scripts.
+
+Scripts open documents with open_reader() instead of constructing PdfReader
+directly. By default this is just PdfReader(path); inside the long-lived
+pdf_worker.py process a ReaderCache is installed so that consecutive commands
+on the same file reuse one parsed document.
+
+Files of PDF_MMAP_THRESHOLD_MB (default 32) or more are memory-mapped rather
+than read into a buffer, so parsing a large PDF only pages in the parts that
+are actually used and the pages stay reclaimable by the OS. Output written
+with atomic_output() goes to a temporary file that replaces the target, so a
+mapped input is never truncated underneath its reader. memory_usage()
+reports peak and current RSS for checking the savings.
+
+parse_pages() and select_pages() give every script the same --pages syntax
+("1-5,9", open-ended "7-" or "-3"), so a script can skip unselected pages
+before it parses or renders them. Scripts that parse argv by hand take the
+option with pop_pages_option().
+
+IncrementalWriter saves edits as a PDF incremental update: the original bytes
+are copied (or left in place) and only the changed objects plus a new xref
+section are appended, so the cost of a save follows the size of the edit
+rather than the size of the document. Its page_resources() copies resources a
+page inherits from the page tree onto the page before they are edited, since
+a page's own /Resources replaces the inherited ones. StreamingPdfWriter
+writes the pages of many documents straight to a new file, one reader at a
+time, storing identical objects once. drop_unreachable() clears out what a
+full PdfWriter rewrite would otherwise carry along after keys are deleted.
+iter_image_xobjects() lists the images a page draws, through nested forms,
+without decoding them.
+"""
+
+import mmap
+import os
+import re
+import shutil
+import struct
+import sys
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import pdf_events
+
+DEFAULT_CACHE_SIZE = 8
+MMAP_THRESHOLD_ENV = 'PDF_MMAP_THRESHOLD_MB'
+DEFAULT_MMAP_THRESHOLD_MB = 32
+
+_reader_cache = None
+
+
+class ReaderCache:
+    """LRU cache of PdfReader objects keyed by path, invalidated by mtime and size."""
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE):
+        self.max_entries = max(1, max_entries)
+        self._entries = OrderedDict()  # realpath -> ((mtime_ns, size), reader)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str):
+        """Return a reader for path, parsing it only if it is new or has changed."""
+        from pypdf import PdfReader
+
+        key = os.path.realpath(path)
+        st = os.stat(key)
+        stamp = (st.st_mtime_ns, st.st_size)
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == stamp:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        reader = PdfReader(open_input(key))
+        self._entries[key] = (stamp, reader)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return reader
+
+    def invalidate(self, path: str = None) -> None:
+        """Drop one path, or every entry when path is None."""
+        if path is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(os.path.realpath(path), None)
+
+    def stats(self) -> dict:
+        return {
+            "entries": list(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "max_entries": self.max_entries,
+        }
+
+
+def set_reader_cache(cache) -> None:
+    """Install (or with None, remove) the process-wide reader cache."""
+    global _reader_cache
+    _reader_cache = cache
+
+
+def get_reader_cache():
+    """Return the installed reader cache, if any."""
+    return _reader_cache
+
+
+def parse_pages(range_str: str, total_pages: int, ordered: bool = False) -> list:
+    """Parse a page range string such as "1-5,9" into sorted 1-based page numbers.
+
+    With ordered=True the pages keep the order and repeats of the string
+    ("5,1-2,5" gives [5, 1, 2, 5]), for commands that assemble pages in that order.
+    Pages outside 1..total_pages are dropped; malformed ranges raise ValueError.
+    """
+    pages = []
+    for part in range_str.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if '-' in part:
+                start, end = part.split('-')
+                start = int(start) if start.strip() else 1
+                end = int(end) if end.strip() else total_pages
+                pages.extend(range(max(start, 1), min(end, total_pages) + 1))
+            else:
+                page = int(part)
+                if 1 <= page <= total_pages:
+                    pages.append(page)
+        except ValueError:
+            raise ValueError(f"Invalid page range: {range_str!r} (expected e.g. 1-5,9)") from None
+    return pages if ordered else sorted(set(pages))
+
+
+def select_pages(range_str: str, total_pages: int) -> list:
+    """Return the selected 1-based page numbers, or every page when range_str is empty."""
+    if not range_str:
+        return list(range(1, total_pages + 1))
+    return parse_pages(range_str, total_pages)
+
+
+def page_range(value: str) -> str:
+    """argparse type for --pages: check the syntax early and keep the string."""
+    import argparse
+
+    try:
+        parse_pages(value, 0)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+
+def pop_pages_option(argv: list) -> tuple:
+    """Remove "--pages RANGE" from a hand-parsed argv. Returns (range or None, remaining argv)."""
+    if '--pages' not in argv:
+        return None, argv
+    i = argv.index('--pages')
+    if i + 1 >= len(argv):
+        print("Error: --pages needs a page range, e.g. --pages 1-5,9")
+        sys.exit(1)
+    try:
+        parse_pages(argv[i + 1], 0)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    return argv[i + 1], argv[:i] + argv[i + 2:]
+
+
+def get_mmap_threshold() -> int:
+    """Return the file size in bytes from which inputs are memory-mapped."""
+    return int(float(os.environ.get(MMAP_THRESHOLD_ENV, DEFAULT_MMAP_THRESHOLD_MB)) * 1024 * 1024)
+
+
+def open_input(path: str):
+    """Return a read-only mmap of path if it is large, else path itself for a normal read."""
+    size = os.path.getsize(path)
+    pdf_events.emit('bytes', direction='read', path=path, bytes=size)
+    if size == 0 or size < get_mmap_threshold():
+        return path
+    with open(path, 'rb') as f:
+        # The mapping keeps its own handle, so the file can be closed here
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def open_reader(path: str):
+    """Open a PDF for reading, through the reader cache when one is installed.
+
+    Readers from the cache are shared between calls, so callers must not
+    modify their pages in place; copy pages into a PdfWriter first.
+    """
+    if _reader_cache is not None:
+        return _reader_cache.get(path)
+
+    from pypdf import PdfReader
+    return PdfReader(open_input(path))
+
+
+@contextmanager
+def atomic_output(path: str):
+    """Open path for binary writing via a temporary file that replaces it on success."""
+    tmp_path = os.path.join(os.path.dirname(os.path.abspath(path)), f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            yield f
+        os.replace(tmp_path, path)
+        pdf_events.file_bytes('written', path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def memory_usage() -> dict:
+    """Return peak and current resident memory of this process in MB."""
+    usage = {}
+    try:
+        # VmHWM is the peak; RssAnon is heap, RssFile includes mapped input pages
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('VmHWM', 'VmRSS', 'RssAnon', 'RssFile'):
+                    usage[key] = int(value.split()[0]) / 1024
+    except OSError:
+        pass
+
+    if 'VmHWM' in usage:
+        return {
+            "peak_rss_mb": round(usage['VmHWM'], 1),
+            "rss_mb": round(usage.get('VmRSS', 0), 1),
+            "rss_anon_mb": round(usage.get('RssAnon', 0), 1),
+            "rss_file_mb": round(usage.get('RssFile', 0), 1),
+        }
+    try:
+        import resource
+    except ImportError:
+        return {}
+    # ru_maxrss is bytes on macOS and KiB elsewhere
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"peak_rss_mb": round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)}
+
+
+def inherited_attribute(page: dict, key: str):
+    """Return an inheritable page attribute (/Resources, /MediaBox, /CropBox, /Rotate), or None.
+
+    The page tree is walked up through /Parent until a node sets the key.
+    """
+    node = page
+    # The depth limit guards against /Parent cycles in damaged files
+    for _ in range(64):
+        if key in node:
+            return node[key]
+        if '/Parent' not in node:
+            return None
+        node = node['/Parent']
+    return None
+
+
+class IncrementalWriter:
+    """Collect changed objects of a PdfReader's document and append them as an update."""
+
+    def __init__(self, reader):
+        if reader.is_encrypted:
+            raise ValueError("Incremental save does not support encrypted PDFs")
+        self.reader = reader
+        self._changed = {}  # idnum -> (generation, object)
+        self._next_id = int(reader.trailer['/Size'])
+
+    def get(self, ref):
+        """Return a writable copy of the object behind an indirect reference.
+
+        The copy is shallow and made once, so repeated calls for the same
+        object return the same dictionary. The reader's objects are never
+        modified, which keeps shared (cached) readers intact.
+        """
+        from pypdf.generic import DictionaryObject, StreamObject
+
+        entry = self._changed.get(ref.idnum)
+        if entry is None:
+            obj = ref.get_object()
+            if not isinstance(obj, DictionaryObject) or isinstance(obj, StreamObject):
+                raise TypeError(f"Only dictionary objects can be edited, not {type(obj).__name__}")
+            entry = self._changed[ref.idnum] = (ref.generation, DictionaryObject(obj))
+        return entry[1]
+
+    def add(self, obj):
+        """Add a new object to the update and return a reference to it."""
+        from pypdf.generic import IndirectObject
+
+        idnum = self._next_id
+        self._next_id += 1
+        self._changed[idnum] = (0, obj)
+        return IndirectObject(idnum, 0, self.reader)
+
+    def add_stream(self, data: bytes, entries: dict = None):
+        """Add a new Flate-compressed stream with optional dictionary entries."""
+        from pypdf.generic import DecodedStreamObject
+
+        stream = DecodedStreamObject()
+        stream.set_data(data)
+        stream.update(entries or {})
+        return self.add(stream.flate_encode())
+
+    def get_entry(self, parent: dict, key: str) -> dict:
+        """Return a writable copy of the dictionary parent[key], creating it if missing.
+
+        Indirect dictionaries are copied through get(); direct ones are
+        replaced in parent by a shallow copy.
+        """
+        from pypdf.generic import DictionaryObject, IndirectObject, NameObject
+
+        value = parent.raw_get(key) if key in parent else None
+        if isinstance(value, IndirectObject):
+            return self.get(value)
+        entry = DictionaryObject(value or {})
+        parent[NameObject(key)] = entry
+        return entry
+
+    def page_resources(self, page: dict) -> dict:
+        """Return a writable copy of a page's /Resources, given a page dictionary from get().
+
+        A page without its own /Resources inherits them from the page tree;
+        a shallow copy of the inherited dictionary is put on the page first,
+        so adding an entry does not hide the fonts and images it inherits.
+        """
+        from pypdf.generic import DictionaryObject, NameObject
+
+        if '/Resources' not in page:
+            inherited = inherited_attribute(page, '/Resources')
+            if inherited is not None:
+                page[NameObject('/Resources')] = DictionaryObject(inherited)
+        return self.get_entry(page, '/Resources')
+
+    def import_object(self, obj, memo: dict = None):
+        """Copy an object from another document into the update, following references.
+
+        memo maps (document, object number) to new references, so shared
+        objects are copied once; pass the same dict when importing several
+        objects from one document.
+        """
+        from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, StreamObject
+
+        memo = {} if memo is None else memo
+        if isinstance(obj, IndirectObject):
+            key = (id(obj.pdf), obj.idnum)
+            if key not in memo:
+                ref = memo[key] = self.add(None)
+                self._changed[ref.idnum] = (0, self.import_object(obj.get_object(), memo))
+            return memo[key]
+        if isinstance(obj, StreamObject):
+            copy = type(obj)()
+            # Keep the encoded bytes; no need to decode and re-encode
+            copy._data = obj._data
+            for key, value in obj.items():
+                if key != '/Length':
+                    copy[NameObject(key)] = self.import_object(obj.raw_get(key), memo)
+            return copy
+        if isinstance(obj, DictionaryObject):
+            return DictionaryObject({NameObject(key): self.import_object(obj.raw_get(key), memo) for key in obj})
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(self.import_object(item, memo) for item in obj)
+        return obj
+
+    def __len__(self) -> int:
+        return len(self._changed)
+
+    def write(self, input_path: str, output_path: str) -> int:
+        """Write the update after a copy of input_path. Returns the number of bytes appended.
+
+        When output_path is input_path the update is appended in place and the
+        original bytes are not rewritten at all.
+        """
+        in_place = os.path.realpath(input_path) == os.path.realpath(output_path)
+        if not in_place:
+            shutil.copyfile(input_path, output_path)
+
+        with open(output_path, 'r+b') as f:
+            prev_xref, table = _find_last_xref(f)
+            f.seek(0, os.SEEK_END)
+            start = f.tell()
+            if not self._changed:
+                return 0
+            f.write(b"\n")
+
+            offsets = {}
+            for idnum in sorted(self._changed):
+                generation, obj = self._changed[idnum]
+                offsets[idnum] = (f.tell(), generation)
+                f.write(f"{idnum} {generation} obj\n".encode())
+                obj.write_to_stream(f)
+                f.write(b"\nendobj\n")
+
+            if table:
+                self._write_xref_table(f, offsets, prev_xref)
+            else:
+                self._write_xref_stream(f, offsets, prev_xref)
+            appended = f.tell() - start
+
+        pdf_events.emit('bytes', direction='written', path=output_path, bytes=appended, incremental=True)
+        return appended
+
+    def _trailer_entries(self, prev_xref: int) -> dict:
+        from pypdf.generic import NameObject, NumberObject
+
+        trailer = self.reader.trailer
+        entries = {NameObject('/Size'): NumberObject(self._next_id), NameObject('/Prev'): NumberObject(prev_xref)}
+        for key in ('/Root', '/Info', '/ID'):
+            if key in trailer:
+                entries[NameObject(key)] = trailer.raw_get(key)
+        return entries
+
+    def _write_xref_table(self, f, offsets: dict, prev_xref: int) -> None:
+        from pypdf.generic import DictionaryObject
+
+        xref_offset = f.tell()
+        f.write(b"xref\n")
+        for first, run in _contiguous_runs(sorted(offsets)):
+            f.write(f"{first} {len(run)}\n".encode())
+            for idnum in run:
+                offset, generation = offsets[idnum]
+                f.write(f"{offset:010d} {generation:05d} n\r\n".encode())
+        f.write(b"trailer\n")
+        DictionaryObject(self._trailer_entries(prev_xref)).write_to_stream(f)
+        f.write(f"\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+
+    def _write_xref_stream(self, f, offsets: dict, prev_xref: int) -> None:
+        from pypdf.generic import ArrayObject, DecodedStreamObject, NameObject, NumberObject
+
+        # The xref stream is an object itself and lists its own offset
+        xref_id = self._next_id
+        self._next_id += 1
+        xref_offset = f.tell()
+        offsets = dict(offsets)
+        offsets[xref_id] = (xref_offset, 0)
+
+        ids = sorted(offsets)
+        index = []
+        for first, run in _contiguous_runs(ids):
+            index += [NumberObject(first), NumberObject(len(run))]
+        width = 4 if xref_offset < 2 ** 32 else 8
+        data = b"".join(b"\x01" + offsets[i][0].to_bytes(width, 'big') + struct.pack('>H', offsets[i][1])
+                        for i in ids)
+
+        xref = DecodedStreamObject()
+        xref.set_data(data)
+        xref.update(self._trailer_entries(prev_xref))
+        xref.update({
+            NameObject('/Type'): NameObject('/XRef'),
+            NameObject('/Index'): ArrayObject(index),
+            NameObject('/W'): ArrayObject([NumberObject(1), NumberObject(width), NumberObject(2)]),
+        })
+        xref = xref.flate_encode()
+        f.write(f"{xref_id} 0 obj\n".encode())
+        xref.write_to_stream(f)
+        f.write(f"\nendobj\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+
+
+class StreamingPdfWriter:
+    """Write the pages of many documents straight to a file, storing identical objects once.
+
+    Each object is written as soon as everything it references has been,
+    and is keyed by a hash of its serialized bytes; since references are
+    already renumbered by then, equal fonts or images from different inputs
+    (and everything they point to) collapse into one object. Only the hashes,
+    the xref offsets and the page references are kept in memory, so a reader
+    can be dropped once its pages are added.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self._offsets = {}  # idnum -> file offset
+        self._known = {}  # digest of serialized object -> idnum
+        self._pages_id, self._root_id = 1, 2
+        self._next_id = 3
+        self._kids = []
+        f.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    def __len__(self) -> int:
+        return len(self._kids)
+
+    def add_pages(self, reader, compress: bool = True) -> int:
+        """Copy every page of reader, Flate-compressing unfiltered streams. Returns the page count."""
+        memo = {}  # idnum in reader -> reference in the output; None while being copied
+        for page in reader.pages:
+            self._kids.append(self._add_page(page, memo, compress))
+        return len(reader.pages)
+
+    def _reserve(self):
+        from pypdf.generic import IndirectObject
+
+        ref = IndirectObject(self._next_id, 0, None)
+        self._next_id += 1
+        return ref
+
+    def _write(self, idnum: int, obj) -> None:
+        self._offsets[idnum] = self.f.tell()
+        self.f.write(f"{idnum} 0 obj\n".encode())
+        obj.write_to_stream(self.f)
+        self.f.write(b"\nendobj\n")
+
+    def _store(self, obj):
+        """Write obj unless an identical object was written before; return its reference."""
+        import hashlib
+        from io import BytesIO
+        from pypdf.generic import IndirectObject
+
+        buffer = BytesIO()
+        obj.write_to_stream(buffer)
+        digest = hashlib.sha256(buffer.getvalue()).digest()
+        if digest not in self._known:
+            ref = self._reserve()
+            self._write(ref.idnum, obj)
+            self._known[digest] = ref.idnum
+        return IndirectObject(self._known[digest], 0, None)
+
+    def _add_page(self, page, memo: dict, compress: bool):
+        from pypdf.generic import DictionaryObject, IndirectObject, NameObject
+
+        # Pages are never shared, and annotations point back at them through /P
+        ref = memo[page.indirect_reference.idnum] = self._reserve()
+        copy = DictionaryObject({NameObject(key): self._copy(page.raw_get(key), memo, compress)
+                                 for key in page if key != '/Parent'})
+        copy[NameObject('/Parent')] = IndirectObject(self._pages_id, 0, None)
+        self._write(ref.idnum, copy)
+        return ref
+
+    def _copy(self, obj, memo: dict, compress: bool):
+        from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, StreamObject
+
+        if isinstance(obj, IndirectObject):
+            if obj.idnum in memo:
+                if memo[obj.idnum] is None:
+                    # A reference cycle: fix the number now and write the object when it is done
+                    memo[obj.idnum] = self._reserve()
+                return memo[obj.idnum]
+            memo[obj.idnum] = None
+            copy = self._copy(obj.get_object(), memo, compress)
+            if memo[obj.idnum] is not None:
+                self._write(memo[obj.idnum].idnum, copy)
+            else:
+                memo[obj.idnum] = self._store(copy)
+            return memo[obj.idnum]
+        if isinstance(obj, StreamObject):
+            copy = type(obj)()
+            copy._data = obj._data
+            for key in obj:
+                if key != '/Length':
+                    copy[NameObject(key)] = self._copy(obj.raw_get(key), memo, compress)
+            return copy.flate_encode() if compress and '/Filter' not in copy else copy
+        if isinstance(obj, DictionaryObject):
+            return DictionaryObject({NameObject(key): self._copy(obj.raw_get(key), memo, compress) for key in obj})
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(self._copy(item, memo, compress) for item in obj)
+        return obj
+
+    def close(self) -> None:
+        """Write the page tree, catalog, xref table and trailer."""
+        from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, NumberObject
+
+        self._write(self._pages_id, DictionaryObject({
+            NameObject('/Type'): NameObject('/Pages'),
+            NameObject('/Kids'): ArrayObject(self._kids),
+            NameObject('/Count'): NumberObject(len(self._kids)),
+        }))
+        self._write(self._root_id, DictionaryObject({
+            NameObject('/Type'): NameObject('/Catalog'),
+            NameObject('/Pages'): IndirectObject(self._pages_id, 0, None),
+        }))
+
+        xref_offset = self.f.tell()
+        self.f.write(f"xref\n0 {self._next_id}\n0000000000 65535 f\r\n".encode())
+        for idnum in range(1, self._next_id):
+            self.f.write(f"{self._offsets[idnum]:010d} 00000 n\r\n".encode())
+        self.f.write(b"trailer\n")
+        DictionaryObject({
+            NameObject('/Size'): NumberObject(self._next_id),
+            NameObject('/Root'): IndirectObject(self._root_id, 0, None),
+        }).write_to_stream(self.f)
+        self.f.write(f"\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+
+
+def content_refs(page: dict) -> list:
+    """Return the references to a page's content streams as a list."""
+    contents = page.raw_get('/Contents') if '/Contents' in page else None
+    if contents is None:
+        return []
+    resolved = contents.get_object()
+    if isinstance(resolved, list):
+        return list(resolved)
+    return [contents]
+
+
+def iter_image_xobjects(resources, path: list = None, seen: set = None):
+    """Yield (images key, reference) for each image XObject in resources, following Form XObjects.
+
+    The key is the image's name, or for an image inside a form the list of
+    names leading to it, as page.images accepts. Each object is yielded once
+    per call; only the dictionaries are read, never the image data.
+    """
+    path = [] if path is None else path
+    seen = set() if seen is None else seen
+    xobjects = resources.get_object().get('/XObject') if resources is not None else None
+    if xobjects is None:
+        return
+    xobjects = xobjects.get_object()
+    for name in xobjects:
+        ref = xobjects.raw_get(name)
+        if not hasattr(ref, 'idnum') or ref.idnum in seen:
+            continue
+        seen.add(ref.idnum)
+        stream = ref.get_object()
+        if stream.get('/Subtype') == '/Form':
+            yield from iter_image_xobjects(stream.get('/Resources'), path + [name], seen)
+        elif stream.get('/Subtype') == '/Image':
+            yield (path + [name] if path else name), ref
+
+
+def drop_unreachable(writer) -> int:
+    """Remove objects a PdfWriter would write that nothing in the document refers to. Returns the count.
+
+    Deleting a key such as /AcroForm leaves the objects under it in the
+    writer; they are only dropped once they cannot be reached from the
+    catalog or the info dictionary.
+    """
+    from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject
+
+    roots = [writer.root_object.indirect_reference, getattr(writer._info, 'indirect_reference', None)]
+    reachable = set()
+    stack = [ref for ref in roots if ref is not None]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, IndirectObject):
+            if obj.pdf is not writer or obj.idnum in reachable:
+                continue
+            reachable.add(obj.idnum)
+            obj = obj.get_object()
+        if isinstance(obj, DictionaryObject):
+            stack.extend(obj.values())
+        elif isinstance(obj, ArrayObject):
+            stack.extend(obj)
+
+    dropped = 0
+    for i, obj in enumerate(writer._objects):
+        if obj is not None and i + 1 not in reachable:
+            writer._objects[i] = None
+            dropped += 1
+    return dropped
+
+
+def _contiguous_runs(ids: list):
+    """Yield (first id, ids) for each run of consecutive object numbers."""
+    run = []
+    for idnum in ids:
+        if run and idnum != run[-1] + 1:
+            yield run[0], run
+            run = []
+        run.append(idnum)
+    if run:
+        yield run[0], run
+
+
+def _find_last_xref(f) -> tuple:
+    """Return (offset of the last xref section, whether it is a classic table)."""
+    size = f.seek(0, os.SEEK_END)
+    f.seek(max(0, size - 2048))
+    tail = f.read()
+    match = None
+    for match in re.finditer(rb'startxref\s+(\d+)', tail):
+        pass
+    if match is None:
+        raise ValueError("startxref not found; the PDF may be damaged")
+    offset = int(match.group(1))
+    f.seek(offset)
+    return offset, f.read(4) == b'xref'
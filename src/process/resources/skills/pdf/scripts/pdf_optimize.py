@@ -0,0 +1,215 @@
+"""
+Output optimization presets shared by the scripts that write whole PDFs.
+
+merge_pdfs.py, split_pdf.py, fill_fillable_fields.py and
+fill_pdf_form_with_annotations.py take --optimize fast|small|web and write
+through write_output(), which runs the preset on the PdfWriter before saving
+and, where qpdf is installed, rewrites the saved file afterwards:
+
+  fast   Flate-compress uncompressed streams at a low level. Cheapest; use it
+         when the output is only an intermediate file.
+  small  Compress every uncompressed stream at the highest level, merge
+         identical objects, drop unreachable ones and downsample images drawn
+         above 150 dpi to JPEG; then pack objects into compressed object
+         streams with qpdf. For files sent over size-limited channels.
+  web    As small, and linearize the file with qpdf so viewers can show the
+         first page before the rest has downloaded. Object streams are kept;
+         qpdf writes them in linearized order.
+
+An image's display size is read from the page's content stream (its current
+transformation matrix at each Do), and an image is only resampled when that
+leaves it more than MIN_DOWNSAMPLE_RATIO oversampled and the re-encoded image
+is smaller than the original. Images inside Form XObjects, and images with
+masks or exotic colour spaces, are sized against the page box or left as they
+are. Without qpdf the pypdf stages still run and the file is written without
+object streams or linearization; check_preset() says so once per command.
+"""
+
+import math
+import os
+import shutil
+import subprocess
+import sys
+
+import pdf_events
+from pdf_io import atomic_output, drop_unreachable, iter_image_xobjects
+
+PRESETS = {
+    'fast': {'compress_level': 1, 'dedupe': False, 'image_dpi': None, 'object_streams': False, 'linearize': False},
+    'small': {'compress_level': 9, 'dedupe': True, 'image_dpi': 150, 'image_quality': 75,
+              'object_streams': True, 'linearize': False},
+    'web': {'compress_level': 9, 'dedupe': True, 'image_dpi': 150, 'image_quality': 80,
+            'object_streams': True, 'linearize': True},
+}
+# Resample only images at least this much larger than their target resolution
+MIN_DOWNSAMPLE_RATIO = 1.25
+DOWNSAMPLE_MODES = ('L', 'RGB', 'CMYK')
+OBJECT_STREAM_ARGS = ['--object-streams=generate', '--compress-streams=y']
+
+
+def pop_optimize_option(argv: list) -> tuple:
+    """Remove "--optimize PRESET" from a hand-parsed argv. Returns (preset or None, remaining argv)."""
+    if '--optimize' not in argv:
+        return None, argv
+    i = argv.index('--optimize')
+    preset = argv[i + 1] if i + 1 < len(argv) else ''
+    if preset not in PRESETS:
+        print(f"Error: --optimize takes one of {', '.join(PRESETS)}")
+        sys.exit(1)
+    return preset, argv[:i] + argv[i + 2:]
+
+
+def check_preset(preset: str) -> None:
+    """Note when the preset's qpdf stages will be skipped because qpdf is not installed."""
+    options = PRESETS[preset]
+    if (options['object_streams'] or options['linearize']) and not shutil.which('qpdf'):
+        skipped = 'object streams and linearization' if options['linearize'] else 'object streams'
+        print(f"Note: qpdf not found; writing without {skipped}")
+
+
+def run_qpdf(path: str, args: list) -> bool:
+    """Rewrite a PDF in place with qpdf and the given options. Returns False if qpdf is unavailable or fails."""
+    qpdf = shutil.which('qpdf')
+    if not qpdf:
+        return False
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    result = subprocess.run([qpdf, *args, path, tmp_path], capture_output=True)
+    # qpdf exits with 3 for warnings but still writes a valid file
+    if result.returncode not in (0, 3) or not os.path.exists(tmp_path):
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        return False
+    os.replace(tmp_path, path)
+    return True
+
+
+def compress_streams(writer, level: int) -> int:
+    """Flate-encode every stream the writer holds without a filter. Returns the number compressed."""
+    from pypdf.generic import StreamObject
+
+    for page in writer.pages:
+        page.compress_content_streams(level=level)
+
+    compressed = 0
+    for index, obj in enumerate(writer._objects):
+        if isinstance(obj, StreamObject) and '/Filter' not in obj:
+            encoded = obj.flate_encode(level=level)
+            encoded.indirect_reference = obj.indirect_reference
+            writer._objects[index] = encoded
+            compressed += 1
+    return compressed
+
+
+def _multiply(m: list, ctm: list) -> list:
+    a, b, c, d, e, f = m
+    A, B, C, D, E, F = ctm
+    return [a * A + b * C, a * B + b * D, c * A + d * C, c * B + d * D, e * A + f * C + E, e * B + f * D + F]
+
+
+def drawn_sizes(page) -> dict:
+    """Return the largest (width, height) in points at which the page's content stream draws each XObject name."""
+    contents = page.get_contents()
+    if contents is None:
+        return {}
+
+    ctm = [1, 0, 0, 1, 0, 0]
+    stack = []
+    sizes = {}
+    for operands, operator in contents.operations:
+        if operator == b'q':
+            stack.append(ctm)
+        elif operator == b'Q':
+            ctm = stack.pop() if stack else [1, 0, 0, 1, 0, 0]
+        elif operator == b'cm' and len(operands) == 6:
+            ctm = _multiply([float(x) for x in operands], ctm)
+        elif operator == b'Do' and operands:
+            width, height = math.hypot(ctm[0], ctm[1]), math.hypot(ctm[2], ctm[3])
+            previous = sizes.get(str(operands[0]), (0, 0))
+            sizes[str(operands[0])] = (max(previous[0], width), max(previous[1], height))
+    return sizes
+
+
+def downsample_images(writer, dpi: int, quality: int) -> int:
+    """Re-encode images drawn at more than dpi as JPEG at dpi. Returns the number replaced."""
+    from PIL import Image
+
+    # Image object number -> (page, images key, largest drawn size); shared images keep their largest use
+    images = {}
+    for page in writer.pages:
+        sizes = drawn_sizes(page)
+        page_size = (float(page.mediabox.width), float(page.mediabox.height))
+        for key, ref in iter_image_xobjects(page.get('/Resources')):
+            # Form contents are not walked, so images inside forms are sized against the page
+            size = sizes.get(key, page_size) if isinstance(key, str) else page_size
+            first_page, first_key, used = images.get(ref.idnum, (page, key, (0, 0)))
+            images[ref.idnum] = (first_page, first_key, (max(used[0], size[0]), max(used[1], size[1])))
+
+    replaced = 0
+    for idnum, (page, key, (shown_width, shown_height)) in images.items():
+        stream = writer._objects[idnum - 1]
+        if stream.get('/ImageMask') or '/SMask' in stream or '/Mask' in stream:
+            continue
+        width, height = int(stream.get('/Width', 0)), int(stream.get('/Height', 0))
+        if not width or not height:
+            continue
+        scale = max(shown_width * dpi / 72 / width, shown_height * dpi / 72 / height)
+        if scale * MIN_DOWNSAMPLE_RATIO > 1:
+            continue
+
+        try:
+            image_file = page.images[key]
+            image = image_file.image
+        except Exception:
+            # Colour spaces or filters pypdf cannot decode are left alone
+            continue
+        if image is None or image.mode not in DOWNSAMPLE_MODES:
+            continue
+        image_file.replace(image.resize((max(1, round(width * scale)), max(1, round(height * scale))),
+                                        Image.LANCZOS), quality=quality)
+        if len(writer._objects[idnum - 1]._data) >= len(stream._data):
+            # Keep the original when re-encoding does not make it smaller
+            writer._objects[idnum - 1] = stream
+            continue
+        replaced += 1
+    return replaced
+
+
+def optimize_writer(writer, preset: str) -> dict:
+    """Run a preset's pypdf stages on writer before it is saved. Returns counts for reporting."""
+    options = PRESETS[preset]
+    stats = {}
+    if options['image_dpi']:
+        stats['images'] = downsample_images(writer, options['image_dpi'], options['image_quality'])
+    stats['streams'] = compress_streams(writer, options['compress_level'])
+    if options['dedupe']:
+        writer.compress_identical_objects()
+        stats['dropped'] = drop_unreachable(writer)
+    return stats
+
+
+def finish_output(path: str, preset: str) -> bool:
+    """Run a preset's qpdf stages on the saved file. Returns True if qpdf rewrote it."""
+    options = PRESETS[preset]
+    args = []
+    if options['object_streams']:
+        args += OBJECT_STREAM_ARGS
+    if options['linearize']:
+        args.append('--linearize')
+    return bool(args) and run_qpdf(path, args)
+
+
+def write_output(writer, output_path: str, preset: str = None) -> None:
+    """Save writer to output_path atomically, optimized with preset if one is given."""
+    if not preset:
+        with atomic_output(output_path) as f:
+            writer.write(f)
+        return
+
+    with pdf_events.phase('optimize', preset=preset):
+        stats = optimize_writer(writer, preset)
+        with atomic_output(output_path) as f:
+            writer.write(f)
+        if finish_output(output_path, preset):
+            pdf_events.file_bytes('written', output_path)
+    pdf_events.emit('optimized', preset=preset, **stats)
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Long-lived PDF worker that keeps parsed documents warm between commands.
+
+Usage:
+  python pdf_worker.py                      # JSON-RPC over stdin/stdout, one request per line
+  python pdf_worker.py --socket <path>      # JSON-RPC over a Unix socket
+  python pdf_worker.py --port <port>        # JSON-RPC over TCP on 127.0.0.1
+
+Requests use JSON-RPC 2.0 with named params matching the script functions:
+  {"jsonrpc": "2.0", "id": 1, "method": "check_fillable_fields", "params": {"pdf_path": "/abs/form.pdf"}}
+
+and get back the value the function returned, what it printed and its exit code:
+  {"jsonrpc": "2.0", "id": 1, "result": {"value": true, "output": "Found 3 ...", "exit_code": 0}}
+
+Open PdfReader objects are cached by path (LRU, --cache-size, default 8) and
+reparsed only when the file's mtime or size changes, so a multi-step form fill
+parses the PDF once. The worker has its own "stats" and "invalidate" methods.
+
+A request with "events": true also gets the command's structured events
+(see pdf_events.py) back as "events" in the result.
+
+The existing scripts are thin clients: when PDF_WORKER_SOCKET is set to a
+socket path (or tcp://127.0.0.1:<port>), they forward their command to the
+worker and print its output; otherwise they run locally as before.
+"""
+
+import argparse
+import contextlib
+import importlib
+import inspect
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+
+# method name -> (module, function)
+METHODS = {
+    'check_fillable_fields': ('check_fillable_fields', 'check_fillable_fields'),
+    'extract_form_fields': ('extract_form_field_info', 'extract_form_fields'),
+    'fill_form_fields': ('fill_fillable_fields', 'fill_form_fields'),
+    'fill_form_with_annotations': ('fill_pdf_form_with_annotations', 'fill_form_with_annotations'),
+    'convert_pdf_to_images': ('convert_pdf_to_images', 'convert_pdf_to_images'),
+    'create_validation_image': ('create_validation_image', 'create_validation_image'),
+    'create_validation_images': ('create_validation_image', 'create_validation_images'),
+    'check_bounding_boxes': ('check_bounding_boxes', 'check_bounding_boxes'),
+    'merge_pdfs': ('merge_pdfs', 'merge_pdfs'),
+    'split_pdf': ('split_pdf', 'split_pdf'),
+    'extract_pages': ('split_pdf', 'extract_pages'),
+    'extract_text': ('extract_text', 'extract_text'),
+    'extract_images': ('extract_images', 'extract_images'),
+    'ocr_pdf': ('ocr_pdf', 'ocr_pdf'),
+    'watermark': ('watermark', 'watermark'),
+}
+
+SOCKET_ENV = 'PDF_WORKER_SOCKET'
+
+
+def _error(request_id, code: int, message: str) -> dict:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+def handle_request(request: dict) -> dict:
+    """Run one JSON-RPC request in this process and build the response."""
+    from pdf_io import get_reader_cache, memory_usage
+
+    request_id = request.get('id')
+    method = request.get('method')
+    params = request.get('params') or {}
+
+    if method == 'stats':
+        return {"jsonrpc": "2.0", "id": request_id, "result": {"value": dict(get_reader_cache().stats(), memory=memory_usage())}}
+    if method == 'invalidate':
+        get_reader_cache().invalidate(params.get('path'))
+        return {"jsonrpc": "2.0", "id": request_id, "result": {"value": None}}
+    if method not in METHODS:
+        return _error(request_id, -32601, f"Unknown method: {method}")
+
+    module_name, function_name = METHODS[method]
+    try:
+        function = getattr(importlib.import_module(module_name), function_name)
+    except ImportError as e:
+        return _error(request_id, -32603, f"Cannot load {module_name}: {e}")
+
+    try:
+        if isinstance(params, list):
+            inspect.signature(function).bind(*params)
+        else:
+            inspect.signature(function).bind(**params)
+    except TypeError as e:
+        return _error(request_id, -32602, f"Invalid params for {method}: {e}")
+
+    # Scripts report progress with print() and fail with sys.exit(); capture both,
+    # plus the structured events when the client asked for them
+    output = io.StringIO()
+    exit_code = 0
+    value = None
+    events = contextlib.nullcontext(None)
+    if request.get('events'):
+        import pdf_events
+        events = pdf_events.collect(method)
+    try:
+        with contextlib.redirect_stdout(output), events as collected:
+            if isinstance(params, list):
+                value = function(*params)
+            else:
+                value = function(**params)
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except Exception as e:
+        output.write(f"Error: {e}\n")
+        exit_code = 1
+
+    result = {"value": value, "output": output.getvalue(), "exit_code": exit_code}
+    if collected is not None:
+        result["events"] = collected
+    return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+
+def _handle_line(line: str) -> str:
+    try:
+        request = json.loads(line)
+    except ValueError as e:
+        response = _error(None, -32700, f"Parse error: {e}")
+    else:
+        response = handle_request(request)
+    return json.dumps(response, default=str) + '\n'
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for raw in self.rfile:
+            line = raw.decode('utf-8').strip()
+            if line:
+                self.wfile.write(_handle_line(line).encode('utf-8'))
+                self.wfile.flush()
+
+
+def serve_stdio() -> None:
+    """Serve requests from stdin, writing responses to the real stdout."""
+    out = sys.stdout
+    for line in sys.stdin:
+        line = line.strip()
+        if line:
+            out.write(_handle_line(line))
+            out.flush()
+
+
+def serve_socket(socket_path: str = None, port: int = None) -> None:
+    """Serve requests on a Unix socket or a loopback TCP port, one at a time."""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = socketserver.UnixStreamServer(socket_path, _RequestHandler)
+        address = socket_path
+    else:
+        server = socketserver.TCPServer(('127.0.0.1', port), _RequestHandler)
+        address = f"tcp://127.0.0.1:{server.server_address[1]}"
+
+    print(f"PDF worker listening on {address}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def _connect(address: str):
+    if address.startswith('tcp://'):
+        host, port = address[len('tcp://'):].rsplit(':', 1)
+        return socket.create_connection((host, int(port)))
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(address)
+    return sock
+
+
+def worker_configured() -> bool:
+    """Return True when the scripts should try to use a running worker."""
+    return bool(os.environ.get(SOCKET_ENV))
+
+
+def call_worker(method: str, **params):
+    """Forward a script command to a running worker, if PDF_WORKER_SOCKET is set.
+
+    Prints the worker's captured output and re-raises its exit code. Returns the
+    result dict, or None when no worker is reachable and the caller should run
+    locally.
+    """
+    import pdf_events
+    pdf_events.start_command(method)
+
+    address = os.environ.get(SOCKET_ENV)
+    if not address:
+        return None
+
+    try:
+        sock = _connect(address)
+    except OSError:
+        return None
+
+    request = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
+    if pdf_events.enabled():
+        request["events"] = True
+    with sock, sock.makefile('rwb') as stream:
+        stream.write((json.dumps(request) + '\n').encode('utf-8'))
+        stream.flush()
+        response = json.loads(stream.readline().decode('utf-8'))
+
+    if 'error' in response:
+        print(f"Error from PDF worker: {response['error']['message']}")
+        sys.exit(1)
+
+    result = response['result']
+    pdf_events.replay(result.get('events', []))
+    if result.get('output'):
+        sys.stdout.write(result['output'])
+    if result.get('exit_code'):
+        sys.exit(result['exit_code'])
+    return result
+
+
+def main(argv: list = None) -> None:
+    """Command-line entry point; argv defaults to sys.argv[1:]."""
+    parser = argparse.ArgumentParser(description="Long-lived PDF worker with a parsed-document cache.")
+    transport = parser.add_mutually_exclusive_group()
+    transport.add_argument('--socket', dest='socket_path', help="Listen on this Unix socket path")
+    transport.add_argument('--port', type=int, help="Listen on this TCP port on 127.0.0.1 (0 picks one)")
+    parser.add_argument('--cache-size', type=int, default=8, help="Maximum number of open documents (default: 8)")
+    args = parser.parse_args(argv)
+
+    from pdf_io import ReaderCache, set_reader_cache
+    set_reader_cache(ReaderCache(args.cache_size))
+
+    if args.socket_path or args.port is not None:
+        serve_socket(args.socket_path, args.port)
+    else:
+        serve_stdio()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for rendered PDF page images.
+
+Used by convert_pdf_to_images.py so that re-rendering an unchanged document
+(for example after each bounding-box correction in the forms workflow) only
+costs a hash of the PDF.
+
+Entries are keyed by (PDF content hash, page, dpi, format, quality) and live in
+a user cache directory:
+- $PDF_RENDER_CACHE_DIR if set
+- otherwise $XDG_CACHE_HOME/aionui-pdf/renders (~/.cache/aionui-pdf/renders)
+
+The cache is bounded by $PDF_RENDER_CACHE_MAX_MB (default 512) and evicts the
+least recently used pages first. Pages are copied in and out of the cache
+(cloned where the filesystem supports it), never hard-linked, so output
+files can be edited freely.
+
+Usage: python render_cache.py [clear|info]
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+DEFAULT_MAX_MB = 512
+HASH_CHUNK_SIZE = 1024 * 1024
+# Linux ioctl that clones a file's extents into another file
+FICLONE = 0x40049409
+
+
+def get_cache_root() -> str:
+    """Return the base cache directory shared by the pdf scripts."""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'aionui-pdf')
+
+
+def get_cache_dir() -> str:
+    """Return the render cache directory."""
+    cache_dir = os.environ.get('PDF_RENDER_CACHE_DIR')
+    if cache_dir:
+        return cache_dir
+    return os.path.join(get_cache_root(), 'renders')
+
+
+def get_max_bytes() -> int:
+    """Return the cache size limit in bytes."""
+    try:
+        max_mb = float(os.environ.get('PDF_RENDER_CACHE_MAX_MB', DEFAULT_MAX_MB))
+    except ValueError:
+        max_mb = DEFAULT_MAX_MB
+    return int(max_mb * 1024 * 1024)
+
+
+def hash_file(path: str) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def copy_file(src: str, dst: str) -> None:
+    """Copy src to dst as a new file, cloning the data where the filesystem supports it.
+
+    dst is written to a temporary file that replaces it, so an existing dst
+    (such as a hard link left by an older version of this cache) is never
+    written through, and readers never see a partial file. Cache entries and
+    output files never share an inode: editing an output image cannot change
+    the cached copy, and marking an entry as used does not touch the output.
+    """
+    tmp_path = f"{dst}.{os.getpid()}.tmp"
+    try:
+        with open(src, 'rb') as fsrc, open(tmp_path, 'wb') as fdst:
+            try:
+                import fcntl
+                # Copy-on-write clone (btrfs, XFS, APFS-like filesystems); no data is copied
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            except (ImportError, OSError):
+                shutil.copyfileobj(fsrc, fdst, HASH_CHUNK_SIZE)
+        os.replace(tmp_path, dst)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+class RenderCache:
+    """Render cache for the pages of a single PDF."""
+
+    def __init__(self, pdf_path: str, cache_dir: str = None):
+        self.cache_dir = cache_dir or get_cache_dir()
+        self.pdf_hash = hash_file(pdf_path)
+        self.doc_dir = os.path.join(self.cache_dir, self.pdf_hash[:2], self.pdf_hash)
+
+    def _entry_path(self, page_num: int, dpi: int, ext: str, quality: int) -> str:
+        suffix = f"_q{quality}" if ext != 'png' else ''
+        return os.path.join(self.doc_dir, f"page_{page_num}_{dpi}dpi{suffix}.{ext}")
+
+    def get_page_count(self):
+        """Return the cached page count for this document, or None."""
+        try:
+            with open(os.path.join(self.doc_dir, 'info.json'), 'r', encoding='utf-8') as f:
+                return json.load(f).get('pages')
+        except (OSError, ValueError):
+            return None
+
+    def set_page_count(self, pages: int) -> None:
+        """Record the page count so later runs can skip pdfinfo."""
+        os.makedirs(self.doc_dir, exist_ok=True)
+        with open(os.path.join(self.doc_dir, 'info.json'), 'w', encoding='utf-8') as f:
+            json.dump({'pages': pages}, f)
+
+    def fetch(self, page_num: int, dpi: int, ext: str, quality: int, output_path: str) -> bool:
+        """Place a cached page at output_path. Returns False on a cache miss."""
+        entry = self._entry_path(page_num, dpi, ext, quality)
+        if not os.path.isfile(entry):
+            return False
+        try:
+            copy_file(entry, output_path)
+            # Mark as recently used for LRU eviction
+            os.utime(entry)
+        except OSError:
+            return False
+        return True
+
+    def store(self, page_num: int, dpi: int, ext: str, quality: int, output_path: str) -> None:
+        """Add a freshly rendered page to the cache."""
+        entry = self._entry_path(page_num, dpi, ext, quality)
+        try:
+            os.makedirs(self.doc_dir, exist_ok=True)
+            copy_file(output_path, entry)
+        except OSError:
+            # The cache is an optimisation; never fail a render because of it
+            pass
+
+
+def evict(cache_dir: str = None, max_bytes: int = None) -> int:
+    """Delete least recently used pages until the cache fits. Returns bytes freed."""
+    cache_dir = cache_dir or get_cache_dir()
+    max_bytes = get_max_bytes() if max_bytes is None else max_bytes
+    if not os.path.isdir(cache_dir):
+        return 0
+
+    entries = []
+    total = 0
+    for root, _, files in os.walk(cache_dir):
+        for name in files:
+            if name == 'info.json':
+                continue
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+    freed = 0
+    if total <= max_bytes:
+        return freed
+
+    entries.sort()
+    for _, size, path in entries:
+        if total - freed <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+            freed += size
+        except OSError:
+            continue
+
+    # Drop document directories that no longer hold any pages
+    for root, dirs, files in os.walk(cache_dir, topdown=False):
+        if root != cache_dir and set(files) <= {'info.json'} and not dirs:
+            shutil.rmtree(root, ignore_errors=True)
+
+    return freed
+
+
+def main(argv: list = None) -> None:
+    """Command-line entry point; argv defaults to sys.argv[1:]."""
+    argv = sys.argv[1:] if argv is None else argv
+
+    command = argv[0] if len(argv) > 0 else 'info'
+    cache_dir = get_cache_dir()
+
+    if command == 'clear':
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        print(f"Cleared render cache: {cache_dir}")
+    elif command == 'info':
+        total = 0
+        count = 0
+        for root, _, files in os.walk(cache_dir):
+            for name in files:
+                if name != 'info.json':
+                    total += os.path.getsize(os.path.join(root, name))
+                    count += 1
+        print(f"Render cache: {cache_dir}")
+        print(f"  {count} page image(s), {total / (1024 * 1024):.1f} MB of {get_max_bytes() / (1024 * 1024):.0f} MB")
+    else:
+        print("Usage: python render_cache.py [clear|info]")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,76 +6,320 @@ Usage:
   python split_pdf.py <input.pdf> <output_dir>              # Split all pages
   python split_pdf.py <input.pdf> <output.pdf> 1-5          # Extract pages 1-5
   python split_pdf.py <input.pdf> <output.pdf> 1,3,5        # Extract specific pages
+  python split_pdf.py <input.pdf> <output_dir> --every 10   # Chunks of 10 pages
+  python split_pdf.py <input.pdf> <output_dir> --max-size 5 # Chunks of about 5 MB
+  python split_pdf.py <input.pdf> <output_dir> --by-outline # One file per top-level bookmark
+  python split_pdf.py <input.pdf> <output_dir> --optimize small  # Smaller chunks
+
+Splitting into a directory runs on a process pool (--workers, default: all
+cores); each worker opens the input once and writes whole chunks. Resources a
+page does not reference from its content stream (for example fonts inherited
+from a parent /Pages node) are pruned before the page is copied, so each
+output only carries what it draws. --optimize fast|small|web applies one of
+the shared output presets to every file written.
 """
 
+import argparse
 import os
-import sys
-from pypdf import PdfReader, PdfWriter
-
-
-def parse_page_range(range_str: str, total_pages: int) -> list:
-    """Parse page range string into list of page numbers (0-indexed)."""
-    pages = []
-    for part in range_str.split(','):
-        part = part.strip()
-        if '-' in part:
-            start, end = part.split('-')
-            start = int(start) - 1  # Convert to 0-indexed
-            end = int(end)
-            pages.extend(range(start, min(end, total_pages)))
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import pdf_events
+from pdf_io import open_reader, parse_pages
+from pdf_optimize import PRESETS, check_preset, write_output
+from pdf_worker import call_worker
+
+PRUNABLE_RESOURCES = ('/Font', '/XObject', '/ExtGState', '/ColorSpace', '/Pattern', '/Shading', '/Properties')
+NAME_TOKEN = re.compile(rb'/([^\s/\[\]()<>{}%]+)')
+NAME_ESCAPE = re.compile(rb'#([0-9A-Fa-f]{2})')
+
+# Per-worker reader, opened once by _init_worker
+_worker_reader = None
+
+
+def referenced_names(page) -> set:
+    """Return the resource names used by a page's content stream."""
+    contents = page.get_contents()
+    if contents is None:
+        return set()
+    return content_names(contents)
+
+
+def content_names(stream) -> set:
+    """Return the resource names used by a content stream's data."""
+    return {
+        '/' + NAME_ESCAPE.sub(lambda m: bytes([int(m.group(1), 16)]), name).decode('latin-1')
+        for name in NAME_TOKEN.findall(stream.get_data())
+    }
+
+
+def add_inherited_form_names(xobjects, names: set) -> None:
+    """Add the names used by Form XObjects that have no /Resources of their own.
+
+    Such forms draw with the page's resources, so what they use must survive
+    pruning too; nested forms without resources are followed the same way.
+    """
+    pending = list(names)
+    seen = set()
+    while pending:
+        name = pending.pop()
+        if name in seen or name not in xobjects:
+            continue
+        seen.add(name)
+        stream = xobjects[name].get_object()
+        if stream.get('/Subtype') == '/Form' and '/Resources' not in stream:
+            used = content_names(stream)
+            pending.extend(used - names)
+            names.update(used)
+
+
+def prune_page_resources(page) -> None:
+    """Replace a page's resources with a copy holding only referenced entries.
+
+    The original (possibly shared, inherited) resource dictionaries are left
+    untouched so other pages of the same reader are unaffected. Names used by
+    forms that borrow the page's resources count as referenced.
+    """
+    from pypdf.generic import DictionaryObject, NameObject
+
+    resources = page.get('/Resources')
+    if resources is None:
+        return
+    resources = resources.get_object()
+    names = referenced_names(page)
+    if '/XObject' in resources:
+        add_inherited_form_names(resources['/XObject'].get_object(), names)
+
+    pruned = DictionaryObject()
+    for key, value in resources.items():
+        if key in PRUNABLE_RESOURCES:
+            entries = value.get_object()
+            kept = DictionaryObject({k: v for k, v in entries.items() if k in names})
+            if kept:
+                pruned[NameObject(key)] = kept
         else:
-            page = int(part) - 1  # Convert to 0-indexed
-            if 0 <= page < total_pages:
-                pages.append(page)
-    return pages
+            pruned[NameObject(key)] = value
+    page[NameObject('/Resources')] = pruned
 
 
-def split_all_pages(input_path: str, output_dir: str) -> None:
-    """Split PDF into individual pages."""
+def write_pages(reader, page_indices: list, output_path: str, shared_reader: bool = False,
+                optimize: str = None) -> None:
+    """Write the given 0-indexed pages of reader to output_path with pruned resources.
+
+    Pages of a private reader are pruned before copying, so unused resources
+    are never read. With a shared (cached) reader the copies are pruned instead
+    and the orphaned resources are dropped before writing.
+    """
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for index in page_indices:
+        page = reader.pages[index]
+        if shared_reader:
+            prune_page_resources(writer.add_page(page))
+        else:
+            prune_page_resources(page)
+            writer.add_page(page)
+    if not optimize:
+        writer.compress_identical_objects()
+    write_output(writer, output_path, optimize)
+
+
+def _init_worker(input_path: str) -> None:
+    global _worker_reader
+    _worker_reader = open_reader(input_path)
+
+
+def _write_chunk(chunk: tuple) -> str:
+    page_indices, output_path, optimize = chunk
+    write_pages(_worker_reader, page_indices, output_path, optimize=optimize)
+    return output_path
+
+
+def chunks_every(total_pages: int, every: int) -> list:
+    """Group pages into consecutive chunks of `every` pages."""
+    return [list(range(start, min(start + every, total_pages))) for start in range(0, total_pages, every)]
+
+
+def _xobject_sizes(resources, names, sizes: dict) -> None:
+    """Record the encoded size of each XObject in resources used by `names`.
+
+    Form XObjects are followed into their own resources so that images drawn
+    through a form are counted.
+    """
+    if resources is None:
+        return
+    xobjects = resources.get_object().get('/XObject')
+    if xobjects is None:
+        return
+    for name, ref in xobjects.get_object().items():
+        key = getattr(ref, 'idnum', None) or id(ref)
+        if (names is not None and name not in names) or key in sizes:
+            continue
+        stream = ref.get_object()
+        # pypdf drops /Length after parsing; the encoded bytes are kept in _data
+        sizes[key] = len(getattr(stream, '_data', None) or b'')
+        if stream.get('/Subtype') == '/Form':
+            _xobject_sizes(stream.get('/Resources'), None, sizes)
+
+
+def chunks_by_size(reader, max_bytes: int) -> list:
+    """Group consecutive pages so each chunk's estimated size stays under max_bytes.
+
+    The estimate is the size of each page's content stream plus every image or
+    form XObject it references, counting resources shared within a chunk once.
+    """
+    chunks = []
+    current = []
+    current_size = 0
+    seen = set()
+
+    for index, page in enumerate(reader.pages):
+        contents = page.get_contents()
+        content_size = len(contents.get_data()) if contents is not None else 0
+
+        xobject_sizes = {}
+        _xobject_sizes(page.get('/Resources'), referenced_names(page), xobject_sizes)
+
+        page_size = content_size + sum(size for key, size in xobject_sizes.items() if key not in seen)
+        if current and current_size + page_size > max_bytes:
+            chunks.append(current)
+            current, current_size, seen = [], 0, set()
+            page_size = content_size + sum(xobject_sizes.values())
+
+        current.append(index)
+        current_size += page_size
+        seen.update(xobject_sizes)
+
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def chunks_by_outline(reader) -> list:
+    """Group pages by top-level bookmark. Returns (title, page indices) pairs."""
+    starts = []
+    for item in reader.outline:
+        if isinstance(item, list):
+            continue  # Nested bookmarks belong to the preceding top-level item
+        page_num = reader.get_destination_page_number(item)
+        if page_num is not None and page_num >= 0:
+            starts.append((page_num, str(item.title)))
+
+    starts.sort(key=lambda s: s[0])
+    total_pages = len(reader.pages)
+    if not starts or starts[0][0] > 0:
+        starts.insert(0, (0, 'front_matter'))
+
+    sections = []
+    for i, (start, title) in enumerate(starts):
+        end = starts[i + 1][0] if i + 1 < len(starts) else total_pages
+        if end > start:
+            sections.append((title, list(range(start, end))))
+    return sections
+
+
+def safe_filename(title: str) -> str:
+    """Turn a bookmark title into a safe file name component."""
+    name = re.sub(r'[^\w\-]+', '_', title).strip('_')
+    return name[:60] or 'section'
+
+
+def split_pdf(input_path: str, output_dir: str, every: int = None, max_size_mb: float = None,
+              by_outline: bool = False, workers: int = None, optimize: str = None) -> list:
+    """Split a PDF into chunks written by a process pool. Returns the output paths."""
     os.makedirs(output_dir, exist_ok=True)
-    reader = PdfReader(input_path)
+    reader = open_reader(input_path)
+    total_pages = len(reader.pages)
 
-    for i, page in enumerate(reader.pages, start=1):
-        writer = PdfWriter()
-        writer.add_page(page)
-        output_path = os.path.join(output_dir, f"page_{i}.pdf")
-        with open(output_path, 'wb') as f:
-            writer.write(f)
-        print(f"  Created: {output_path}")
+    if by_outline:
+        sections = chunks_by_outline(reader)
+        chunks = [
+            (pages, os.path.join(output_dir, f"{i:03d}_{safe_filename(title)}.pdf"), optimize)
+            for i, (title, pages) in enumerate(sections, start=1)
+        ]
+    else:
+        if max_size_mb:
+            groups = chunks_by_size(reader, int(max_size_mb * 1024 * 1024))
+        else:
+            groups = chunks_every(total_pages, every or 1)
+        chunks = []
+        for pages in groups:
+            if len(pages) == 1:
+                name = f"page_{pages[0] + 1}.pdf"
+            else:
+                name = f"pages_{pages[0] + 1}-{pages[-1] + 1}.pdf"
+            chunks.append((pages, os.path.join(output_dir, name), optimize))
+    del reader
 
-    print(f"\nSplit {len(reader.pages)} pages into {output_dir}")
+    workers = max(1, min(workers or os.cpu_count() or 1, len(chunks) or 1))
+    chunksize = max(1, len(chunks) // (workers * 4))
+    output_paths = []
+    with pdf_events.phase('split', files=len(chunks)), \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(input_path,)) as executor:
+        for output_path in executor.map(_write_chunk, chunks, chunksize=chunksize):
+            output_paths.append(output_path)
+            print(f"  Created: {output_path}")
+            pdf_events.progress('split', len(output_paths), len(chunks), path=output_path)
+            pdf_events.file_bytes('written', output_path)
 
+    print(f"\nSplit {total_pages} pages into {len(output_paths)} file(s) in {output_dir}")
+    return output_paths
 
-def extract_pages(input_path: str, output_path: str, page_range: str) -> None:
-    """Extract specific pages from PDF."""
-    reader = PdfReader(input_path)
-    pages = parse_page_range(page_range, len(reader.pages))
 
-    writer = PdfWriter()
-    for page_num in pages:
-        writer.add_page(reader.pages[page_num])
+def split_all_pages(input_path: str, output_dir: str) -> None:
+    """Split PDF into individual pages."""
+    split_pdf(input_path, output_dir)
+
+
+def extract_pages(input_path: str, output_path: str, page_range: str, optimize: str = None) -> None:
+    """Extract specific pages from PDF."""
+    reader = open_reader(input_path)
+    pages = [page - 1 for page in parse_pages(page_range, len(reader.pages), ordered=True)]
 
-    with open(output_path, 'wb') as f:
-        writer.write(f)
+    write_pages(reader, pages, output_path, shared_reader=True, optimize=optimize)
+    pdf_events.file_bytes('written', output_path)
 
     print(f"Extracted {len(pages)} page(s) to {output_path}")
 
 
-if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage:")
-        print("  python split_pdf.py <input.pdf> <output_dir>              # Split all pages")
-        print("  python split_pdf.py <input.pdf> <output.pdf> 1-5          # Extract pages 1-5")
-        print("  python split_pdf.py <input.pdf> <output.pdf> 1,3,5        # Extract specific pages")
-        sys.exit(1)
-
-    input_path = sys.argv[1]
-    output = sys.argv[2]
-
-    if len(sys.argv) == 3:
-        # Split all pages into directory
-        split_all_pages(input_path, output)
-    else:
+def main(argv: list = None) -> None:
+    """Command-line entry point; argv defaults to sys.argv[1:]."""
+    parser = argparse.ArgumentParser(description="Split a PDF into individual pages or page ranges.")
+    parser.add_argument('input_path', help="Input PDF file")
+    parser.add_argument('output', help="Output directory, or output PDF when a page range is given")
+    parser.add_argument('page_range', nargs='?', help="Pages to extract into a single file, e.g. 1-5 or 1,3,5")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--every', type=int, help="Split into chunks of N pages")
+    mode.add_argument('--max-size', type=float, help="Split into chunks of at most about N MB")
+    mode.add_argument('--by-outline', action='store_true', help="Split at each top-level bookmark")
+    parser.add_argument('--workers', type=int, help="Number of worker processes (default: all cores)")
+    parser.add_argument('--optimize', choices=list(PRESETS), help="Output optimization preset")
+    args = parser.parse_args(argv)
+    if args.optimize:
+        check_preset(args.optimize)
+
+    input_path = os.path.abspath(args.input_path)
+    output = os.path.abspath(args.output)
+    if args.page_range:
         # Extract specific pages
-        page_range = sys.argv[3]
-        extract_pages(input_path, output, page_range)
+        params = {'input_path': input_path, 'output_path': output, 'page_range': args.page_range,
+                  'optimize': args.optimize}
+        if call_worker('extract_pages', **params) is None:
+            extract_pages(**params)
+    else:
+        params = {
+            'input_path': input_path,
+            'output_dir': output,
+            'every': args.every,
+            'max_size_mb': args.max_size,
+            'by_outline': args.by_outline,
+            'workers': args.workers,
+            'optimize': args.optimize,
+        }
+        if call_worker('split_pdf', **params) is None:
+            split_pdf(**params)
+
+
+if __name__ == "__main__":
+    main()
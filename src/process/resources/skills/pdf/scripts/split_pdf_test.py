@@ -0,0 +1,88 @@
+import unittest
+import os
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+from split_pdf import extract_pages
+
+
+def create_resourceless_form_pdf(path):
+    """Helper to write a page whose text is drawn by a Form XObject that borrows the page's font"""
+    from pypdf import PdfWriter
+    from pypdf.generic import ArrayObject, DecodedStreamObject, DictionaryObject, FloatObject, NameObject
+
+    def font(base):
+        return DictionaryObject({NameObject('/Type'): NameObject('/Font'), NameObject('/Subtype'): NameObject('/Type1'),
+                                 NameObject('/BaseFont'): NameObject(base)})
+
+    writer = PdfWriter()
+    page = writer.add_blank_page(612, 792)
+    form = DecodedStreamObject()
+    form.set_data(b"BT /F1 12 Tf 72 700 Td (Drawn by a form) Tj ET")
+    form.update({
+        NameObject('/Type'): NameObject('/XObject'),
+        NameObject('/Subtype'): NameObject('/Form'),
+        NameObject('/BBox'): ArrayObject(FloatObject(v) for v in (0, 0, 612, 792)),
+    })
+    contents = DecodedStreamObject()
+    contents.set_data(b"q /Fm0 Do Q")
+    page[NameObject('/Contents')] = writer._add_object(contents)
+    page[NameObject('/Resources')] = DictionaryObject({
+        NameObject('/Font'): DictionaryObject({NameObject('/F1'): font('/Helvetica'), NameObject('/F2'): font('/Courier')}),
+        NameObject('/XObject'): DictionaryObject({NameObject('/Fm0'): writer._add_object(form)}),
+    })
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+# Run with `npm run test:pdf-skill`, or `python -m pytest` in this directory.
+class TestExtractPages(unittest.TestCase):
+
+    def setUp(self):
+        from reportlab.pdfgen import canvas
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.tmp.name, "input.pdf")
+        self.output_path = os.path.join(self.tmp.name, "output.pdf")
+        c = canvas.Canvas(self.input_path, pagesize=(612, 792))
+        for number in range(1, 6):
+            c.drawString(72, 700, f"Page {number}")
+            c.showPage()
+        c.save()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def extracted_texts(self, page_range):
+        """Helper to extract a page range and return the text of each output page"""
+        from pypdf import PdfReader
+
+        with redirect_stdout(StringIO()):
+            extract_pages(self.input_path, self.output_path, page_range)
+        return [page.extract_text().strip() for page in PdfReader(self.output_path).pages]
+
+    def test_range_in_order(self):
+        """Test that a plain range is extracted in page order"""
+        self.assertEqual(self.extracted_texts("2-4"), ["Page 2", "Page 3", "Page 4"])
+
+    def test_reordered_range(self):
+        """Test that pages are written in the order given, repeats included"""
+        self.assertEqual(self.extracted_texts("5,1-2,5"), ["Page 5", "Page 1", "Page 2", "Page 5"])
+
+    def test_form_without_resources_keeps_page_font(self):
+        """Test that pruning keeps resources used by a form that has no /Resources of its own"""
+        from pypdf import PdfReader
+
+        create_resourceless_form_pdf(self.input_path)
+        with redirect_stdout(StringIO()):
+            extract_pages(self.input_path, self.output_path, "1")
+
+        resources = PdfReader(self.output_path).pages[0]['/Resources']
+        self.assertIn('/Fm0', resources['/XObject'])
+        self.assertIn('/F1', resources['/Font'])
+        self.assertNotIn('/F2', resources['/Font'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Stamp a watermark onto PDFs, sharing one Form XObject across all pages.
+
+Usage:
+  python watermark.py <input.pdf> <output.pdf> --text "CONFIDENTIAL" [options]
+  python watermark.py <input.pdf> <output.pdf> --image logo.png [options]
+  python watermark.py <input.pdf> <output.pdf> --pdf letterhead.pdf [options]
+  python watermark.py <input_dir> <output_dir> --text "DRAFT" [--workers N] [options]
+
+Options:
+  --pages 1-3,9        Pages to stamp (default: all)
+  --position P         center, top, bottom, top-left, top-right, bottom-left or bottom-right (default: center)
+  --rotate DEG         Rotation in degrees (default: 45 for text, 0 otherwise)
+  --opacity A          0-1 (default: 0.3 for text, 1 otherwise)
+  --scale S            Scale factor for the stamp (default: 1)
+  --font-size N        Text size in points (default: 60)
+  --color RRGGBB       Text colour (default: 808080)
+  --under              Draw beneath the page content instead of over it
+
+The stamp is stored once per document as a Form XObject and each page only
+gets a short content stream that places it, appended to the original file as
+an incremental update. The cost per page is constant and the output is only a
+few hundred bytes per page larger than the input. Encrypted or damaged inputs
+cannot take an incremental update and are rewritten in full first. Positions
+refer to the page as displayed, so they follow the page's /Rotate. With
+directories, every *.pdf in the input directory is stamped by a process pool.
+
+Dependencies: pip install pypdf reportlab (Pillow for --image)
+"""
+
+import argparse
+import glob
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import pdf_events
+from pdf_io import IncrementalWriter, atomic_output, content_refs, open_reader, page_range, select_pages
+from pdf_worker import call_worker
+
+POSITIONS = ('center', 'top', 'bottom', 'top-left', 'top-right', 'bottom-left', 'bottom-right')
+MARGIN = 36
+STAMP_NAME = '/AionStamp'
+
+
+def build_text_stamp(text: str, font_size: float, color: str) -> bytes:
+    """Render text onto a tightly sized one-page PDF."""
+    from reportlab.lib.colors import HexColor
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    from reportlab.pdfgen import canvas
+
+    font = 'Helvetica-Bold'
+    width = stringWidth(text, font, font_size)
+    height = font_size * 1.2
+
+    packet = BytesIO()
+    c = canvas.Canvas(packet, pagesize=(width, height))
+    c.setFont(font, font_size)
+    c.setFillColor(HexColor(f'#{color}'))
+    # Baseline sits above the descenders
+    c.drawString(0, font_size * 0.25, text)
+    c.showPage()
+    c.save()
+    return packet.getvalue()
+
+
+def build_image_stamp(image_path: str) -> bytes:
+    """Place an image onto a one-page PDF sized by the image's resolution."""
+    from PIL import Image
+    from reportlab.pdfgen import canvas
+
+    with Image.open(image_path) as img:
+        dpi = img.info.get('dpi', (72, 72))[0] or 72
+        width, height = img.width * 72 / dpi, img.height * 72 / dpi
+
+    packet = BytesIO()
+    c = canvas.Canvas(packet, pagesize=(width, height))
+    c.drawImage(image_path, 0, 0, width, height, mask='auto')
+    c.showPage()
+    c.save()
+    return packet.getvalue()
+
+
+def build_stamp(text: str = None, image_path: str = None, pdf_path: str = None, font_size: float = 60,
+                color: str = '808080') -> bytes:
+    """Return the stamp as a one-page PDF, whatever its source."""
+    if text is not None:
+        return build_text_stamp(text, font_size, color)
+    if image_path is not None:
+        return build_image_stamp(image_path)
+    with open(pdf_path, 'rb') as f:
+        return f.read()
+
+
+def add_stamp_form(writer, stamp_page, opacity: float):
+    """Import the stamp page as a Form XObject. Returns (reference, left, bottom, width, height)."""
+    from pypdf.generic import ArrayObject, DictionaryObject, FloatObject, NameObject
+
+    box = stamp_page.mediabox
+    bbox = ArrayObject([FloatObject(v) for v in (box.left, box.bottom, box.right, box.top)])
+    resources = stamp_page.raw_get('/Resources') if '/Resources' in stamp_page else DictionaryObject()
+    contents = stamp_page.get_contents()
+    form = writer.add_stream(contents.get_data() if contents is not None else b"", {
+        NameObject('/Type'): NameObject('/XObject'),
+        NameObject('/Subtype'): NameObject('/Form'),
+        NameObject('/BBox'): bbox,
+        NameObject('/Resources'): writer.import_object(resources),
+    })
+
+    if opacity < 1:
+        # Wrap the stamp in a form that sets the transparency for all of it
+        form = writer.add_stream(b"/GS0 gs /Stamp Do", {
+            NameObject('/Type'): NameObject('/XObject'),
+            NameObject('/Subtype'): NameObject('/Form'),
+            NameObject('/BBox'): bbox,
+            NameObject('/Resources'): DictionaryObject({
+                NameObject('/ExtGState'): DictionaryObject({NameObject('/GS0'): DictionaryObject({
+                    NameObject('/Type'): NameObject('/ExtGState'),
+                    NameObject('/ca'): FloatObject(opacity),
+                    NameObject('/CA'): FloatObject(opacity),
+                })}),
+                NameObject('/XObject'): DictionaryObject({NameObject('/Stamp'): form}),
+            }),
+        })
+    return form, float(box.left), float(box.bottom), float(box.width), float(box.height)
+
+
+def placement(page, stamp_size: tuple, position: str, rotate: float, scale: float) -> str:
+    """Return the cm operands that place the stamp on a page."""
+    left, bottom, width, height = stamp_size
+    box = page.cropbox
+    page_left, page_bottom = float(box.left), float(box.bottom)
+    page_width, page_height = float(box.width), float(box.height)
+    page_rotate = int(page.get('/Rotate', 0) or 0) % 360
+
+    # Positions are worked out on the page as displayed, which is turned by /Rotate
+    shown_width, shown_height = (page_height, page_width) if page_rotate in (90, 270) else (page_width, page_height)
+    angle = math.radians(rotate)
+    cos, sin = math.cos(angle) * scale, math.sin(angle) * scale
+
+    # Half extents of the rotated, scaled stamp, used to keep corners inside the margin
+    half_w = (abs(cos) * width + abs(sin) * height) / 2
+    half_h = (abs(sin) * width + abs(cos) * height) / 2
+    cx = {'left': MARGIN + half_w, 'right': shown_width - MARGIN - half_w}
+    cy = {'top': shown_height - MARGIN - half_h, 'bottom': MARGIN + half_h}
+    parts = position.split('-')
+    u = next((cx[p] for p in parts if p in cx), shown_width / 2)
+    v = next((cy[p] for p in parts if p in cy), shown_height / 2)
+
+    # Map the displayed point back to the page's own coordinates
+    x, y = {
+        0: (page_left + u, page_bottom + v),
+        90: (page_left + page_width - v, page_bottom + u),
+        180: (page_left + page_width - u, page_bottom + page_height - v),
+        270: (page_left + v, page_bottom + page_height - u),
+    }.get(page_rotate, (page_left + u, page_bottom + v))
+
+    # Keep the stamp upright in viewers that honour /Rotate
+    angle = math.radians(rotate + page_rotate)
+    cos, sin = math.cos(angle) * scale, math.sin(angle) * scale
+
+    # Rotate about the stamp's centre, then move the centre to (x, y)
+    ox, oy = left + width / 2, bottom + height / 2
+    e = x - (cos * ox - sin * oy)
+    f = y - (sin * ox + cos * oy)
+    return f"{cos:.6f} {sin:.6f} {-sin:.6f} {cos:.6f} {e:.3f} {f:.3f}"
+
+
+def stamp_incremental(reader, input_path: str, output_path: str, stamp: bytes, page_numbers: list,
+                      position: str, rotate: float, opacity: float, scale: float, under: bool) -> None:
+    """Stamp pages of reader's document and write them as an update after a copy of input_path."""
+    from pypdf import PdfReader
+    from pypdf.generic import ArrayObject, NameObject
+
+    writer = IncrementalWriter(reader)
+    form, *stamp_size = add_stamp_form(writer, PdfReader(BytesIO(stamp)).pages[0], opacity)
+    save_state = writer.add_stream(b"q\n")
+    # Pages of the same size share one placement stream
+    draws = {}
+
+    for page_num in page_numbers:
+        source = reader.pages[page_num - 1]
+        page = writer.get(source.indirect_reference)
+        xobjects = writer.get_entry(writer.page_resources(page), '/XObject')
+        name = STAMP_NAME
+        while name in xobjects and xobjects.raw_get(name) != form:
+            name += "_"
+        xobjects[NameObject(name)] = form
+
+        matrix = placement(source, stamp_size, position, rotate, scale)
+        if (matrix, name, under) not in draws:
+            ops = f"q {matrix} cm {name} Do Q\n"
+            draws[(matrix, name, under)] = writer.add_stream((ops if under else f"\nQ\n{ops}").encode())
+        draw = draws[(matrix, name, under)]
+
+        if under:
+            page[NameObject('/Contents')] = ArrayObject([draw] + content_refs(page))
+        else:
+            page[NameObject('/Contents')] = ArrayObject([save_state] + content_refs(page) + [draw])
+
+    writer.write(input_path, output_path)
+
+
+def watermark_pdf(input_path: str, output_path: str, stamp: bytes, pages: str = None, position: str = 'center',
+                  rotate: float = 0, opacity: float = 1.0, scale: float = 1.0, under: bool = False) -> int:
+    """Stamp one PDF. Returns the number of pages stamped."""
+    from pypdf import PdfReader, PdfWriter
+
+    reader = open_reader(input_path)
+    page_numbers = select_pages(pages, len(reader.pages))
+    options = (stamp, page_numbers, position, rotate, opacity, scale, under)
+
+    try:
+        stamp_incremental(reader, input_path, output_path, *options)
+    except ValueError as e:
+        # Write a clean, unencrypted copy, then stamp that in place
+        print(f"Note: incremental save not possible ({e}); writing a full copy instead")
+        with atomic_output(output_path) as f:
+            PdfWriter(clone_from=reader).write(f)
+        stamp_incremental(PdfReader(output_path), output_path, output_path, *options)
+    return len(page_numbers)
+
+
+def _watermark_one(args: tuple) -> tuple:
+    input_path, output_path, kwargs = args
+    try:
+        return input_path, watermark_pdf(input_path, output_path, **kwargs), None
+    except Exception as e:
+        return input_path, 0, str(e)
+
+
+def watermark(input_path: str, output_path: str, text: str = None, image_path: str = None, pdf_path: str = None,
+              pages: str = None, position: str = 'center', rotate: float = None, opacity: float = None,
+              scale: float = 1.0, font_size: float = 60, color: str = '808080', under: bool = False,
+              workers: int = None) -> int:
+    """Stamp a PDF, or every PDF in a directory in parallel. Returns the number of files stamped."""
+    try:
+        import pypdf  # noqa: F401
+        import reportlab  # noqa: F401
+    except ImportError:
+        print("Error: pypdf and reportlab are required. Install with: pip install pypdf reportlab")
+        sys.exit(1)
+
+    if sum(source is not None for source in (text, image_path, pdf_path)) != 1:
+        print("Error: give exactly one of --text, --image or --pdf")
+        sys.exit(1)
+
+    stamp = build_stamp(text, image_path, pdf_path, font_size, color)
+    kwargs = {
+        'stamp': stamp,
+        'pages': pages,
+        'position': position,
+        'rotate': (45 if text is not None else 0) if rotate is None else rotate,
+        'opacity': (0.3 if text is not None else 1.0) if opacity is None else opacity,
+        'scale': scale,
+        'under': under,
+    }
+
+    if not os.path.isdir(input_path):
+        with pdf_events.phase('stamp'):
+            count = watermark_pdf(input_path, output_path, **kwargs)
+        print(f"Stamped {count} page(s) and saved to {output_path}")
+        return 1
+
+    os.makedirs(output_path, exist_ok=True)
+    jobs = [(path, os.path.join(output_path, os.path.basename(path)), kwargs)
+            for path in sorted(glob.glob(os.path.join(input_path, '*.pdf')))]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
+
+    stamped = 0
+    with pdf_events.phase('stamp', files=len(jobs)), ProcessPoolExecutor(max_workers=workers) as executor:
+        for done, (path, count, error) in enumerate(executor.map(_watermark_one, jobs), start=1):
+            if error:
+                print(f"  Error stamping {path}: {error}")
+            else:
+                stamped += 1
+                print(f"  Stamped {count} page(s) of {path}")
+            pdf_events.progress('stamp', done, len(jobs), path=path, error=error)
+
+    print(f"\nStamped {stamped} of {len(jobs)} PDF(s) into {output_path}")
+    return stamped
+
+
+def main(argv: list = None) -> None:
+    """Command-line entry point; argv defaults to sys.argv[1:]."""
+    parser = argparse.ArgumentParser(description="Stamp a watermark onto a PDF or a directory of PDFs.")
+    parser.add_argument('input_path', help="Input PDF or directory of PDFs")
+    parser.add_argument('output_path', help="Output PDF, or output directory for a directory input")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--text', help="Text to stamp")
+    source.add_argument('--image', dest='image_path', help="Image to stamp")
+    source.add_argument('--pdf', dest='pdf_path', help="PDF whose first page is the stamp")
+    parser.add_argument('--pages', type=page_range, help="Pages to stamp, e.g. 1-3,9 (default: all)")
+    parser.add_argument('--position', choices=POSITIONS, default='center', help="Where to place the stamp")
+    parser.add_argument('--rotate', type=float, help="Rotation in degrees (default: 45 for text, 0 otherwise)")
+    parser.add_argument('--opacity', type=float, help="Opacity 0-1 (default: 0.3 for text, 1 otherwise)")
+    parser.add_argument('--scale', type=float, default=1.0, help="Scale factor for the stamp (default: 1)")
+    parser.add_argument('--font-size', type=float, default=60, help="Text size in points (default: 60)")
+    parser.add_argument('--color', default='808080', help="Text colour as RRGGBB (default: 808080)")
+    parser.add_argument('--under', action='store_true', help="Draw beneath the page content")
+    parser.add_argument('--workers', type=int, help="Processes for directory input (default: all cores)")
+    args = parser.parse_args(argv)
+
+    params = {
+        'input_path': os.path.abspath(args.input_path),
+        'output_path': os.path.abspath(args.output_path),
+        'text': args.text,
+        'image_path': os.path.abspath(args.image_path) if args.image_path else None,
+        'pdf_path': os.path.abspath(args.pdf_path) if args.pdf_path else None,
+        'pages': args.pages,
+        'position': args.position,
+        'rotate': args.rotate,
+        'opacity': args.opacity,
+        'scale': args.scale,
+        'font_size': args.font_size,
+        'color': args.color,
+        'under': args.under,
+        'workers': args.workers,
+    }
+    if call_worker('watermark', **params) is None:
+        watermark(**params)
+
+
+if __name__ == "__main__":
+    main()
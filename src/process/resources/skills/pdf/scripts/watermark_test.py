@@ -0,0 +1,76 @@
+import unittest
+import os
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+from watermark import build_text_stamp, placement, watermark_pdf
+
+
+def create_pdf(path, rotate=0, encrypt=False):
+    """Helper to write a one-page letter-sized PDF, optionally rotated or encrypted"""
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    page = writer.add_blank_page(612, 792)
+    if rotate:
+        page.rotate(rotate)
+    if encrypt:
+        writer.encrypt(user_password='', owner_password='owner', algorithm='AES-128')
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+# Run with `npm run test:pdf-skill`, or `python -m pytest` in this directory.
+class TestWatermark(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.tmp.name, "input.pdf")
+        self.output_path = os.path.join(self.tmp.name, "output.pdf")
+        self.stamp = build_text_stamp("DRAFT", 40, '808080')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def stamp_centre(self, rotate, position):
+        """Helper to return the user-space centre of a 100x20 stamp placed on a page"""
+        from pypdf import PdfReader
+
+        create_pdf(self.input_path, rotate=rotate)
+        page = PdfReader(self.input_path).pages[0]
+        a, b, c, d, e, f = map(float, placement(page, (0, 0, 100, 20), position, 0, 1).split())
+        return a * 50 + c * 10 + e, b * 50 + d * 10 + f
+
+    def test_encrypted_input_is_rewritten(self):
+        """Test that an encrypted input falls back to a full, unencrypted copy with the stamp"""
+        from pypdf import PdfReader
+
+        create_pdf(self.input_path, encrypt=True)
+        out = StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(watermark_pdf(self.input_path, self.output_path, self.stamp), 1)
+
+        self.assertIn("writing a full copy instead", out.getvalue())
+        reader = PdfReader(self.output_path)
+        self.assertFalse(reader.is_encrypted)
+        self.assertIn("DRAFT", reader.pages[0].extract_text())
+
+    def test_top_follows_page_rotation(self):
+        """Test that top and bottom refer to the displayed page, not the unrotated one"""
+        x, y = self.stamp_centre(0, 'top')
+        self.assertAlmostEqual(x, 306)
+        self.assertGreater(y, 700)
+
+        # Turned 90 degrees clockwise, the displayed top is the page's left edge
+        x, y = self.stamp_centre(90, 'top')
+        self.assertLess(x, 100)
+        self.assertAlmostEqual(y, 396)
+
+        x, y = self.stamp_centre(270, 'bottom')
+        self.assertLess(x, 100)
+        self.assertAlmostEqual(y, 396)
+
+
+if __name__ == '__main__':
+    unittest.main()
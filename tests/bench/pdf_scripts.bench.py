@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the pdf skill scripts (src/process/resources/skills/pdf/scripts).
+
+Generates synthetic fillable and non-fillable PDFs with reportlab, then times
+and memory-profiles every script operation: extract, fill (plain, incremental
+and flattened), annotate, render, merge, split, bounding-box check and
+watermark. Each case runs in a fresh Python process so peak RSS is per
+operation. Results are written as JSON; pass a previous result file with
+--compare to flag regressions.
+
+Usage:
+  python3 tests/bench/pdf_scripts.bench.py                       # 1, 100 and 1000 pages
+  python3 tests/bench/pdf_scripts.bench.py --pages 1,100 --fields-per-page 20
+  python3 tests/bench/pdf_scripts.bench.py --output new.json --compare old.json
+
+Runs offline. Requires pypdf and reportlab; render cases also need pdf2image
+and poppler and are reported as skipped without them.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SCRIPTS_DIR = os.path.join(REPO_ROOT, 'src', 'process', 'resources', 'skills', 'pdf', 'scripts')
+
+DEFAULT_PAGES = '1,100,1000'
+DEFAULT_FIELDS_PER_PAGE = 10
+DEFAULT_OUTPUT = 'pdf-scripts-bench.json'
+REGRESSION_THRESHOLD = 0.2
+# Ignore differences below these, which are timer and allocator noise
+MIN_DELTA = {'seconds': 0.05, 'peak_rss_mb': 5.0}
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+
+
+# ── Synthetic documents ──────────────────────────────────────────────────────
+
+def field_rows(fields_per_page: int):
+    """Yield (index, label box, entry box) in PDF coordinates for one page."""
+    row_height = min(40, (PAGE_HEIGHT - 80) // max(fields_per_page, 1))
+    for i in range(fields_per_page):
+        y = PAGE_HEIGHT - 60 - i * row_height
+        yield i, (40, y, 140, y + 14), (150, y - 2, 450, y + 14)
+
+
+def generate_documents(work_dir: str, pages: int, fields_per_page: int) -> dict:
+    """Write fillable.pdf, plain.pdf, fields.json and values.json for a page count."""
+    from reportlab.pdfgen import canvas
+
+    paths = {
+        'fillable': os.path.join(work_dir, f'fillable_{pages}.pdf'),
+        'plain': os.path.join(work_dir, f'plain_{pages}.pdf'),
+        'fields': os.path.join(work_dir, f'fields_{pages}.json'),
+        'values': os.path.join(work_dir, f'values_{pages}.json'),
+    }
+
+    fillable = canvas.Canvas(paths['fillable'], pagesize=(PAGE_WIDTH, PAGE_HEIGHT))
+    plain = canvas.Canvas(paths['plain'], pagesize=(PAGE_WIDTH, PAGE_HEIGHT))
+    form_fields = []
+    values = []
+
+    for page in range(1, pages + 1):
+        for c in (fillable, plain):
+            c.setFont('Helvetica', 10)
+            c.drawString(40, PAGE_HEIGHT - 30, f"Synthetic form, page {page}")
+
+        for i, label, entry in field_rows(fields_per_page):
+            name = f"p{page}_field{i}"
+            for c in (fillable, plain):
+                c.drawString(label[0], label[1] + 2, f"Field {i}:")
+            fillable.acroForm.textfield(name=name, x=entry[0], y=entry[1], width=entry[2] - entry[0],
+                                        height=entry[3] - entry[1], borderWidth=0)
+            plain.line(entry[0], entry[1], entry[2], entry[1])
+
+            values.append({"field_id": name, "value": f"value {page}.{i}"})
+            # fields.json uses image coordinates (y down); image size == page size here
+            form_fields.append({
+                "page_number": page,
+                "description": name,
+                "label_bounding_box": [label[0], PAGE_HEIGHT - label[3], label[2], PAGE_HEIGHT - label[1]],
+                "entry_bounding_box": [entry[0], PAGE_HEIGHT - entry[3], entry[2], PAGE_HEIGHT - entry[1]],
+                "entry_text": {"text": f"value {page}.{i}", "font_size": 10},
+            })
+
+        fillable.showPage()
+        plain.showPage()
+
+    fillable.save()
+    plain.save()
+
+    pages_info = [{"page_number": p, "image_width": PAGE_WIDTH, "image_height": PAGE_HEIGHT}
+                  for p in range(1, pages + 1)]
+    with open(paths['fields'], 'w', encoding='utf-8') as f:
+        json.dump({"pages": pages_info, "form_fields": form_fields}, f)
+    with open(paths['values'], 'w', encoding='utf-8') as f:
+        json.dump(values, f)
+    return paths
+
+
+# ── Cases ────────────────────────────────────────────────────────────────────
+
+def build_cases(docs: dict, work_dir: str, pages: int) -> list:
+    """Return (name, module, function, kwargs, requirement) tuples for one document size."""
+    out = os.path.join(work_dir, f'out_{pages}')
+    os.makedirs(out, exist_ok=True)
+    merge_inputs = [docs['plain']] * 10
+    return [
+        ('extract', 'extract_form_field_info', 'extract_form_fields',
+         {'pdf_path': docs['fillable'], 'output_path': os.path.join(out, 'field_info.json')}, None),
+        ('extract_cached', 'extract_form_field_info', 'extract_form_fields',
+         {'pdf_path': docs['fillable'], 'output_path': os.path.join(out, 'field_info_cached.json')}, None),
+        ('fill', 'fill_fillable_fields', 'fill_form_fields',
+         {'input_path': docs['fillable'], 'values_path': docs['values'],
+          'output_path': os.path.join(out, 'filled.pdf')}, None),
+        ('fill_incremental', 'fill_fillable_fields', 'fill_form_fields',
+         {'input_path': docs['fillable'], 'values_path': docs['values'],
+          'output_path': os.path.join(out, 'filled_incremental.pdf'), 'incremental': True}, None),
+        ('fill_flatten', 'fill_fillable_fields', 'fill_form_fields',
+         {'input_path': docs['fillable'], 'values_path': docs['values'],
+          'output_path': os.path.join(out, 'filled_flat.pdf'), 'flatten': True}, None),
+        ('annotate', 'fill_pdf_form_with_annotations', 'fill_form_with_annotations',
+         {'input_path': docs['plain'], 'json_path': docs['fields'],
+          'output_path': os.path.join(out, 'annotated.pdf')}, None),
+        ('annotate_incremental', 'fill_pdf_form_with_annotations', 'fill_form_with_annotations',
+         {'input_path': docs['plain'], 'json_path': docs['fields'],
+          'output_path': os.path.join(out, 'annotated_incremental.pdf'), 'incremental': True}, None),
+        ('render', 'convert_pdf_to_images', 'convert_pdf_to_images',
+         {'pdf_path': docs['plain'], 'output_dir': os.path.join(out, 'images'), 'use_cache': False}, 'poppler'),
+        ('render_cached', 'convert_pdf_to_images', 'convert_pdf_to_images',
+         {'pdf_path': docs['plain'], 'output_dir': os.path.join(out, 'images_cached')}, 'poppler'),
+        ('merge', 'merge_pdfs', 'merge_pdfs',
+         {'output_path': os.path.join(out, 'merged.pdf'), 'input_paths': merge_inputs}, None),
+        ('split', 'split_pdf', 'split_pdf',
+         {'input_path': docs['plain'], 'output_dir': os.path.join(out, 'split'), 'every': 10}, None),
+        ('check_bounding_boxes', 'check_bounding_boxes', 'check_bounding_boxes',
+         {'json_path': docs['fields']}, None),
+        ('watermark', 'watermark', 'watermark',
+         {'input_path': docs['plain'], 'output_path': os.path.join(out, 'watermarked.pdf'), 'text': 'DRAFT'}, None),
+    ]
+
+
+def requirement_missing(requirement: str):
+    """Return a skip reason if an optional requirement is unavailable."""
+    if requirement == 'poppler':
+        try:
+            import pdf2image  # noqa: F401
+        except ImportError:
+            return "pdf2image not installed"
+        if not shutil.which('pdftoppm'):
+            return "poppler (pdftoppm) not found"
+    return None
+
+
+def peak_rss_mb() -> float:
+    """Return this process's peak RSS in MB."""
+    # VmHWM starts fresh at exec; ru_maxrss can carry over the parent's peak
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, KiB elsewhere
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def run_one(module: str, function: str, kwargs_json: str) -> None:
+    """Child-process entry point: run one script function and print metrics as JSON."""
+    import contextlib
+    import importlib
+    import io
+
+    sys.path.insert(0, SCRIPTS_DIR)
+    kwargs = json.loads(kwargs_json)
+    start = time.perf_counter()
+    fn = getattr(importlib.import_module(module), function)
+    imported = time.perf_counter()
+
+    status, error = 'ok', None
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn(**kwargs)
+    except SystemExit as e:
+        if e.code:
+            status, error = 'error', f"exit code {e.code}"
+    except Exception as e:
+        status, error = 'error', f"{type(e).__name__}: {e}"
+    finished = time.perf_counter()
+
+    # Rendering happens in poppler subprocesses, so report their peak too
+    child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    child_rss = child_rss / (1024 * 1024) if sys.platform == 'darwin' else child_rss / 1024
+    print(json.dumps({
+        "status": status,
+        "error": error,
+        "import_seconds": round(imported - start, 4),
+        "seconds": round(finished - imported, 4),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "peak_child_rss_mb": round(child_rss, 1),
+    }))
+
+
+def run_case(module: str, function: str, kwargs: dict, env: dict) -> dict:
+    """Run one case in a fresh interpreter and return its metrics."""
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--run-one', module, function, json.dumps(kwargs)],
+        capture_output=True, text=True, env=env,
+    )
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        return {"status": "error", "error": (result.stderr.strip().splitlines() or ['unknown error'])[-1]}
+    return json.loads(lines[-1])
+
+
+# ── Reporting ────────────────────────────────────────────────────────────────
+
+def compare(results: list, baseline_path: str) -> list:
+    """Return regressions of more than REGRESSION_THRESHOLD against a baseline file."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r['name'], r['pages']): r for r in json.load(f)['results']}
+
+    regressions = []
+    for r in results:
+        old = baseline.get((r['name'], r['pages']))
+        if not old or r.get('status') != 'ok' or old.get('status') != 'ok':
+            continue
+        for metric in ('seconds', 'peak_rss_mb'):
+            if (old[metric] > 0 and r[metric] > old[metric] * (1 + REGRESSION_THRESHOLD)
+                    and r[metric] - old[metric] >= MIN_DELTA[metric]):
+                regressions.append(f"{r['name']} @ {r['pages']} pages: {metric} "
+                                   f"{old[metric]} -> {r[metric]} (+{(r[metric] / old[metric] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def print_summary(results: list) -> None:
+    print(f"\n{'case':<22}{'pages':>7}{'seconds':>10}{'rss MB':>9}  status")
+    for r in results:
+        if r['status'] == 'ok':
+            print(f"{r['name']:<22}{r['pages']:>7}{r['seconds']:>10.3f}{r['peak_rss_mb']:>9.1f}  ok")
+        else:
+            print(f"{r['name']:<22}{r['pages']:>7}{'':>10}{'':>9}  {r['status']}: {r.get('error') or r.get('reason')}")
+
+
+def main(argv: list = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the pdf skill scripts on synthetic documents.")
+    parser.add_argument('--pages', default=DEFAULT_PAGES, help=f"Comma-separated page counts (default: {DEFAULT_PAGES})")
+    parser.add_argument('--fields-per-page', type=int, default=DEFAULT_FIELDS_PER_PAGE,
+                        help=f"Form fields per page (default: {DEFAULT_FIELDS_PER_PAGE})")
+    parser.add_argument('--only', help="Comma-separated case names to run")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help=f"Result JSON path (default: {DEFAULT_OUTPUT})")
+    parser.add_argument('--compare', help="Previous result JSON; exit 1 on regressions")
+    parser.add_argument('--run-one', nargs=3, metavar=('MODULE', 'FUNCTION', 'KWARGS'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_one:
+        run_one(*args.run_one)
+        return
+
+    only = set(args.only.split(',')) if args.only else None
+    results = []
+    with tempfile.TemporaryDirectory(prefix='pdf-bench-') as work_dir:
+        # Isolate caches and never forward to a running worker
+        env = dict(os.environ, XDG_CACHE_HOME=os.path.join(work_dir, 'cache'))
+        env.pop('PDF_WORKER_SOCKET', None)
+        env.pop('PDF_RENDER_CACHE_DIR', None)
+        env.pop('PDF_FORM_CACHE_DIR', None)
+
+        for pages in [int(p) for p in args.pages.split(',')]:
+            start = time.perf_counter()
+            docs = generate_documents(work_dir, pages, args.fields_per_page)
+            print(f"Generated {pages}-page documents in {time.perf_counter() - start:.1f}s")
+
+            for name, module, function, kwargs, requirement in build_cases(docs, work_dir, pages):
+                if only and name not in only:
+                    continue
+                record = {"name": name, "pages": pages, "fields": pages * args.fields_per_page}
+                reason = requirement_missing(requirement)
+                if reason:
+                    record.update(status='skipped', reason=reason)
+                else:
+                    record.update(run_case(module, function, kwargs, env))
+                results.append(record)
+                print(f"  {name}: {record['status']}")
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "fields_per_page": args.fields_per_page,
+        "results": results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print_summary(results)
+    print(f"\nWrote {args.output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare)
+        if regressions:
+            print(f"\nRegressions against {args.compare}:")
+            for line in regressions:
+                print(f"  ✗ {line}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()